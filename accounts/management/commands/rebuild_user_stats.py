@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from accounts.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Foydalanuvchilar statistikasini (UserStats) bazadan qayta hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Faqat shu foydalanuvchi ID lari')
+        parser.add_argument('--batch-size', type=int, default=500, help='Bir partiyadagi foydalanuvchilar soni')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_user_stats(user_ids=options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{rebuilt} ta foydalanuvchi statistikasi qayta hisoblandi"))
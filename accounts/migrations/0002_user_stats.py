@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+                ('materials_count', models.PositiveIntegerField(default=0, verbose_name='Materiallar soni')),
+                ('tests_count', models.PositiveIntegerField(default=0, verbose_name='Testlar soni')),
+                ('assignments_count', models.PositiveIntegerField(default=0, verbose_name='Topshiriqlar soni')),
+                ('videos_count', models.PositiveIntegerField(default=0, verbose_name='Video darslar soni')),
+                ('models_3d_count', models.PositiveIntegerField(default=0, verbose_name='3D modellar soni')),
+                ('ocr_count', models.PositiveIntegerField(default=0, verbose_name='OCR qayta ishlashlar soni')),
+                ('excel_count', models.PositiveIntegerField(default=0, verbose_name='Excel eksportlar soni')),
+                ('total_downloads', models.PositiveIntegerField(default=0, verbose_name='Materiallar yuklab olishlari')),
+                ('avg_rating', models.FloatField(default=0.0, verbose_name="Materiallar o'rtacha reytingi")),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')),
+            ],
+            options={
+                'verbose_name': 'Foydalanuvchi statistikasi',
+                'verbose_name_plural': 'Foydalanuvchilar statistikasi',
+            },
+        ),
+    ]
@@ -92,4 +92,35 @@ class User(AbstractUser):
         """To'liq ismni qaytaradi"""
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name}"
-        return self.username
\ No newline at end of file
+        return self.username
+
+class UserStats(models.Model):
+    """Foydalanuvchi statistikasi (dashboard uchun tayyor hisoblangan qiymatlar)"""
+    
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Foydalanuvchi'
+    )
+    materials_count = models.PositiveIntegerField(default=0, verbose_name='Materiallar soni')
+    tests_count = models.PositiveIntegerField(default=0, verbose_name='Testlar soni')
+    assignments_count = models.PositiveIntegerField(default=0, verbose_name='Topshiriqlar soni')
+    videos_count = models.PositiveIntegerField(default=0, verbose_name='Video darslar soni')
+    models_3d_count = models.PositiveIntegerField(default=0, verbose_name='3D modellar soni')
+    ocr_count = models.PositiveIntegerField(default=0, verbose_name='OCR qayta ishlashlar soni')
+    excel_count = models.PositiveIntegerField(default=0, verbose_name='Excel eksportlar soni')
+    total_downloads = models.PositiveIntegerField(default=0, verbose_name='Materiallar yuklab olishlari')
+    avg_rating = models.FloatField(default=0.0, verbose_name='Materiallar o\'rtacha reytingi')
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Yangilangan vaqt'
+    )
+    
+    class Meta:
+        verbose_name = 'Foydalanuvchi statistikasi'
+        verbose_name_plural = 'Foydalanuvchilar statistikasi'
+    
+    def __str__(self):
+        return f"{self.user.get_full_name()} statistikasi"
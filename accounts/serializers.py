@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from ustoziya_platform import images
 from .models import User
 
 
@@ -131,6 +132,15 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         if User.objects.filter(email=value).exclude(pk=self.instance.pk).exists():
             raise serializers.ValidationError("Bu email allaqachon ishlatilgan")
         return value
+    
+    def validate_avatar(self, value):
+        """Avatarni kichraytirib, metama'lumotlarsiz qayta kodlash"""
+        if not value:
+            return value
+        try:
+            return images.normalize_image(value, 'avatar')
+        except images.InvalidImage:
+            raise serializers.ValidationError("Yuklangan fayl rasm emas yoki buzilgan")
 
 
 class PasswordChangeSerializer(serializers.Serializer):
@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from . import stats
+
+
+def _counter_receivers(field, user_field):
+    attname = f'{user_field}_id'
+
+    def on_save(sender, instance, created, raw=False, **kwargs):
+        if created and not raw:
+            stats.increment(getattr(instance, attname), field, 1)
+
+    def on_delete(sender, instance, **kwargs):
+        stats.increment(getattr(instance, attname), field, -1)
+
+    return on_save, on_delete
+
+
+def material_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Material yaratilsa, o'zgarsa yoki o'chirilsa agregatlar qayta hisoblanadi
+
+    Faqat hisoblagichlar saqlansa (yuklab olish, baholash) qayta hisoblanmaydi -
+    ularni chaqiruvchi stats.increment / stats.refresh_material_rating bilan yangilaydi.
+    """
+    if raw or (update_fields and update_fields <= stats.MATERIAL_COUNTER_FIELDS):
+        return
+    stats.refresh_material_stats(instance.author_id)
+
+
+def connect_signals():
+    """UserStats hisoblagichlarini modellar signallariga ulaydi"""
+    for field, (model_label, user_field) in stats.COUNTERS.items():
+        model = apps.get_model(model_label)
+        on_save, on_delete = _counter_receivers(field, user_field)
+        post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f'user_stats:{field}:save')
+        post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=f'user_stats:{field}:delete')
+
+    material = apps.get_model(stats.MATERIAL_MODEL)
+    post_save.connect(material_changed, sender=material, dispatch_uid='user_stats:materials:save')
+    post_delete.connect(material_changed, sender=material, dispatch_uid='user_stats:materials:delete')
@@ -0,0 +1,152 @@
+"""
+Foydalanuvchi statistikasini (UserStats) yuritish.
+
+Dashboard har safar oltita COUNT(*) so'rovi o'rniga bitta qatorni o'qiydi.
+Qator signallar orqali yangilanadi: obyekt yaratilsa yoki o'chirilsa tegishli
+hisoblagich F() ifodasi bilan bir so'rovda o'zgartiriladi, materiallar
+o'zgarganda esa ularning agregatlari (soni, yuklab olishlar, o'rtacha reyting)
+qayta hisoblanadi. Qator hali mavjud bo'lmasa u birinchi o'qishda to'liq
+hisoblanadi; `rebuild_user_stats` buyrug'i barcha qatorlarni qayta quradi.
+"""
+from django.apps import apps
+from django.db.models import Avg, Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import User, UserStats
+
+# UserStats maydoni -> (model, foydalanuvchiga ishora qiluvchi maydon)
+COUNTERS = {
+    'tests_count': ('tests.Test', 'author'),
+    'assignments_count': ('materials.Assignment', 'teacher'),
+    'videos_count': ('materials.VideoLesson', 'author'),
+    'models_3d_count': ('materials.Model3D', 'author'),
+    'ocr_count': ('ocr_processing.OCRProcessing', 'user'),
+    'excel_count': ('ocr_processing.ExcelExport', 'user'),
+}
+
+MATERIAL_MODEL = 'materials.Material'
+
+# Faqat shu maydonlar saqlansa (update_fields) to'liq agregat qayta hisoblanmaydi -
+# yuklab olishlar F() delta bilan, reyting esa refresh_material_rating() bilan yangilanadi
+MATERIAL_COUNTER_FIELDS = frozenset({'download_count', 'rating'})
+
+
+def _material_aggregates(user_id):
+    Material = apps.get_model(MATERIAL_MODEL)
+    stats = Material.objects.filter(author_id=user_id).aggregate(
+        materials_count=Count('id'),
+        total_downloads=Sum('download_count'),
+        avg_rating=Avg('rating'),
+    )
+    return {
+        'materials_count': stats['materials_count'],
+        'total_downloads': stats['total_downloads'] or 0,
+        'avg_rating': stats['avg_rating'] or 0.0,
+    }
+
+
+def compute_user_stats(user_id):
+    """Barcha qiymatlarni bazadan to'liq hisoblaydi"""
+    values = _material_aggregates(user_id)
+    for field, (model_label, user_field) in COUNTERS.items():
+        values[field] = apps.get_model(model_label).objects.filter(**{f'{user_field}_id': user_id}).count()
+    return values
+
+
+def get_user_stats(user):
+    """Foydalanuvchi statistikasi qatori; mavjud bo'lmasa hisoblab yaratiladi"""
+    try:
+        return UserStats.objects.get(user_id=user.pk)
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.update_or_create(user_id=user.pk, defaults=compute_user_stats(user.pk))
+        return stats
+
+
+def increment(user_id, field, delta):
+    """Hisoblagichni bitta UPDATE bilan o'zgartiradi (qator bo'lmasa keyin to'liq hisoblanadi)"""
+    if user_id is None:
+        return
+    UserStats.objects.filter(user_id=user_id).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def refresh_material_stats(user_id):
+    """Materiallar agregatlarini qayta hisoblaydi (soni, yuklab olishlar, reyting)"""
+    if user_id is None:
+        return
+    UserStats.objects.filter(user_id=user_id).update(**_material_aggregates(user_id))
+
+
+def refresh_material_rating(user_id):
+    """Faqat materiallar o'rtacha reytingini qayta hisoblaydi"""
+    if user_id is None:
+        return
+    Material = apps.get_model(MATERIAL_MODEL)
+    avg_rating = Material.objects.filter(author_id=user_id).aggregate(avg=Avg('rating'))['avg']
+    UserStats.objects.filter(user_id=user_id).update(avg_rating=avg_rating or 0.0)
+
+
+def _count_subquery(model_label, user_field):
+    model = apps.get_model(model_label)
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{user_field: OuterRef('pk')})
+            .order_by().values(user_field).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def rebuild_user_stats(user_ids=None, batch_size=500):
+    """Barcha (yoki berilgan) foydalanuvchilar statistikasini qayta quradi
+
+    Har bir partiya bitta so'rov bilan (korrelyatsiyalangan subquery'lar)
+    hisoblanadi va bulk_create(update_conflicts=True) bilan yoziladi.
+    """
+    Material = apps.get_model(MATERIAL_MODEL)
+    material_rows = Material.objects.filter(author=OuterRef('pk')).order_by().values('author')
+    annotations = {
+        f'stat_{field}': _count_subquery(model_label, user_field)
+        for field, (model_label, user_field) in COUNTERS.items()
+    }
+    annotations.update({
+        'stat_materials_count': _count_subquery(MATERIAL_MODEL, 'author'),
+        'stat_total_downloads': Coalesce(
+            Subquery(material_rows.annotate(total=Sum('download_count')).values('total'),
+                     output_field=IntegerField()),
+            Value(0),
+        ),
+        'stat_avg_rating': Subquery(material_rows.annotate(avg=Avg('rating')).values('avg')),
+    })
+
+    users = User.objects.order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    fields = ['materials_count', 'total_downloads', 'avg_rating', 'updated_at'] + list(COUNTERS)
+
+    rebuilt = 0
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk).annotate(**annotations)[:batch_size])
+        if not batch:
+            return rebuilt
+        now = timezone.now()
+        UserStats.objects.bulk_create(
+            [
+                UserStats(
+                    user_id=user.pk,
+                    materials_count=user.stat_materials_count,
+                    total_downloads=user.stat_total_downloads,
+                    avg_rating=user.stat_avg_rating or 0.0,
+                    updated_at=now,
+                    **{field: getattr(user, f'stat_{field}') for field in COUNTERS},
+                )
+                for user in batch
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=fields,
+        )
+        rebuilt += len(batch)
+        last_pk = batch[-1].pk
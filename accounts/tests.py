@@ -1,3 +1,57 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from materials.models import Material, MaterialCategory
+from ustoziya_platform.testing import TemporaryMediaMixin
+
+from . import stats
+from .models import User, UserStats
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=False)
+class MaterialStatsSignalTests(TemporaryMediaMixin, TestCase):
+    """Yuklab olish va baholash to'liq agregatni qayta hisoblamaydi"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='parol12345')
+        self.material = Material.objects.create(
+            title='Kasrlar', description='', material_type='presentation',
+            category=MaterialCategory.objects.create(name='Matematika'),
+            author=self.author, file=ContentFile(b'slayd', name='kasrlar.pdf'),
+        )
+        stats.get_user_stats(self.author)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='student', password='parol12345'))
+
+    def test_download_applies_delta_without_full_refresh(self):
+        with mock.patch.object(stats, 'refresh_material_stats') as refresh:
+            response = self.client.get(f'/api/materials/{self.material.pk}/download/')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        refresh.assert_not_called()
+        self.assertEqual(UserStats.objects.get(user=self.author).total_downloads, 1)
+
+    def test_counters_do_not_bump_updated_at(self):
+        updated_at = self.material.updated_at
+        self.client.get(f'/api/materials/{self.material.pk}/download/').close()
+        self.client.post(f'/api/materials/{self.material.pk}/rate/', {'rating': 5})
+        self.material.refresh_from_db()
+        self.assertEqual((self.material.download_count, self.material.rating), (1, 5.0))
+        self.assertEqual(self.material.updated_at, updated_at)
+
+    def test_rating_refreshes_only_average(self):
+        with mock.patch.object(stats, 'refresh_material_stats') as refresh:
+            response = self.client.post(f'/api/materials/{self.material.pk}/rate/', {'rating': 4})
+        self.assertEqual(response.status_code, 200)
+        refresh.assert_not_called()
+        self.assertEqual(UserStats.objects.get(user=self.author).avg_rating, 4.0)
+
+    def test_regular_save_refreshes_aggregates(self):
+        with mock.patch.object(stats, 'refresh_material_stats') as refresh:
+            self.material.title = 'Oddiy kasrlar'
+            self.material.save()
+        refresh.assert_called_once_with(self.author.pk)
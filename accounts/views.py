@@ -10,6 +10,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import authenticate
 from .models import User
+from .stats import get_user_stats
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
@@ -134,25 +135,13 @@ def change_password(request):
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
     """Dashboard statistikasi"""
-    user = request.user
-    
-    # Materiallar soni
-    materials_count = user.materials.count()
-    
-    # Testlar soni
-    tests_count = user.tests.count()
-    
-    # OCR qayta ishlashlar soni
-    ocr_count = user.ocr_processings.count()
-    
-    # Excel eksportlar soni
-    excel_count = user.excel_exports.count()
+    stats = get_user_stats(request.user)
     
     return Response({
-        'materials_count': materials_count,
-        'tests_count': tests_count,
-        'ocr_count': ocr_count,
-        'excel_count': excel_count
+        'materials_count': stats.materials_count,
+        'tests_count': stats.tests_count,
+        'ocr_count': stats.ocr_count,
+        'excel_count': stats.excel_count
     })
 
 
@@ -0,0 +1,287 @@
+"""
+AI matn provayderlari uchun router.
+
+Router bir nechta provayderni (OpenAI, OpenRouter, Gemini yoki soxta
+provayderlar) navbat bilan ishlatadi, har biri uchun kechikish statistikasini
+yuritadi, ketma-ket xatoliklardan keyin circuit breaker'ni ochadi va birinchi
+so'rov p95 kechikishdan oshib ketsa keyingi provayderga hedged so'rov yuboradi.
+
+Isitish: p95 provayderning kamida `hedge_min_samples` ta muvaffaqiyatli
+javobidan hisoblanadi. Undan oldin `default_hedge_delay`
+(AI_HEDGE_DEFAULT_DELAY_SECONDS) ishlatiladi; u 0 bo'lsa isitish davrida hedged
+so'rov yuborilmaydi. Hedge vaqti so'rov slot olib, provayderga haqiqatan
+ketgan paytdan hisoblanadi (navbatda kutish hisobga kirmaydi).
+
+Yutqazgan so'rovlar: birinchi javob kelgach qolganlari bekor qilinadi - hali
+boshlanmagani (yoki slot kutayotgani) provayderga umuman yuborilmaydi,
+allaqachon ketgan HTTP so'rov esa tugaguncha kutiladi, lekin natijasi tashlab
+yuboriladi va u egallagan slot shu zahoti bo'shatiladi.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from typing import Callable
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ProviderCallable = Callable[[str, str, float], str]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'AI_ROUTER_MAX_WORKERS', 8),
+                thread_name_prefix='ai-router',
+            )
+        return _executor
+
+
+class CallCancelled(Exception):
+    """So'rov boshqa provayder javob bergani uchun bekor qilindi"""
+
+
+class SlotUnavailable(Exception):
+    """`call_slot` slot bermadi (masalan, global kvota); `error` - asl xatolik"""
+
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+
+class ProviderStats:
+    """Bitta provayder uchun kechikish va circuit breaker holati"""
+
+    def __init__(self, window: int = 50):
+        self.latencies = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def record_success(self, latency: float) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self, threshold: int) -> None:
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= threshold:
+                self.opened_at = time.monotonic()
+
+    def is_open(self, cooldown: float) -> bool:
+        """Circuit ochiqmi; cooldown o'tgach sinov so'rovlariga ruxsat beriladi (half-open)"""
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            # Half-open: cooldown o'tgach sinov muvaffaqiyatsiz bo'lsa, record_failure circuit'ni qayta ochadi
+            return time.monotonic() - self.opened_at < cooldown
+
+    def p95(self, min_samples: int):
+        with self.lock:
+            if len(self.latencies) < min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        index = max(0, math.ceil(len(ordered) * 0.95) - 1)
+        return ordered[index]
+
+
+class FakeProvider:
+    """Oflayn ishlab chiqish va test uchun soxta provayder"""
+
+    def __init__(self, name: str, latency: float = 0.0, fail: bool = False, response: str | None = None):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.response = response
+        self.calls = 0
+
+    def __call__(self, system_prompt: str, user_prompt: str, temperature: float = 0.7) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise ValueError(f"{self.name} soxta provayderi xatolik qaytardi.")
+        if self.response is not None:
+            return self.response
+        return f"[{self.name}] {user_prompt}"
+
+
+class _Attempt:
+    """Bitta provayder chaqiruvi: nomi va provayderga ketgan vaqti"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = None
+
+
+class ProviderRouter:
+    """Provayderlar orasida hedged so'rov va circuit breaking bilan marshrutlash
+
+    `call_slot(cancelled)` berilsa har bir provayder chaqiruvi (hedged nusxalar
+    ham) alohida slot ichida bajariladi; u `cancelled` hodisasi o'rnatilganda
+    kutishni to'xtatishi kerak.
+    """
+
+    # Slot kutilayotganda hedge vaqtini tekshirish oralig'i
+    START_POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        providers: dict[str, ProviderCallable],
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        hedge_min_samples: int = 5,
+        default_hedge_delay: float = 0.0,
+        window: int = 50,
+        call_slot=None,
+    ):
+        if not providers:
+            raise ValueError("Hech qanday matnli AI API kaliti topilmadi. Iltimos, .env faylini tekshiring.")
+        self.providers = dict(providers)
+        self.order = list(providers)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_min_samples = hedge_min_samples
+        self.default_hedge_delay = default_hedge_delay
+        self.stats = {name: ProviderStats(window=window) for name in self.order}
+        self.call_slot = call_slot
+
+    def primary_provider(self) -> str:
+        for name in self.order:
+            if not self.stats[name].is_open(self.cooldown):
+                return name
+        return self.order[0]
+
+    def hedge_delay(self, name: str):
+        """Hedged so'rov yuborishdan oldin kutiladigan vaqt (None - cheksiz kutish)"""
+        p95 = self.stats[name].p95(self.hedge_min_samples)
+        if p95 is not None:
+            return p95
+        return self.default_hedge_delay or None
+
+    def _call(self, attempt: _Attempt, cancelled: threading.Event,
+              system_prompt: str, user_prompt: str, temperature: float) -> str:
+        with ExitStack() as stack:
+            if self.call_slot is not None:
+                try:
+                    stack.enter_context(self.call_slot(cancelled))
+                except Exception as exc:  # noqa: BLE001
+                    raise SlotUnavailable(exc) from exc
+            if cancelled.is_set():
+                raise CallCancelled(attempt.name)
+            attempt.started_at = started = time.monotonic()
+            try:
+                result = self.providers[attempt.name](system_prompt, user_prompt, temperature)
+            except Exception:
+                self.stats[attempt.name].record_failure(self.failure_threshold)
+                raise
+            self.stats[attempt.name].record_success(time.monotonic() - started)
+            return result
+
+    def _wait_timeout(self, attempt: _Attempt):
+        """Hedged so'rovgacha qolgan vaqt; None - hedge qilinmaydi"""
+        delay = self.hedge_delay(attempt.name)
+        if delay is None:
+            return None
+        if attempt.started_at is None:
+            return self.START_POLL_INTERVAL  # hali slot kutmoqda
+        return max(0.0, attempt.started_at + delay - time.monotonic())
+
+    def generate(self, system_prompt: str, user_prompt: str, temperature: float = 0.7) -> tuple[str, str]:
+        """Matn generatsiya qiladi va (matn, provayder) juftligini qaytaradi"""
+        candidates = [name for name in self.order if not self.stats[name].is_open(self.cooldown)]
+        if not candidates:
+            raise ValueError("Barcha AI provayderlari vaqtincha ishlamayapti. Birozdan so'ng qayta urinib ko'ring.")
+
+        executor = _get_executor()
+        cancelled = threading.Event()
+        pending = {}
+        errors = []
+        slot_error = None
+
+        def launch(name):
+            attempt = _Attempt(name)
+            future = executor.submit(self._call, attempt, cancelled, system_prompt, user_prompt, temperature)
+            pending[future] = attempt
+            return attempt
+
+        current = launch(candidates.pop(0))
+        try:
+            while pending:
+                timeout = self._wait_timeout(current) if candidates else None
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    if current.started_at is None or time.monotonic() - current.started_at < self.hedge_delay(current.name):
+                        continue
+                    # Birinchi so'rov p95 dan oshdi - keyingi provayderga hedged so'rov
+                    logger.info("AI provayder %s sekin javob bermoqda, %s ga hedged so'rov yuborildi",
+                                current.name, candidates[0])
+                    current = launch(candidates.pop(0))
+                    continue
+
+                for future in done:
+                    attempt = pending.pop(future)
+                    try:
+                        return future.result(), attempt.name
+                    except SlotUnavailable as exc:
+                        # Slot umumiy - boshqa provayderga o'tish foyda bermaydi
+                        slot_error = exc.error
+                    except CallCancelled:
+                        pass
+                    except Exception as exc:  # noqa: BLE001
+                        logger.warning("AI provayder %s xatolik qaytardi: %s", attempt.name, exc)
+                        errors.append(str(exc))
+
+                if not pending and slot_error is not None:
+                    raise slot_error
+                if not pending and candidates:
+                    current = launch(candidates.pop(0))
+        finally:
+            # Yutqazganlar: boshlanmaganlari bekor qilinadi, ketganlarining natijasi e'tiborsiz qoladi
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+
+        raise ValueError(errors[-1] if errors else "AI provayderlari javob bermadi.")
+
+
+def _parse_fake_providers(spec: str) -> dict[str, ProviderCallable]:
+    """`nom[:kechikish[:fail]]` formatidagi vergul bilan ajratilgan ro'yxatni o'qiydi"""
+    providers = {}
+    for item in spec.split(','):
+        parts = [part.strip() for part in item.split(':')]
+        if not parts[0]:
+            continue
+        latency = float(parts[1]) if len(parts) > 1 and parts[1] else 0.0
+        fail = len(parts) > 2 and parts[2].lower() in ('fail', '1', 'true')
+        providers[parts[0]] = FakeProvider(parts[0], latency=latency, fail=fail)
+    return providers
+
+
+def build_text_router(live_providers: dict[str, ProviderCallable], call_slot=None) -> ProviderRouter:
+    """Sozlamalarga ko'ra jonli yoki soxta provayderlar uchun router yaratadi"""
+    if getattr(settings, 'AI_PROVIDER_BACKEND', 'live') == 'fake':
+        providers = _parse_fake_providers(getattr(settings, 'AI_FAKE_PROVIDERS', 'fake'))
+    else:
+        providers = live_providers
+    return ProviderRouter(
+        providers,
+        failure_threshold=getattr(settings, 'AI_CIRCUIT_FAILURE_THRESHOLD', 3),
+        cooldown=getattr(settings, 'AI_CIRCUIT_COOLDOWN_SECONDS', 30),
+        hedge_min_samples=getattr(settings, 'AI_HEDGE_MIN_SAMPLES', 5),
+        default_hedge_delay=getattr(settings, 'AI_HEDGE_DEFAULT_DELAY_SECONDS', 0.0),
+        call_slot=call_slot,
+    )
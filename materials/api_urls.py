@@ -35,5 +35,9 @@ urlpatterns = [
     path('3d-models/', views.Model3DListView.as_view(), name='model_3d_list'),
     path('3d-models/<int:pk>/', views.Model3DDetailView.as_view(), name='model_3d_detail'),
     path('3d-models/<int:pk>/download/', views.download_3d_model, name='download_3d_model'),
+
+    # Resumable (tus) uploads (API)
+    path('uploads/', views.ResumableUploadCreateView.as_view(), name='upload_create'),
+    path('uploads/<uuid:pk>/', views.ResumableUploadDetailView.as_view(), name='upload_detail'),
 ]
 
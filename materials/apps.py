@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class MaterialsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'materials'
+
+    def ready(self):
+        from django.core import checks
+        from ustoziya_platform.category_lists import connect_signals
+        from ustoziya_platform.quotas import check_quota_cache
+        from .media_blobs import connect_signals as connect_media_blob_signals
+        from .model3d_ingest import connect_signals as connect_model3d_signals
+        from .thumbnails import connect_signals as connect_thumbnail_signals
+        connect_signals('materials.MaterialCategory')
+        connect_thumbnail_signals()
+        connect_media_blob_signals()
+        connect_model3d_signals()
+        checks.register(check_quota_cache)
@@ -0,0 +1,92 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from accounts.models import User
+from materials.models import Material, MaterialCategory
+from materials.projections import MaterialProjection
+from tests.models import Test, TestCategory
+from tests.projections import TestProjection
+from ustoziya_platform.renderers import FastJSONRenderer
+from ustoziya_platform.serializers import shape_queryset
+
+
+class Command(BaseCommand):
+    help = "Ro'yxat javoblari: serializer + JSONRenderer va proyeksiya + FastJSONRenderer tezligini solishtirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="Vaqtinchalik yaratiladigan material/test soni (oxirida bekor qilinadi)")
+        parser.add_argument('--repeat', type=int, default=5, help='Har bir o\'lchov necha marta takrorlanadi')
+        parser.add_argument('--fields', default='', help="?fields= qiymati (masalan id,title,thumbnail_url)")
+
+    def seed(self, count):
+        user = User.objects.create_user(
+            username=f'benchmark_{uuid.uuid4().hex[:8]}', email='benchmark@example.com', password=None,
+            first_name='Benchmark', last_name="O'qituvchi", subject='physics',
+        )
+        material_category = MaterialCategory.objects.create(name='Benchmark')
+        test_category = TestCategory.objects.create(name='Benchmark')
+        Material.objects.bulk_create([
+            Material(
+                title=f'Material {index}', description='Tavsif ' * 20, material_type='presentation',
+                category=material_category, author=user, file=f'materials/benchmark_{index}.pptx',
+                tags='fizika, mexanika, 7-sinf', grade_level='7', rating=index % 50 / 10,
+            )
+            for index in range(count)
+        ])
+        Test.objects.bulk_create([
+            Test(
+                title=f'Test {index}', description='Tavsif ' * 20, category=test_category, author=user,
+                grade_level='7', subject='physics',
+            )
+            for index in range(count)
+        ])
+
+    def measure(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def compare(self, label, projection_class, queryset, request, repeat):
+        serializer_class = projection_class.serializer_class
+
+        def slow():
+            data = serializer_class(
+                shape_queryset(queryset, serializer_class, request), many=True, context={'request': request}
+            ).data
+            return JSONRenderer().render(data)
+
+        def fast():
+            return FastJSONRenderer().render(projection_class(request).rows(shape_queryset(queryset, serializer_class, request)))
+
+        slow_time, slow_bytes = self.measure(slow, repeat)
+        fast_time, fast_bytes = self.measure(fast, repeat)
+        if slow_bytes != fast_bytes:
+            raise CommandError(f"{label}: tezkor yo'l natijasi serializer natijasidan farq qiladi")
+        self.stdout.write(
+            f"{label}: {queryset.count()} qator, {len(slow_bytes)} bayt | "
+            f"serializer {slow_time * 1000:.1f} ms, tezkor {fast_time * 1000:.1f} ms "
+            f"({slow_time / fast_time:.1f}x)"
+        )
+
+    def handle(self, *args, **options):
+        path = '/api/benchmark/' + (f"?fields={options['fields']}" if options['fields'] else '')
+        request = Request(RequestFactory().get(path))
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            self.compare('Materiallar', MaterialProjection, Material.objects.filter(is_public=True).order_by('-created_at'),
+                         request, options['repeat'])
+            self.compare('Testlar', TestProjection, Test.objects.filter(is_public=True, is_active=True).order_by('-created_at'),
+                         request, options['repeat'])
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Natijalar baytma-bayt bir xil"))
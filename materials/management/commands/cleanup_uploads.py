@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from materials.uploads import cleanup_expired
+
+
+class Command(BaseCommand):
+    help = "Muddati o'tgan bo'laklab yuklash sessiyalari va vaqtinchalik fayllarni o'chirish"
+
+    def handle(self, *args, **options):
+        deleted = cleanup_expired()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} ta yuklash sessiyasi o'chirildi"))
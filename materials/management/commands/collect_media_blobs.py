@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from materials.media_blobs import collect
+
+
+class Command(BaseCommand):
+    help = "Hech qaysi yozuv ishora qilmaydigan media bloblarni (grace muddatidan keyin) o'chirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, help='Standart - MEDIA_BLOB_GRACE_HOURS')
+        parser.add_argument('--dry-run', action='store_true', help="Faqat hisoblash, o'chirmaslik")
+
+    def handle(self, *args, **options):
+        deleted, freed = collect(grace_hours=options['grace_hours'], dry_run=options['dry_run'])
+        verb = "o'chiriladi" if options['dry_run'] else "o'chirildi"
+        self.stdout.write(self.style.SUCCESS(f"{deleted} ta blob {verb} ({freed / (1024 * 1024):.1f} MB)"))
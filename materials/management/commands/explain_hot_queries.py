@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from materials.models import Assignment, Material, Model3D, VideoLesson
+from ocr_processing.models import OCRProcessing, TestResult
+from tests.models import Test, TestAttempt
+from ustoziya_platform.db_indexes import fallback_name
+
+
+def hot_queries():
+    """Ro'yxat sahifalarining asosiy so'rovlari va ular ishlatishi kerak bo'lgan indekslar"""
+    public_tests = Test.objects.filter(is_public=True, is_active=True)
+    return [
+        ('material_pub_recent_idx', Material.objects.filter(is_public=True).order_by('-created_at')),
+        ('material_pub_cat_idx', Material.objects.filter(is_public=True, category_id=1).order_by('-created_at')),
+        ('material_pub_type_idx', Material.objects.filter(is_public=True, material_type='lesson').order_by('-created_at')),
+        ('material_pub_grade_idx', Material.objects.filter(is_public=True, grade_level='5').order_by('-created_at')),
+        ('material_author_recent_idx', Material.objects.filter(author_id=1).order_by('-created_at')),
+        ('assignment_act_recent_idx', Assignment.objects.filter(is_active=True).order_by('-created_at')),
+        ('assignment_act_cat_idx', Assignment.objects.filter(is_active=True, category_id=1).order_by('-created_at')),
+        ('assignment_teacher_recent_idx', Assignment.objects.filter(teacher_id=1).order_by('-created_at')),
+        ('video_pub_recent_idx', VideoLesson.objects.filter(is_public=True).order_by('-created_at')),
+        ('video_pub_cat_idx', VideoLesson.objects.filter(is_public=True, category_id=1).order_by('-created_at')),
+        ('video_pub_subject_idx', VideoLesson.objects.filter(is_public=True, subject='mathematics').order_by('-created_at')),
+        ('video_author_recent_idx', VideoLesson.objects.filter(author_id=1).order_by('-created_at')),
+        ('model3d_pub_recent_idx', Model3D.objects.filter(is_public=True).order_by('-created_at')),
+        ('model3d_pub_cat_idx', Model3D.objects.filter(is_public=True, category_id=1).order_by('-created_at')),
+        ('model3d_pub_type_idx', Model3D.objects.filter(is_public=True, model_type='anatomy').order_by('-created_at')),
+        ('model3d_author_recent_idx', Model3D.objects.filter(author_id=1).order_by('-created_at')),
+        ('test_pub_recent_idx', public_tests.order_by('-created_at')),
+        ('test_pub_cat_idx', public_tests.filter(category_id=1).order_by('-created_at')),
+        ('test_pub_subject_idx', public_tests.filter(subject='mathematics').order_by('-created_at')),
+        ('test_pub_grade_idx', public_tests.filter(grade_level='5').order_by('-created_at')),
+        ('test_author_recent_idx', Test.objects.filter(author_id=1).order_by('-created_at')),
+        ('attempt_test_recent_idx', TestAttempt.objects.filter(test_id=1).order_by('-started_at')),
+        ('attempt_test_completed_idx', TestAttempt.objects.filter(test_id=1, is_completed=True).order_by()),
+        ('ocr_user_recent_idx', OCRProcessing.objects.filter(user_id=1).order_by('-created_at')),
+        ('ocr_test_recent_idx', OCRProcessing.objects.filter(test_id=1).order_by('-created_at')),
+        ('testresult_recent_idx', TestResult.objects.order_by('-processed_at')),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Asosiy ro'yxat so'rovlarining EXPLAIN rejalarini chiqarish va indekslar ishlatilishini tekshirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Indeks ishlatilmasa xatolik bilan tugash (CI uchun)")
+        parser.add_argument('--verbose-plans', action='store_true', help="To'liq rejalarni chiqarish")
+
+    def explain(self, queryset):
+        """So'rov rejasi; Postgres'da jadval skani o'chiriladi, chunki kichik
+        (test) bazada rejalashtiruvchi indeks o'rniga Seq Scan tanlaydi"""
+        queryset = queryset[:20]
+        if connection.vendor != 'postgresql':
+            return queryset.explain()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def handle(self, *args, **options):
+        missing = []
+        for index_name, queryset in hot_queries():
+            plan = self.explain(queryset)
+            if not connection.features.supports_partial_indexes and fallback_name(index_name) in plan:
+                # MySQL: shartli indeks o'rniga uning zaxira indeksi (ustoziya_platform.db_indexes)
+                index_name = fallback_name(index_name)
+            if index_name in plan:
+                self.stdout.write(self.style.SUCCESS(f"OK      {index_name}"))
+            else:
+                missing.append(index_name)
+                self.stdout.write(self.style.WARNING(f"ISHLATILMADI  {index_name}"))
+            if options['verbose_plans'] or index_name not in plan:
+                self.stdout.write(plan)
+
+        if missing and options['check']:
+            raise CommandError(f"Indekslar ishlatilmadi: {', '.join(missing)}")
+        self.stdout.write(f"{len(missing)} ta indeks ishlatilmadi ({connection.vendor})")
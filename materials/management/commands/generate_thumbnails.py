@@ -0,0 +1,25 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from materials.thumbnails import THUMBNAIL_SOURCES, generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Materiallar, video darsliklar va 3D modellar uchun kichik rasmlarni (WebP variantlar) yaratish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(THUMBNAIL_SOURCES), action='append', dest='labels',
+                            help='Faqat shu model (standart - barchasi)')
+        parser.add_argument('--id', type=int, action='append', dest='ids', help='Faqat shu yozuv ID lari')
+        parser.add_argument('--force', action='store_true', help="O'zgarmagan fayllar uchun ham qayta yaratish")
+
+    def handle(self, *args, **options):
+        for label in options['labels'] or THUMBNAIL_SOURCES:
+            queryset = apps.get_model(label).objects.order_by('pk')
+            if options['ids']:
+                queryset = queryset.filter(pk__in=options['ids'])
+            results = {}
+            for pk in queryset.values_list('pk', flat=True).iterator():
+                source = generate_thumbnails(label, pk, force=options['force'])
+                results[source or 'unchanged'] = results.get(source or 'unchanged', 0) + 1
+            summary = ', '.join(f'{key}: {count}' for key, count in sorted(results.items())) or "yozuvlar yo'q"
+            self.stdout.write(self.style.SUCCESS(f"{label}: {summary}"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from materials.model3d_ingest import process_model
+from materials.models import Model3D
+
+
+class Command(BaseCommand):
+    help = "3D modellarning hajmi, cho'qqi/uchburchak sonlari, chegaralari va siqilgan GLB variantlarini yaratish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', type=int, action='append', dest='ids', help='Faqat shu yozuv ID lari')
+        parser.add_argument('--force', action='store_true', help="O'zgarmagan fayllar uchun ham qayta yaratish")
+
+    def handle(self, *args, **options):
+        queryset = Model3D.objects.order_by('pk')
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+        results = {}
+        for pk in queryset.values_list('pk', flat=True).iterator():
+            status = process_model(pk, force=options['force']) or 'unchanged'
+            results[status] = results.get(status, 0) + 1
+        summary = ', '.join(f'{key}: {count}' for key, count in sorted(results.items())) or "yozuvlar yo'q"
+        self.stdout.write(self.style.SUCCESS(summary))
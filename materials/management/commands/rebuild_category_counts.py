@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from ustoziya_platform.category_lists import CATEGORY_LISTS, rebuild_counts
+
+
+class Command(BaseCommand):
+    help = "Kategoriyalardagi ommaviy material/testlar sonini bazadan qayta hisoblash (ommaviy update'lardan keyin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(CATEGORY_LISTS), action='append', dest='labels',
+                            help='Faqat shu kategoriya modeli (standart - barchasi)')
+
+    def handle(self, *args, **options):
+        for label in options['labels'] or CATEGORY_LISTS:
+            updated = rebuild_counts(label)
+            self.stdout.write(self.style.SUCCESS(f"{label}: {updated} ta kategoriya qayta hisoblandi"))
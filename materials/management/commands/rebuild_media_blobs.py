@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from materials.media_blobs import BLOB_FIELDS, migrate_legacy_files, recount
+
+
+class Command(BaseCommand):
+    help = "Eski fayllarni kontent-manzilli omborga ko'chirish va blob havolalari sonini qayta hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-migrate', action='store_true', help="Fayllarni ko'chirmasdan faqat hisoblash")
+        parser.add_argument('--dry-run', action='store_true', help="Ko'chiriladigan fayllarni faqat sanash")
+
+    def handle(self, *args, **options):
+        if not options['skip_migrate']:
+            for label in BLOB_FIELDS:
+                moved = migrate_legacy_files(label, dry_run=options['dry_run'])
+                verb = "ko'chiriladi" if options['dry_run'] else "ko'chirildi"
+                self.stdout.write(f"{label}: {moved} ta fayl {verb}")
+        if options['dry_run']:
+            return
+        changed = recount()
+        self.stdout.write(self.style.SUCCESS(f"{changed} ta blob hisoblagichi yangilandi"))
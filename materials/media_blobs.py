@@ -0,0 +1,245 @@
+"""
+Kontent-manzilli ombordagi bloblarga havolalarni sanash va xavfsiz GC.
+
+`Material.file`, `VideoLesson.video_file` va `Model3D.model_file` cas/
+ostidagi blob'ga ishora qiladi (materials.storage). Har bir blob uchun
+`MediaBlob` qatori bor; `ref_count` signallar orqali bitta F() UPDATE bilan
+o'zgartiriladi: yozuv yaratilganda, fayli almashtirilganda va o'chirilganda.
+Son nolga tushgan vaqt `unreferenced_at` ga yoziladi.
+
+Fayllarni faqat `collect()` (`collect_media_blobs` buyrug'i) o'chiradi va
+hisoblagichga ko'r-ko'rona ishonmaydi: blob kamida MEDIA_BLOB_GRACE_HOURS
+havolasiz turgan bo'lishi, bazada unga hech qaysi yozuv ishora qilmasligi va
+fayl shu muddat ichida qayta yuklanmagan (mtime) bo'lishi kerak. Ommaviy
+`update()` dan keyin yoki eski (cas/ dan tashqaridagi) fayllarni ko'chirish
+uchun `rebuild_media_blobs` buyrug'i ishlatiladi.
+"""
+import os
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from .storage import CAS_PREFIX, blob_digest, get_content_addressed_storage
+
+# Model -> blob'ga ishora qiluvchi fayl maydoni
+BLOB_FIELDS = {
+    'materials.Material': 'file',
+    'materials.VideoLesson': 'video_file',
+    'materials.Model3D': 'model_file',
+}
+
+# Yozuvning signallar uchun eslab qolingan holati: fayl nomi
+_STATE_ATTR = '_media_blob_state'
+
+
+def _blob_model():
+    return apps.get_model('materials', 'MediaBlob')
+
+
+def _grace_cutoff(grace_hours=None):
+    if grace_hours is None:
+        grace_hours = getattr(settings, 'MEDIA_BLOB_GRACE_HOURS', 24)
+    return timezone.now() - timedelta(hours=grace_hours)
+
+
+def _blob_size(name):
+    try:
+        return get_content_addressed_storage().size(name)
+    except OSError:
+        return 0
+
+
+def _ensure_blob(name):
+    blob, _ = _blob_model().objects.get_or_create(
+        name=name, defaults={'sha256': blob_digest(name), 'size': _blob_size(name)},
+    )
+    return blob
+
+
+def adjust(name, delta):
+    """Blob havolalari sonini bitta UPDATE bilan o'zgartiradi (cas/ nomlari uchun)"""
+    if not blob_digest(name):
+        return
+    MediaBlob = _blob_model()
+    if delta > 0:
+        blob = _ensure_blob(name)
+        MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + delta, unreferenced_at=None)
+        return
+    MediaBlob.objects.filter(name=name).update(ref_count=Greatest(F('ref_count') + delta, 0))
+    MediaBlob.objects.filter(name=name, ref_count=0, unreferenced_at__isnull=True).update(
+        unreferenced_at=timezone.now(),
+    )
+
+
+def reference_counts(names=None):
+    """{blob nomi: bazadagi haqiqiy havolalar soni}"""
+    counts = {}
+    for model_label, field in BLOB_FIELDS.items():
+        queryset = apps.get_model(model_label).objects.filter(**{f'{field}__startswith': f'{CAS_PREFIX}/'})
+        if names is not None:
+            queryset = queryset.filter(**{f'{field}__in': names})
+        for name in queryset.values_list(field, flat=True).iterator():
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def recount(names=None):
+    """Havolalar sonini bazadan qayta hisoblaydi; o'zgargan bloblar soni qaytadi"""
+    MediaBlob = _blob_model()
+    names = None if names is None else [name for name in names if blob_digest(name)]
+    counts = reference_counts(names)
+    for name in counts:
+        _ensure_blob(name)
+
+    blobs = MediaBlob.objects.all() if names is None else MediaBlob.objects.filter(name__in=names)
+    now = timezone.now()
+    changed = 0
+    for blob in blobs.only('pk', 'name', 'ref_count', 'unreferenced_at').iterator():
+        actual = counts.get(blob.name, 0)
+        if actual == blob.ref_count and (actual > 0) == (blob.unreferenced_at is None):
+            continue
+        MediaBlob.objects.filter(pk=blob.pk).update(
+            ref_count=actual, unreferenced_at=None if actual else (blob.unreferenced_at or now),
+        )
+        changed += 1
+    return changed
+
+
+def _purge_if_stale(name, cutoff):
+    """Fayl grace muddati ichida qayta yozilmagan bo'lsa o'chiradi"""
+    storage = get_content_addressed_storage()
+    try:
+        if os.path.getmtime(storage.path(name)) >= cutoff.timestamp():
+            return False
+    except FileNotFoundError:
+        return True
+    storage.purge(name)
+    return True
+
+
+def collect(grace_hours=None, dry_run=False):
+    """Havolasiz bloblarni o'chiradi; (o'chirilgan bloblar, bo'shagan baytlar) qaytadi"""
+    MediaBlob = _blob_model()
+    cutoff = _grace_cutoff(grace_hours)
+    deleted = freed = 0
+
+    candidates = MediaBlob.objects.filter(ref_count=0, unreferenced_at__lt=cutoff)
+    for blob in candidates.iterator():
+        if reference_counts([blob.name]):
+            # Hisoblagich signalsiz o'zgarishlar tufayli eskirgan - tuzatiladi, o'chirilmaydi
+            recount([blob.name])
+            continue
+        if dry_run:
+            deleted, freed = deleted + 1, freed + blob.size
+            continue
+        # Qator shart bilan o'chiriladi: oraliqda havola qo'shilgan bo'lsa hech narsa qilinmaydi
+        removed, _ = MediaBlob.objects.filter(pk=blob.pk, ref_count=0).delete()
+        if removed and _purge_if_stale(blob.name, cutoff):
+            deleted, freed = deleted + 1, freed + blob.size
+
+    deleted_files, freed_files = _collect_orphan_files(cutoff, dry_run)
+    return deleted + deleted_files, freed + freed_files
+
+
+def _collect_orphan_files(cutoff, dry_run):
+    """MediaBlob qatori yo'q fayllar (bekor qilingan tranzaksiyalar) va eski tmp/ fayllari"""
+    storage = get_content_addressed_storage()
+    root = storage.path(CAS_PREFIX)
+    if not os.path.isdir(root):
+        return 0, 0
+    known = set(_blob_model().objects.values_list('name', flat=True))
+    deleted = freed = 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            if name in known or (blob_digest(name) and reference_counts([name])):
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime >= cutoff.timestamp():
+                continue
+            if not dry_run:
+                storage.purge(name)
+            deleted, freed = deleted + 1, freed + stat.st_size
+    return deleted, freed
+
+
+def migrate_legacy_files(model_label, dry_run=False):
+    """cas/ dan tashqaridagi eski fayllarni omborga ko'chiradi; ko'chirilgan fayllar soni"""
+    model = apps.get_model(model_label)
+    field = BLOB_FIELDS[model_label]
+    storage = get_content_addressed_storage()
+    legacy = (
+        model.objects.exclude(**{f'{field}__startswith': f'{CAS_PREFIX}/'}).exclude(**{field: ''})
+        .order_by().values_list(field, flat=True).distinct()
+    )
+    moved = 0
+    for name in list(legacy):
+        if not storage.exists(name):
+            continue
+        moved += 1
+        if dry_run:
+            continue
+        with storage.open(name, 'rb') as content:
+            new_name = storage.save(name, content)
+        # update() signallarsiz - havolalar oxirida recount() bilan hisoblanadi
+        model.objects.filter(**{field: name}).update(**{field: new_name})
+        storage.delete(name)
+    return moved
+
+
+# Signallar
+
+def _field_name(instance, field):
+    value = instance.__dict__.get(field)
+    return getattr(value, 'name', value) or ''
+
+
+def _blob_receivers(model_label):
+    field = BLOB_FIELDS[model_label]
+
+    def state(instance):
+        return _field_name(instance, field) if field in instance.__dict__ else None
+
+    def on_init(sender, instance, **kwargs):
+        instance.__dict__[_STATE_ATTR] = state(instance) if instance.pk is not None else None
+
+    def on_save(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        previous = None if created else instance.__dict__.get(_STATE_ATTR)
+        current = state(instance)
+        instance.__dict__[_STATE_ATTR] = current
+        if current is None:
+            return
+        if previous is None and not created:
+            # Oldingi nom noma'lum (maydon yuklanmagan) - bazadan hisoblash
+            recount([current])
+            return
+        if previous == current:
+            return
+        adjust(current, 1)
+        if previous:
+            adjust(previous, -1)
+
+    def on_delete(sender, instance, **kwargs):
+        name = instance.__dict__.get(_STATE_ATTR) or state(instance)
+        if name:
+            adjust(name, -1)
+
+    return on_init, on_save, on_delete
+
+
+def connect_signals():
+    """Fayl maydonlari o'zgarganda blob havolalari sonini yuritish"""
+    for model_label in BLOB_FIELDS:
+        model = apps.get_model(model_label)
+        on_init, on_save, on_delete = _blob_receivers(model_label)
+        post_init.connect(on_init, sender=model, weak=False, dispatch_uid=f'media_blobs:{model_label}:init')
+        post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f'media_blobs:{model_label}:save')
+        post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=f'media_blobs:{model_label}:delete')
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0002_alter_material_material_type_videolesson_model3d_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='assignment_act_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-created_at'], name='assignment_act_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['teacher', '-created_at'], name='assignment_teacher_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-created_at'], name='material_pub_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['category', '-created_at'], name='material_pub_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['material_type', '-created_at'], name='material_pub_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['grade_level', '-created_at'], name='material_pub_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['author', '-created_at'], name='material_author_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='model3d',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-created_at'], name='model3d_pub_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='model3d',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['category', '-created_at'], name='model3d_pub_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='model3d',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['model_type', '-created_at'], name='model3d_pub_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='model3d',
+            index=models.Index(fields=['author', '-created_at'], name='model3d_author_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videolesson',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-created_at'], name='video_pub_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videolesson',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['category', '-created_at'], name='video_pub_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videolesson',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['subject', '-created_at'], name='video_pub_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videolesson',
+            index=models.Index(fields=['author', '-created_at'], name='video_author_recent_idx'),
+        ),
+    ]
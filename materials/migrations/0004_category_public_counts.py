@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+def count_public_materials(apps, schema_editor):
+    MaterialCategory = apps.get_model('materials', 'MaterialCategory')
+    Material = apps.get_model('materials', 'Material')
+    for category_id in MaterialCategory.objects.values_list('pk', flat=True):
+        MaterialCategory.objects.filter(pk=category_id).update(
+            public_materials_count=Material.objects.filter(category_id=category_id, is_public=True).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materialcategory',
+            name='public_materials_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ommaviy materiallar soni'),
+        ),
+        migrations.RunPython(count_public_materials, migrations.RunPython.noop),
+    ]
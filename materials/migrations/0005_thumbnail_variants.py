@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0004_category_public_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Kichik rasm variantlari'),
+        ),
+        migrations.AddField(
+            model_name='model3d',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Kichik rasm variantlari'),
+        ),
+        migrations.AddField(
+            model_name='videolesson',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Kichik rasm variantlari'),
+        ),
+    ]
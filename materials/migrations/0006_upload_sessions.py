@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('materials', '0005_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Fayl nomi')),
+                ('length', models.PositiveBigIntegerField(verbose_name='Umumiy hajm (bayt)')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='Yuklangan qism (bayt)')),
+                ('checksum', models.CharField(blank=True, default='', max_length=160, verbose_name='Butun fayl nazorat summasi (algoritm:hex)')),
+                ('status', models.CharField(choices=[('uploading', 'Yuklanmoqda'), ('completed', 'Yuklandi'), ('failed', 'Xatolik')], default='uploading', max_length=20, verbose_name='Holat')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')),
+                ('expires_at', models.DateTimeField(verbose_name='Amal qilish muddati')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Yuklash sessiyasi',
+                'verbose_name_plural': 'Yuklash sessiyalari',
+                'indexes': [models.Index(fields=['expires_at'], name='upload_expires_idx')],
+            },
+        ),
+    ]
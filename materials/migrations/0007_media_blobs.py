@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:05
+
+from django.db import migrations, models
+import materials.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0006_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='material',
+            name='file',
+            field=models.FileField(storage=materials.storage.get_content_addressed_storage, upload_to='materials/', verbose_name='Fayl'),
+        ),
+        migrations.AlterField(
+            model_name='model3d',
+            name='model_file',
+            field=models.FileField(storage=materials.storage.get_content_addressed_storage, upload_to='3d_models/', verbose_name='3D model fayli'),
+        ),
+        migrations.AlterField(
+            model_name='videolesson',
+            name='video_file',
+            field=models.FileField(storage=materials.storage.get_content_addressed_storage, upload_to='video_lessons/', verbose_name='Video fayl'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Ombordagi nomi')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Hajmi (bayt)')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Havolalar soni')),
+                ('unreferenced_at', models.DateTimeField(blank=True, null=True, verbose_name='Havolasiz qolgan vaqt')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+            ],
+            options={
+                'verbose_name': 'Media blob',
+                'verbose_name_plural': 'Media bloblar',
+                'indexes': [models.Index(fields=['ref_count', 'unreferenced_at'], name='mediablob_gc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0007_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='model3d',
+            name='bounds',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Chegaralar'),
+        ),
+        migrations.AddField(
+            model_name='model3d',
+            name='model_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Siqilgan variantlar'),
+        ),
+        migrations.AddField(
+            model_name='model3d',
+            name='triangle_count',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Uchburchaklar soni'),
+        ),
+        migrations.AddField(
+            model_name='model3d',
+            name='vertex_count',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name="Cho'qqilar soni"),
+        ),
+        migrations.AlterField(
+            model_name='model3d',
+            name='file_size',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Fayl hajmi (bayt)'),
+        ),
+    ]
@@ -0,0 +1,468 @@
+"""
+Yuklangan 3D modellarni tahlil qilish va brauzer uchun siqilgan variantlar.
+
+Model3D saqlanganda `file_size` fayldan o'lchanadi (qo'lda kiritilmaydi),
+fayl o'zgargan bo'lsa fon thread pool'iga vazifa qo'yiladi:
+
+* tahlil - cho'qqilar va uchburchaklar soni hamda chegaralar (bounds).
+  GLB/glTF (accessor `count`/`min`/`max` va sahna tugunlari transformatsiyasi),
+  OBJ va STL sof Python'da o'qiladi; PLY sarlavhasidan sonlar olinadi;
+  boshqa formatlar (FBX, DAE, 3DS) `trimesh` o'rnatilgan bo'lsa tahlil qilinadi.
+* variantlar - `gltfpack` (meshoptimizer) bilan kvantlangan va meshopt
+  siqilgan GLB (`optimized`) hamda MODEL3D_PREVIEW_RATIO ga soddalashtirilgan
+  past poligonli GLB (`preview`). gltfpack o'qimaydigan formatlar avval
+  `trimesh` orqali GLB ga aylantiriladi. Vositalar bo'lmasa variantlar
+  yaratilmaydi va asl fayl beriladi.
+
+Variant nomlari kontent xeshidan (`3d_variants/<xesh>-<tur>.glb`), shuning
+uchun URL'larni muddatsiz keshlash mumkin. `Model3DSerializer.model_url`
+mijozga mos variantni tanlaydi (`best_variant`). Mavjud yozuvlar uchun
+`process_3d_models` buyrug'i ishlatiladi.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_init, post_save, pre_save
+from django.utils.cache import patch_vary_headers
+
+from ustoziya_platform import background
+
+from .thumbnails import _binary, _local_path, _run
+
+try:
+    import trimesh
+except ImportError:  # pragma: no cover - optional dependency
+    trimesh = None
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = '3d_variants/'
+GLTFPACK_INPUTS = {'.glb', '.gltf', '.obj'}
+GLB_MAGIC = b'glTF'
+GLB_JSON_CHUNK = 0x4E4F534A
+STL_RECORD = struct.Struct('<12fH')
+READ_SIZE = 1024 * 1024
+
+# Variantlar tartibi: eng yengildan asl faylgacha
+VARIANT_CHOICES = ('preview', 'optimized', 'original')
+# Sekin tarmoq (Network Information API / ECT client hint)
+SLOW_CONNECTIONS = {'slow-2g', '2g'}
+CLIENT_HINT_HEADERS = ('Save-Data', 'ECT')
+
+# Yozuvning signallar uchun eslab qolingan holati: fayl nomi
+_STATE_ATTR = '_model3d_ingest_state'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Tahlil
+
+class _Bounds:
+    def __init__(self):
+        self.low = [math.inf] * 3
+        self.high = [-math.inf] * 3
+
+    def add(self, x, y, z):
+        low, high = self.low, self.high
+        if x < low[0]:
+            low[0] = x
+        if x > high[0]:
+            high[0] = x
+        if y < low[1]:
+            low[1] = y
+        if y > high[1]:
+            high[1] = y
+        if z < low[2]:
+            low[2] = z
+        if z > high[2]:
+            high[2] = z
+
+    def as_dict(self):
+        if self.low[0] == math.inf:
+            return {}
+        return {
+            'min': [round(value, 6) for value in self.low],
+            'max': [round(value, 6) for value in self.high],
+            'size': [round(high - low, 6) for low, high in zip(self.low, self.high)],
+        }
+
+
+def _read_gltf_json(path):
+    with open(path, 'rb') as stream:
+        header = stream.read(12)
+        if header[:4] != GLB_MAGIC:
+            stream.seek(0)
+            return json.load(stream)
+        length, chunk_type = struct.unpack('<II', stream.read(8))
+        if chunk_type != GLB_JSON_CHUNK:
+            raise ValueError("GLB fayli JSON bo'lagi bilan boshlanmagan")
+        return json.loads(stream.read(length))
+
+
+def _matmul(a, b):
+    return [[sum(a[row][k] * b[k][col] for k in range(4)) for col in range(4)] for row in range(4)]
+
+
+def _node_matrix(node):
+    if 'matrix' in node:
+        values = node['matrix']  # ustunlar bo'yicha
+        return [[values[col * 4 + row] for col in range(4)] for row in range(4)]
+    tx, ty, tz = node.get('translation', (0, 0, 0))
+    x, y, z, w = node.get('rotation', (0, 0, 0, 1))
+    sx, sy, sz = node.get('scale', (1, 1, 1))
+    return [
+        [(1 - 2 * (y * y + z * z)) * sx, 2 * (x * y - z * w) * sy, 2 * (x * z + y * w) * sz, tx],
+        [2 * (x * y + z * w) * sx, (1 - 2 * (x * x + z * z)) * sy, 2 * (y * z - x * w) * sz, ty],
+        [2 * (x * z - y * w) * sx, 2 * (y * z + x * w) * sy, (1 - 2 * (x * x + y * y)) * sz, tz],
+        [0, 0, 0, 1],
+    ]
+
+
+_IDENTITY = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+
+def _primitive_triangles(primitive, accessors):
+    mode = primitive.get('mode', 4)
+    position = accessors[primitive['attributes']['POSITION']]
+    count = accessors[primitive['indices']]['count'] if 'indices' in primitive else position['count']
+    if mode == 4:
+        return count // 3
+    if mode in (5, 6):
+        return max(count - 2, 0)
+    return 0
+
+
+def analyze_gltf(path):
+    """GLB/glTF: accessor'lar va sahna tugunlari bo'yicha (buferlar o'qilmaydi)"""
+    document = _read_gltf_json(path)
+    accessors = document.get('accessors', [])
+    meshes = document.get('meshes', [])
+    nodes = document.get('nodes', [])
+    result = {'vertex_count': 0, 'triangle_count': 0}
+    bounds = _Bounds()
+
+    def add_mesh(mesh_index, matrix):
+        for primitive in meshes[mesh_index].get('primitives', []):
+            if 'POSITION' not in primitive.get('attributes', {}):
+                continue
+            position = accessors[primitive['attributes']['POSITION']]
+            result['vertex_count'] += position['count']
+            result['triangle_count'] += _primitive_triangles(primitive, accessors)
+            if 'min' not in position or 'max' not in position:
+                continue
+            low, high = position['min'], position['max']
+            # Mahalliy AABB ning 8 ta burchagi dunyo koordinatalariga o'tkaziladi
+            for corner in ((x, y, z) for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])):
+                bounds.add(*(sum(matrix[row][k] * (corner + (1,))[k] for k in range(4)) for row in range(3)))
+
+    scenes = document.get('scenes') or []
+    if scenes and nodes:
+        scene = scenes[document.get('scene', 0)]
+        stack = [(index, _IDENTITY) for index in scene.get('nodes', [])]
+        visited = set()
+        while stack:
+            index, parent = stack.pop()
+            if index in visited:
+                continue
+            visited.add(index)
+            node = nodes[index]
+            matrix = _matmul(parent, _node_matrix(node))
+            if 'mesh' in node:
+                add_mesh(node['mesh'], matrix)
+            stack.extend((child, matrix) for child in node.get('children', []))
+    else:
+        for mesh_index in range(len(meshes)):
+            add_mesh(mesh_index, _IDENTITY)
+
+    result['bounds'] = bounds.as_dict()
+    return result
+
+
+def analyze_obj(path):
+    vertices = triangles = 0
+    bounds = _Bounds()
+    with open(path, 'rb') as stream:
+        for line in stream:
+            if line.startswith(b'v '):
+                parts = line.split()
+                bounds.add(float(parts[1]), float(parts[2]), float(parts[3]))
+                vertices += 1
+            elif line.startswith(b'f '):
+                # Ko'pburchak uchburchaklar yelpig'iga bo'linadi
+                triangles += max(len(line.split()) - 3, 0)
+    return {'vertex_count': vertices, 'triangle_count': triangles, 'bounds': bounds.as_dict()}
+
+
+def analyze_stl(path):
+    size = os.path.getsize(path)
+    bounds = _Bounds()
+    with open(path, 'rb') as stream:
+        stream.seek(80)
+        header = stream.read(4)
+        triangles = struct.unpack('<I', header)[0] if len(header) == 4 else 0
+        if size == 84 + triangles * STL_RECORD.size:
+            block_size = STL_RECORD.size * 4096
+            for block in iter(lambda: stream.read(block_size), b''):
+                for record in STL_RECORD.iter_unpack(block):
+                    bounds.add(*record[3:6])
+                    bounds.add(*record[6:9])
+                    bounds.add(*record[9:12])
+        else:
+            # ASCII STL
+            stream.seek(0)
+            triangles = 0
+            for line in stream:
+                line = line.strip()
+                if line.startswith(b'vertex'):
+                    _, x, y, z = line.split()[:4]
+                    bounds.add(float(x), float(y), float(z))
+                elif line.startswith(b'facet'):
+                    triangles += 1
+    # STL da umumiy cho'qqilar yo'q - har bir uchburchakda 3 ta
+    return {'vertex_count': triangles * 3, 'triangle_count': triangles, 'bounds': bounds.as_dict()}
+
+
+def analyze_ply(path):
+    """PLY sarlavhasidan sonlar (yuzalar uchburchak deb hisoblanadi)"""
+    counts = {}
+    with open(path, 'rb') as stream:
+        for line in stream:
+            parts = line.split()
+            if parts[:1] == [b'element'] and len(parts) == 3:
+                counts[parts[1].decode()] = int(parts[2])
+            elif parts[:1] == [b'end_header']:
+                break
+    return {'vertex_count': counts.get('vertex', 0), 'triangle_count': counts.get('face', 0), 'bounds': {}}
+
+
+def analyze_trimesh(path):
+    if trimesh is None:
+        return None
+    mesh = trimesh.load(path, force='mesh')
+    bounds = _Bounds()
+    if len(mesh.vertices):
+        (x0, y0, z0), (x1, y1, z1) = mesh.bounds.tolist()
+        bounds.add(x0, y0, z0)
+        bounds.add(x1, y1, z1)
+    return {'vertex_count': len(mesh.vertices), 'triangle_count': len(mesh.faces), 'bounds': bounds.as_dict()}
+
+
+ANALYZERS = {
+    '.glb': analyze_gltf,
+    '.gltf': analyze_gltf,
+    '.obj': analyze_obj,
+    '.stl': analyze_stl,
+    '.ply': analyze_ply,
+}
+
+
+def analyze(path, extension):
+    """{'vertex_count', 'triangle_count', 'bounds'}; o'qib bo'lmasa None"""
+    analyzer = ANALYZERS.get(extension, analyze_trimesh)
+    try:
+        return analyzer(path)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("%s 3D modelini tahlil qilib bo'lmadi: %s", os.path.basename(path), exc)
+        return None
+
+
+# Variantlar
+
+def _to_glb(path, workdir):
+    """gltfpack o'qimaydigan formatni trimesh orqali GLB ga aylantiradi"""
+    if trimesh is None:
+        return None
+    output = os.path.join(workdir, 'converted.glb')
+    trimesh.load(path, force='scene').export(output, file_type='glb')
+    return output
+
+
+def _gltfpack(gltfpack, source, output, *options):
+    _run([gltfpack, '-i', source, '-o', output, *options])
+    return output if os.path.exists(output) else None
+
+
+def build_variants(path, extension, workdir):
+    """{'optimized': yo'l, 'preview': yo'l} va siqish turi"""
+    source = path if extension in GLTFPACK_INPUTS else _to_glb(path, workdir)
+    if source is None:
+        return {}, None
+    gltfpack = _binary('MODEL3D_GLTFPACK_BINARY', 'gltfpack')
+    if not gltfpack:
+        # Siqilmagan bo'lsa ham GLB brauzerga OBJ/STL dan yengilroq
+        return ({'optimized': source} if source != path else {}), None
+    ratio = str(_setting('MODEL3D_PREVIEW_RATIO', 0.1))
+    # -cc: meshopt siqish; kvantlash gltfpack'da standart yoqilgan
+    outputs = {
+        'optimized': _gltfpack(gltfpack, source, os.path.join(workdir, 'optimized.glb'), '-cc'),
+        'preview': _gltfpack(gltfpack, source, os.path.join(workdir, 'preview.glb'), '-cc', '-si', ratio),
+    }
+    return {kind: output for kind, output in outputs.items() if output}, 'meshopt'
+
+
+def _save_variant(path, kind):
+    with open(path, 'rb') as stream:
+        content = stream.read()
+    name = f"{VARIANTS_DIR}{hashlib.sha256(content).hexdigest()[:24]}-{kind}.glb"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return name, len(content)
+
+
+def _variant_info(path, kind, compression):
+    name, size = _save_variant(path, kind)
+    info = {'name': name, 'size': size, 'compression': compression}
+    stats = analyze(path, '.glb')
+    if stats:
+        info['triangle_count'] = stats['triangle_count']
+    return info
+
+
+def process_model(pk, force=False):
+    """Modelni tahlil qiladi va variantlarni yaratadi; natija holati yoki None"""
+    from .models import Model3D
+
+    instance = Model3D.objects.filter(pk=pk).first()
+    if instance is None or not instance.model_file:
+        return None
+    file_name = instance.model_file.name
+    if not force and (instance.model_variants or {}).get('source') == file_name:
+        return None  # fayl o'zgarmagan
+
+    extension = os.path.splitext(file_name)[1].lower()
+    values = {}
+    variants = {'source': file_name}
+    try:
+        with _local_path(instance.model_file) as path:
+            values['file_size'] = os.path.getsize(path)
+            stats = analyze(path, extension)
+            if stats:
+                values.update(stats)
+            if _setting('MODEL3D_VARIANTS_ENABLED', True):
+                with tempfile.TemporaryDirectory() as workdir:
+                    outputs, compression = build_variants(path, extension, workdir)
+                    for kind, output in outputs.items():
+                        info = _variant_info(output, kind, compression)
+                        # Asl fayldan og'irroq "optimallashtirilgan" variant berilmaydi
+                        if kind == 'preview' or info['size'] < values['file_size']:
+                            variants[kind] = info
+    except FileNotFoundError:
+        logger.warning("%s 3D model fayli topilmadi", file_name)
+        return None
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("%s 3D model variantlari yaratilmadi: %s", file_name, exc)
+
+    values['model_variants'] = variants
+    # Vazifa navbatda turganda fayl yana almashtirilgan bo'lsa, eski natija yozilmaydi
+    Model3D.objects.filter(pk=pk, model_file=file_name).update(**values)
+    return 'optimized' if len(variants) > 1 else ('analyzed' if 'vertex_count' in values else 'measured')
+
+
+# Mijozga mos variant
+
+def variant_urls(instance):
+    """{'original': {...}, 'optimized': {...}, 'preview': {...}} - URL va hajmlar"""
+    if not instance.model_file:
+        return {}
+    variants = instance.model_variants or {}
+    urls = {'original': {'url': instance.model_file.url, 'size': instance.file_size, 'compression': None}}
+    if variants.get('source') != instance.model_file.name:
+        return urls  # variantlar eski faylga tegishli
+    for kind in ('optimized', 'preview'):
+        info = variants.get(kind)
+        if info:
+            urls[kind] = {
+                'url': default_storage.url(info['name']),
+                'size': info['size'],
+                'compression': info.get('compression'),
+                'triangle_count': info.get('triangle_count'),
+            }
+    return urls
+
+
+def requested_variant(request):
+    """Mijoz so'ragan variant: ?model_variant=..., Save-Data yoki sekin tarmoq (ECT)"""
+    if request is None:
+        return None
+    explicit = request.query_params.get('model_variant') if hasattr(request, 'query_params') else None
+    if explicit in VARIANT_CHOICES:
+        return explicit
+    if request.headers.get('Save-Data', '').lower() == 'on' or request.headers.get('ECT', '').lower() in SLOW_CONNECTIONS:
+        return 'preview'
+    return None
+
+
+def best_variant(urls, request=None):
+    """So'ralgan variant bo'lmasa keyingi og'irrog'i; standart - optimized, bo'lmasa original"""
+    if not urls:
+        return None
+    wanted = requested_variant(request) or 'optimized'
+    for kind in VARIANT_CHOICES[VARIANT_CHOICES.index(wanted):]:
+        if kind in urls:
+            return urls[kind]
+    return urls['original']
+
+
+class Model3DVariantHintsMixin:
+    """model_url so'rov sarlavhalariga bog'liq - keshlar uchun Vary va ECT so'rovi"""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        patch_vary_headers(response, CLIENT_HINT_HEADERS)
+        response['Accept-CH'] = 'ECT'
+        return response
+
+
+# Signallar
+
+def _file_name(instance):
+    if 'model_file' not in instance.__dict__:
+        return None
+    value = instance.__dict__['model_file']
+    return getattr(value, 'name', value) or ''
+
+
+def _on_init(sender, instance, **kwargs):
+    instance.__dict__[_STATE_ATTR] = _file_name(instance) if instance.pk is not None else None
+
+
+def _on_pre_save(sender, instance, raw=False, **kwargs):
+    current = _file_name(instance)
+    if raw or not current or current == instance.__dict__.get(_STATE_ATTR):
+        return
+    try:
+        # Saqlanmagan yuklangan fayl uchun ham ishlaydi (diskka yozilishidan oldin)
+        instance.file_size = instance.model_file.size
+    except (OSError, ValueError):
+        pass
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.get(_STATE_ATTR)
+    current = _file_name(instance)
+    instance.__dict__[_STATE_ATTR] = current
+    if not current or not _setting('MODEL3D_PROCESSING_ENABLED', True):
+        return
+    if created or previous != current:
+        background.submit(process_model, instance.pk)
+
+
+def connect_signals():
+    """3D model fayli o'zgarganda o'lcham, tahlil va variantlar"""
+    from .models import Model3D
+
+    post_init.connect(_on_init, sender=Model3D, dispatch_uid='model3d_ingest:init')
+    pre_save.connect(_on_pre_save, sender=Model3D, dispatch_uid='model3d_ingest:pre_save')
+    post_save.connect(_on_save, sender=Model3D, dispatch_uid='model3d_ingest:save')
@@ -1,7 +1,11 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from .storage import get_content_addressed_storage
+
 User = get_user_model()
 
 
@@ -11,6 +15,8 @@ class MaterialCategory(models.Model):
     name = models.CharField(max_length=100, verbose_name='Kategoriya nomi')
     description = models.TextField(blank=True, null=True, verbose_name='Tavsif')
     icon = models.CharField(max_length=50, blank=True, null=True, verbose_name='Ikona')
+    # Signallar orqali yuritiladi (ustoziya_platform.category_lists)
+    public_materials_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Ommaviy materiallar soni')
     
     class Meta:
         verbose_name = 'Material kategoriyasi'
@@ -63,6 +69,7 @@ class Material(models.Model):
     )
     file = models.FileField(
         upload_to='materials/',
+        storage=get_content_addressed_storage,
         verbose_name='Fayl'
     )
     thumbnail = models.ImageField(
@@ -71,6 +78,13 @@ class Material(models.Model):
         null=True,
         verbose_name='Kichik rasm'
     )
+    # Responsiv WebP variantlar: {'source', 'file', 'upload', 'sizes': {kenglik: nom}} (materials.thumbnails)
+    thumbnail_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Kichik rasm variantlari'
+    )
     tags = models.CharField(
         max_length=500,
         blank=True,
@@ -108,6 +122,32 @@ class Material(models.Model):
         verbose_name = 'Material'
         verbose_name_plural = 'Materiallar'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at'],
+                name='material_pub_recent_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['category', '-created_at'],
+                name='material_pub_cat_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['material_type', '-created_at'],
+                name='material_pub_type_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['grade_level', '-created_at'],
+                name='material_pub_grade_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['author', '-created_at'],
+                name='material_author_recent_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.title
@@ -267,6 +307,22 @@ class Assignment(models.Model):
         verbose_name = 'Topshiriq'
         verbose_name_plural = 'Topshiriqlar'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at'],
+                name='assignment_act_recent_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=['category', '-created_at'],
+                name='assignment_act_cat_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=['teacher', '-created_at'],
+                name='assignment_teacher_recent_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.title
@@ -370,6 +426,7 @@ class VideoLesson(models.Model):
     description = models.TextField(verbose_name='Darslik tavsifi')
     video_file = models.FileField(
         upload_to='video_lessons/',
+        storage=get_content_addressed_storage,
         verbose_name='Video fayl'
     )
     thumbnail = models.ImageField(
@@ -378,6 +435,13 @@ class VideoLesson(models.Model):
         null=True,
         verbose_name='Video rasmi'
     )
+    # Responsiv WebP variantlar: {'source', 'file', 'upload', 'sizes': {kenglik: nom}} (materials.thumbnails)
+    thumbnail_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Kichik rasm variantlari'
+    )
     duration = models.PositiveIntegerField(
         default=0,
         verbose_name='Davomiyligi (soniya)'
@@ -429,6 +493,27 @@ class VideoLesson(models.Model):
         verbose_name = 'Video darslik'
         verbose_name_plural = 'Video darsliklar'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at'],
+                name='video_pub_recent_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['category', '-created_at'],
+                name='video_pub_cat_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['subject', '-created_at'],
+                name='video_pub_subject_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['author', '-created_at'],
+                name='video_author_recent_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.title
@@ -452,6 +537,7 @@ class Model3D(models.Model):
     description = models.TextField(verbose_name='Model tavsifi')
     model_file = models.FileField(
         upload_to='3d_models/',
+        storage=get_content_addressed_storage,
         verbose_name='3D model fayli'
     )
     thumbnail = models.ImageField(
@@ -460,6 +546,13 @@ class Model3D(models.Model):
         null=True,
         verbose_name='Model rasmi'
     )
+    # Responsiv WebP variantlar: {'source', 'file', 'upload', 'sizes': {kenglik: nom}} (materials.thumbnails)
+    thumbnail_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Kichik rasm variantlari'
+    )
     model_type = models.CharField(
         max_length=20,
         choices=MODEL_TYPE_CHOICES,
@@ -485,10 +578,38 @@ class Model3D(models.Model):
         max_length=50,
         verbose_name='Fan'
     )
-    file_size = models.PositiveIntegerField(
+    # Fayldan o'lchanadi va tahlil qilinadi (materials.model3d_ingest)
+    file_size = models.PositiveBigIntegerField(
         default=0,
+        editable=False,
         verbose_name='Fayl hajmi (bayt)'
     )
+    vertex_count = models.PositiveBigIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="Cho'qqilar soni"
+    )
+    triangle_count = models.PositiveBigIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Uchburchaklar soni'
+    )
+    # {'min': [x, y, z], 'max': [x, y, z], 'size': [dx, dy, dz]}
+    bounds = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Chegaralar'
+    )
+    # {'source', 'optimized': {'name', 'size', 'compression', 'triangle_count'}, 'preview': {...}}
+    model_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Siqilgan variantlar'
+    )
     is_interactive = models.BooleanField(
         default=False,
         verbose_name='Interaktiv'
@@ -514,6 +635,98 @@ class Model3D(models.Model):
         verbose_name = '3D model'
         verbose_name_plural = '3D modellar'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at'],
+                name='model3d_pub_recent_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['category', '-created_at'],
+                name='model3d_pub_cat_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['model_type', '-created_at'],
+                name='model3d_pub_type_idx',
+                condition=models.Q(is_public=True),
+            ),
+            models.Index(
+                fields=['author', '-created_at'],
+                name='model3d_author_recent_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return self.title
+
+class UploadSession(models.Model):
+    """Bo'laklab (tus uslubida) davom ettiriladigan yuklash"""
+    
+    STATUS_CHOICES = [
+        ('uploading', 'Yuklanmoqda'),
+        ('completed', 'Yuklandi'),
+        ('failed', 'Xatolik'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='Foydalanuvchi'
+    )
+    filename = models.CharField(max_length=255, verbose_name='Fayl nomi')
+    length = models.PositiveBigIntegerField(verbose_name='Umumiy hajm (bayt)')
+    offset = models.PositiveBigIntegerField(default=0, verbose_name='Yuklangan qism (bayt)')
+    checksum = models.CharField(
+        max_length=160,
+        blank=True,
+        default='',
+        verbose_name='Butun fayl nazorat summasi (algoritm:hex)'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='uploading',
+        verbose_name='Holat'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')
+    expires_at = models.DateTimeField(verbose_name='Amal qilish muddati')
+    
+    class Meta:
+        verbose_name = 'Yuklash sessiyasi'
+        verbose_name_plural = 'Yuklash sessiyalari'
+        indexes = [
+            models.Index(fields=['expires_at'], name='upload_expires_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.length})"
+
+
+class MediaBlob(models.Model):
+    """Kontent-manzilli ombordagi fayl (materials.storage) va unga havolalar soni"""
+    
+    name = models.CharField(max_length=100, unique=True, verbose_name='Ombordagi nomi')
+    sha256 = models.CharField(max_length=64, verbose_name='SHA-256')
+    size = models.PositiveBigIntegerField(default=0, verbose_name='Hajmi (bayt)')
+    # Signallar orqali yuritiladi (materials.media_blobs)
+    ref_count = models.PositiveIntegerField(default=0, verbose_name='Havolalar soni')
+    unreferenced_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Havolasiz qolgan vaqt'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')
+    
+    class Meta:
+        verbose_name = 'Media blob'
+        verbose_name_plural = 'Media bloblar'
+        indexes = [
+            models.Index(fields=['ref_count', 'unreferenced_at'], name='mediablob_gc_idx'),
+        ]
     
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f"{self.name} ({self.ref_count})"
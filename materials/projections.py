@@ -0,0 +1,44 @@
+from accounts.models import User
+from ustoziya_platform.projections import Projection
+from .models import Material
+from .serializers import MaterialSerializer
+from .thumbnails import srcset
+
+
+class MaterialProjection(Projection):
+    """MaterialSerializer bilan bir xil natija (values() orqali)"""
+
+    serializer_class = MaterialSerializer
+
+    def get_columns(self):
+        thumbnail_storage = Material._meta.get_field('thumbnail').storage
+        return {
+            'id': self.value('id'),
+            'title': self.value('title'),
+            'description': self.value('description'),
+            'material_type': self.value('material_type'),
+            'material_type_display': self.display('material_type', Material.MATERIAL_TYPE_CHOICES),
+            'category': self.value('category_id'),
+            'category_name': self.value('category__name'),
+            'author': self.value('author_id'),
+            'author_name': self.full_name('author'),
+            'author_subject': self.display('author__subject', User.SUBJECT_CHOICES),
+            'file': self.file(Material, 'file'),
+            'file_url': self.file(Material, 'file', absolute=False),
+            'thumbnail': self.file(Material, 'thumbnail'),
+            'thumbnail_url': self.file(Material, 'thumbnail', absolute=False),
+            'thumbnail_srcset': self.computed(
+                ['thumbnail_variants'], lambda row: srcset(row['thumbnail_variants'], thumbnail_storage)
+            ),
+            'tags': self.value('tags'),
+            'tags_list': self.computed(
+                ['tags'], lambda row: [tag.strip() for tag in row['tags'].split(',')] if row['tags'] else []
+            ),
+            'grade_level': self.value('grade_level'),
+            'is_public': self.value('is_public'),
+            'download_count': self.value('download_count'),
+            'rating': self.value('rating'),
+            'ratings_count': self.value('ratings_count'),
+            'created_at': self.datetime('created_at'),
+            'updated_at': self.datetime('updated_at'),
+        }
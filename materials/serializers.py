@@ -1,32 +1,44 @@
+from django.db.models import Count, Prefetch
+from django.urls import reverse
 from rest_framework import serializers
+from ustoziya_platform.serializers import SparseFieldsetMixin
 from .models import (
     Material, MaterialCategory, MaterialRating, MaterialDownload,
     Assignment, StudentSubmission, VideoLesson, Model3D
 )
+from .model3d_ingest import best_variant, variant_urls
+from .thumbnails import srcset
+from .uploads import ResumableUploadSerializerMixin
 
 
-class MaterialCategorySerializer(serializers.ModelSerializer):
+class MaterialCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Material kategoriya serializeri"""
     
-    materials_count = serializers.SerializerMethodField()
+    materials_count = serializers.IntegerField(source='public_materials_count', read_only=True)
     
     class Meta:
         model = MaterialCategory
         fields = ['id', 'name', 'description', 'icon', 'materials_count']
-    
-    def get_materials_count(self, obj):
-        """Kategoriyadagi materiallar soni"""
-        return obj.materials.filter(is_public=True).count()
 
 
-class MaterialSerializer(serializers.ModelSerializer):
+class MaterialSerializer(SparseFieldsetMixin, ResumableUploadSerializerMixin, serializers.ModelSerializer):
     """Material serializeri"""
     
+    upload_file_field = 'file'
+    
+    query_hints = {
+        'author_name': {'select_related': ['author']},
+        'author_subject': {'select_related': ['author']},
+        'category_name': {'select_related': ['category']},
+        'ratings_count': {'annotate': {'ratings_count': Count('ratings')}},
+    }
+    
     author_name = serializers.SerializerMethodField()
     author_subject = serializers.SerializerMethodField()
     category_name = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
+    thumbnail_srcset = serializers.SerializerMethodField()
     tags_list = serializers.SerializerMethodField()
     material_type_display = serializers.SerializerMethodField()
     ratings_count = serializers.SerializerMethodField()
@@ -36,7 +48,7 @@ class MaterialSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'material_type', 'material_type_display',
             'category', 'category_name', 'author', 'author_name', 'author_subject',
-            'file', 'file_url', 'thumbnail', 'thumbnail_url', 'tags', 'tags_list',
+            'file', 'file_url', 'thumbnail', 'thumbnail_url', 'thumbnail_srcset', 'tags', 'tags_list',
             'grade_level', 'is_public', 'download_count', 'rating', 'ratings_count',
             'created_at', 'updated_at'
         ]
@@ -66,6 +78,10 @@ class MaterialSerializer(serializers.ModelSerializer):
             return obj.thumbnail.url
         return None
     
+    def get_thumbnail_srcset(self, obj):
+        """Kichik rasmning responsiv o'lchamlari (<img srcset>)"""
+        return srcset(obj.thumbnail_variants, obj.thumbnail.storage)
+    
     def get_tags_list(self, obj):
         """Teglarni ro'yxat ko'rinishida qaytaradi"""
         return obj.get_tags_list()
@@ -75,13 +91,34 @@ class MaterialSerializer(serializers.ModelSerializer):
         return obj.get_material_type_display()
     
     def get_ratings_count(self, obj):
-        """Reytinglar soni"""
+        """Reytinglar soni (querysetda annotatsiya qilingan bo'lsa qo'shimcha so'rovsiz)"""
+        if hasattr(obj, 'ratings_count'):
+            return obj.ratings_count
         return obj.ratings.count()
 
 
-class MaterialRatingSerializer(serializers.ModelSerializer):
+class MaterialRefSerializer(serializers.ModelSerializer):
+    """Materialga ixcham havola (id, sarlavha, tur, API manzili)"""
+    
+    type = serializers.CharField(source='material_type', read_only=True)
+    url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Material
+        fields = ['id', 'title', 'type', 'url']
+    
+    def get_url(self, obj):
+        return reverse('material_detail', args=[obj.pk])
+
+
+class MaterialRatingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Material reyting serializeri"""
     
+    query_hints = {
+        'user_name': {'select_related': ['user']},
+        'material_title': {'select_related': ['material']},
+    }
+    
     user_name = serializers.SerializerMethodField()
     material_title = serializers.SerializerMethodField()
     
@@ -102,9 +139,14 @@ class MaterialRatingSerializer(serializers.ModelSerializer):
         return obj.material.title
 
 
-class MaterialDownloadSerializer(serializers.ModelSerializer):
+class MaterialDownloadSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Material yuklab olish serializeri"""
     
+    query_hints = {
+        'user_name': {'select_related': ['user']},
+        'material_title': {'select_related': ['material']},
+    }
+    
     user_name = serializers.SerializerMethodField()
     material_title = serializers.SerializerMethodField()
     
@@ -150,14 +192,25 @@ class MaterialCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class AssignmentSerializer(serializers.ModelSerializer):
-    """Topshiriq serializeri"""
+class AssignmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Topshiriq serializeri
+
+    `materials_list` standart holda ixcham havolalar ro'yxati; to'liq material
+    ma'lumotlari `?expand=materials` bilan qaytariladi.
+    """
+    
+    EXPANDABLE = {'materials'}
+    query_hints = {
+        'teacher_name': {'select_related': ['teacher']},
+        'category_name': {'select_related': ['category']},
+        'submissions_count': {'annotate': {'submissions_count': Count('submissions')}},
+    }
     
     teacher_name = serializers.SerializerMethodField()
     category_name = serializers.SerializerMethodField()
     assignment_type_display = serializers.SerializerMethodField()
     submissions_count = serializers.SerializerMethodField()
-    materials_list = MaterialSerializer(source='materials', many=True, read_only=True)
+    materials_list = MaterialRefSerializer(source='materials', many=True, read_only=True)
     
     class Meta:
         model = Assignment
@@ -169,6 +222,20 @@ class AssignmentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'teacher', 'created_at', 'updated_at']
     
+    @classmethod
+    def expanded(cls, request):
+        """So'rovdagi `?expand=` qiymatlaridan ruxsat etilganlari"""
+        if request is None:
+            return set()
+        values = request.query_params.get('expand', '')
+        return {value.strip() for value in values.split(',')} & cls.EXPANDABLE
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'materials' in self.expanded(self.context.get('request')):
+            fields['materials_list'] = MaterialSerializer(source='materials', many=True, read_only=True)
+        return fields
+    
     def get_teacher_name(self, obj):
         return obj.teacher.get_full_name()
     
@@ -179,12 +246,24 @@ class AssignmentSerializer(serializers.ModelSerializer):
         return obj.get_assignment_type_display()
     
     def get_submissions_count(self, obj):
+        if hasattr(obj, 'submissions_count'):
+            return obj.submissions_count
         return obj.submissions.count()
 
 
-class StudentSubmissionSerializer(serializers.ModelSerializer):
+class StudentSubmissionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """O'quvchi topshirig'i serializeri"""
     
+    query_hints = {
+        'assignment_title': {'select_related': ['assignment']},
+        'graded_by_name': {'select_related': ['graded_by']},
+        'attached_files_list': {'prefetch_related': [
+            Prefetch('attached_files', queryset=Material.objects.select_related('author', 'category').annotate(
+                ratings_count=Count('ratings')
+            )),
+        ]},
+    }
+    
     assignment_title = serializers.SerializerMethodField()
     graded_by_name = serializers.SerializerMethodField()
     status_display = serializers.SerializerMethodField()
@@ -210,13 +289,21 @@ class StudentSubmissionSerializer(serializers.ModelSerializer):
         return obj.get_status_display()
 
 
-class VideoLessonSerializer(serializers.ModelSerializer):
+class VideoLessonSerializer(SparseFieldsetMixin, ResumableUploadSerializerMixin, serializers.ModelSerializer):
     """Video darslik serializeri"""
     
+    upload_file_field = 'video_file'
+    
+    query_hints = {
+        'author_name': {'select_related': ['author']},
+        'category_name': {'select_related': ['category']},
+    }
+    
     author_name = serializers.SerializerMethodField()
     category_name = serializers.SerializerMethodField()
     video_url = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
+    thumbnail_srcset = serializers.SerializerMethodField()
     tags_list = serializers.SerializerMethodField()
     duration_formatted = serializers.SerializerMethodField()
     
@@ -224,7 +311,7 @@ class VideoLessonSerializer(serializers.ModelSerializer):
         model = VideoLesson
         fields = [
             'id', 'title', 'description', 'video_file', 'video_url', 'thumbnail',
-            'thumbnail_url', 'duration', 'duration_formatted', 'category',
+            'thumbnail_url', 'thumbnail_srcset', 'duration', 'duration_formatted', 'category',
             'category_name', 'author', 'author_name', 'grade_level', 'subject',
             'tags', 'tags_list', 'is_public', 'view_count', 'rating', 'created_at'
         ]
@@ -246,6 +333,9 @@ class VideoLessonSerializer(serializers.ModelSerializer):
             return obj.thumbnail.url
         return None
     
+    def get_thumbnail_srcset(self, obj):
+        return srcset(obj.thumbnail_variants, obj.thumbnail.storage)
+    
     def get_tags_list(self, obj):
         if obj.tags:
             return [tag.strip() for tag in obj.tags.split(',')]
@@ -257,26 +347,38 @@ class VideoLessonSerializer(serializers.ModelSerializer):
         return f"{minutes:02d}:{seconds:02d}"
 
 
-class Model3DSerializer(serializers.ModelSerializer):
+class Model3DSerializer(SparseFieldsetMixin, ResumableUploadSerializerMixin, serializers.ModelSerializer):
     """3D model serializeri"""
     
+    upload_file_field = 'model_file'
+    
+    query_hints = {
+        'author_name': {'select_related': ['author']},
+        'category_name': {'select_related': ['category']},
+    }
+    
     author_name = serializers.SerializerMethodField()
     category_name = serializers.SerializerMethodField()
     model_type_display = serializers.SerializerMethodField()
     model_url = serializers.SerializerMethodField()
+    model_variants = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
+    thumbnail_srcset = serializers.SerializerMethodField()
     file_size_formatted = serializers.SerializerMethodField()
     
     class Meta:
         model = Model3D
         fields = [
-            'id', 'title', 'description', 'model_file', 'model_url', 'thumbnail',
-            'thumbnail_url', 'model_type', 'model_type_display', 'category',
+            'id', 'title', 'description', 'model_file', 'model_url', 'model_variants', 'thumbnail',
+            'thumbnail_url', 'thumbnail_srcset', 'model_type', 'model_type_display', 'category',
             'category_name', 'author', 'author_name', 'grade_level', 'subject',
-            'file_size', 'file_size_formatted', 'is_interactive', 'is_public',
+            'file_size', 'file_size_formatted', 'vertex_count', 'triangle_count', 'bounds',
+            'is_interactive', 'is_public', 'download_count', 'rating', 'created_at'
+        ]
+        read_only_fields = [
+            'id', 'author', 'file_size', 'vertex_count', 'triangle_count', 'bounds',
             'download_count', 'rating', 'created_at'
         ]
-        read_only_fields = ['id', 'author', 'download_count', 'rating', 'created_at']
     
     def get_author_name(self, obj):
         return obj.author.get_full_name()
@@ -288,15 +390,21 @@ class Model3DSerializer(serializers.ModelSerializer):
         return obj.get_model_type_display()
     
     def get_model_url(self, obj):
-        if obj.model_file:
-            return obj.model_file.url
-        return None
+        """Mijozga mos variant (?model_variant=, Save-Data, ECT); bo'lmasa asl fayl"""
+        variant = best_variant(variant_urls(obj), self.context.get('request'))
+        return variant['url'] if variant else None
+    
+    def get_model_variants(self, obj):
+        return variant_urls(obj)
     
     def get_thumbnail_url(self, obj):
         if obj.thumbnail:
             return obj.thumbnail.url
         return None
     
+    def get_thumbnail_srcset(self, obj):
+        return srcset(obj.thumbnail_variants, obj.thumbnail.storage)
+    
     def get_file_size_formatted(self, obj):
         """Fayl hajmini formatlash"""
         size = obj.file_size
@@ -0,0 +1,88 @@
+"""
+Kontent-manzilli (content-addressed) fayl ombori.
+
+Material, video darslik va 3D model fayllari nomi bo'yicha emas, SHA-256
+xeshi bo'yicha saqlanadi: `cas/ab/cd/<sha256>.<kengaytma>`. Bir xil fayl
+qayta yuklansa disk'ka ikkinchi marta yozilmaydi - yangi yozuv mavjud blob'ga
+ishora qiladi. Fayl mazmuni nomidan aniqlanadigani uchun URL'larni muddatsiz
+keshlash mumkin (`Cache-Control: public, max-age=31536000, immutable`;
+nginx'da `location /media/cas/` uchun shu sarlavha qo'yiladi).
+
+Blob'ga nechta yozuv ishora qilishini `MediaBlob.ref_count` yuritadi
+(`materials.media_blobs`); omborning `delete()` metodi cas/ fayllarini
+o'chirmaydi, ularni faqat `collect_media_blobs` buyrug'i xavfsiz tekshiruvdan
+keyin o'chiradi.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CAS_PREFIX = 'cas'
+READ_SIZE = 1024 * 1024
+
+_CAS_NAME = re.compile(rf'^{CAS_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/(?P<digest>[0-9a-f]{{64}})(\.[\w-]+)?$')
+
+
+def blob_digest(name):
+    """cas/ nomidan SHA-256 xeshi (boshqa nomlar uchun None)"""
+    match = _CAS_NAME.match(name or '')
+    return match.group('digest') if match else None
+
+
+def blob_name(digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    if not re.fullmatch(r'\.[\w-]{1,15}', extension):
+        extension = ''
+    return f'{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """MEDIA_ROOT dagi FileSystemStorage; yangi fayllar cas/ ostida xesh nomi bilan"""
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _digest(self, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'temporary_file_path'):
+            with open(content.temporary_file_path(), 'rb') as stream:
+                for block in iter(lambda: stream.read(READ_SIZE), b''):
+                    digest.update(block)
+        else:
+            for block in content.chunks(READ_SIZE):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _save(self, name, content):
+        target = blob_name(self._digest(content), name)
+        target_path = self.path(target)
+        if os.path.exists(target_path):
+            # Blob allaqachon bor: yozilmaydi, GC yaqinda ishlatilganini ko'radi
+            os.utime(target_path)
+            return target
+        # Avval noyob vaqtinchalik nomga, keyin atomar rename (parallel yuklashlar xavfsiz)
+        temporary = super()._save(f'{CAS_PREFIX}/tmp/{uuid.uuid4().hex}', content)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.replace(self.path(temporary), target_path)
+        return target
+
+    def delete(self, name):
+        if blob_digest(name):
+            return  # Umumiy blob - faqat collect_media_blobs o'chiradi
+        super().delete(name)
+
+    def purge(self, name):
+        """Blob faylini haqiqatan o'chiradi (faqat GC uchun)"""
+        super().delete(name)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    return content_addressed_storage
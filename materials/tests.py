@@ -1,3 +1,628 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from ustoziya_platform.testing import TemporaryMediaMixin
+
+from . import media_blobs, model3d_ingest, thumbnails, views
+from .ai_providers import FakeProvider, ProviderRouter
+from .management.commands.explain_hot_queries import Command as ExplainHotQueriesCommand, hot_queries
+from .models import Material, MaterialCategory, MediaBlob, UploadSession
+from .storage import get_content_addressed_storage
+from .uploads import temp_path
+
+
+class ProviderRouterTests(SimpleTestCase):
+    """AI provayder router: navbat, hedged so'rov va xatoliklar (oflayn, FakeProvider)"""
+
+    def make_router(self, providers, **kwargs):
+        kwargs.setdefault('hedge_min_samples', 3)
+        return ProviderRouter({provider.name: provider for provider in providers}, **kwargs)
+
+    def warm_up(self, router, name, latency=0.01):
+        for _ in range(router.hedge_min_samples):
+            router.stats[name].record_success(latency)
+
+    def test_uses_first_provider_in_order(self):
+        first, second = FakeProvider('first'), FakeProvider('second')
+        text, name = self.make_router([first, second]).generate('sys', 'salom')
+        self.assertEqual((text, name), ('[first] salom', 'first'))
+        self.assertEqual(second.calls, 0)
+
+    def test_falls_back_in_order_on_error(self):
+        broken, second, third = FakeProvider('broken', fail=True), FakeProvider('second'), FakeProvider('third')
+        text, name = self.make_router([broken, second, third]).generate('sys', 'salom')
+        self.assertEqual(name, 'second')
+        self.assertEqual((broken.calls, second.calls, third.calls), (1, 1, 0))
+
+    def test_open_circuit_skips_provider(self):
+        broken, healthy = FakeProvider('broken', fail=True), FakeProvider('healthy')
+        router = self.make_router([broken, healthy], failure_threshold=2, cooldown=60)
+        for _ in range(2):
+            router.generate('sys', 'salom')
+        router.generate('sys', 'salom')
+        self.assertEqual(broken.calls, 2)
+        self.assertEqual(router.primary_provider(), 'healthy')
+
+    def test_all_failures_raise_last_error(self):
+        router = self.make_router([FakeProvider('a', fail=True), FakeProvider('b', fail=True)])
+        with self.assertRaisesMessage(ValueError, 'b soxta provayderi xatolik qaytardi.'):
+            router.generate('sys', 'salom')
+
+    def test_no_hedge_during_warm_up_without_default_delay(self):
+        slow, fast = FakeProvider('slow', latency=0.2), FakeProvider('fast')
+        text, name = self.make_router([slow, fast]).generate('sys', 'salom')
+        self.assertEqual(name, 'slow')
+        self.assertEqual(fast.calls, 0)
+
+    def test_hedges_to_next_provider_after_p95(self):
+        slow, fast = FakeProvider('slow', latency=0.5), FakeProvider('fast')
+        router = self.make_router([slow, fast])
+        self.warm_up(router, 'slow')
+        started = time.monotonic()
+        text, name = router.generate('sys', 'salom')
+        self.assertEqual(name, 'fast')
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_default_delay_hedges_during_warm_up(self):
+        slow, fast = FakeProvider('slow', latency=0.5), FakeProvider('fast')
+        text, name = self.make_router([slow, fast], default_hedge_delay=0.05).generate('sys', 'salom')
+        self.assertEqual(name, 'fast')
+
+    def test_losing_call_waiting_for_slot_is_cancelled(self):
+        entered = []
+
+        @contextmanager
+        def call_slot(cancelled):
+            entered.append(time.monotonic())
+            if len(entered) > 1:
+                # Ikkinchi chaqiruv slot bo'shashini kutadi
+                cancelled.wait(1)
+            yield
+
+        primary, hedge = FakeProvider('primary', latency=0.2), FakeProvider('hedge')
+        router = self.make_router([primary, hedge], default_hedge_delay=0.05, call_slot=call_slot)
+        text, name = router.generate('sys', 'salom')
+        self.assertEqual(name, 'primary')
+        time.sleep(0.05)
+        self.assertEqual(len(entered), 2)
+        self.assertEqual(hedge.calls, 0)
+
+    def test_slot_error_propagates_without_failover(self):
+        class Busy(Exception):
+            pass
+
+        @contextmanager
+        def call_slot(cancelled):
+            raise Busy('band')
+            yield  # pragma: no cover
+
+        first, second = FakeProvider('first'), FakeProvider('second')
+        router = self.make_router([first, second], failure_threshold=1, call_slot=call_slot)
+        with self.assertRaises(Busy):
+            router.generate('sys', 'salom')
+        self.assertEqual((first.calls, second.calls), (0, 0))
+        self.assertFalse(router.stats['first'].is_open(router.cooldown))
+
+    def test_hedge_timer_starts_after_slot_is_acquired(self):
+        gate = threading.Event()
+
+        @contextmanager
+        def call_slot(cancelled):
+            gate.wait(1)
+            yield
+
+        primary, hedge = FakeProvider('primary', latency=0.05), FakeProvider('hedge')
+        router = self.make_router([primary, hedge], default_hedge_delay=0.2, call_slot=call_slot)
+        threading.Timer(0.3, gate.set).start()
+        text, name = router.generate('sys', 'salom')
+        self.assertEqual(name, 'primary')
+        self.assertEqual(hedge.calls, 0)
+
+
+class AIImageStorageTests(TemporaryMediaMixin, SimpleTestCase):
+    """AI rasmlari provayder qaytargan formatda saqlanadi va beriladi"""
+
+    def setUp(self):
+        super().setUp()
+
+    def encoded(self, image_format):
+        stream = io.BytesIO()
+        Image.new('RGB', (40, 30), (200, 10, 10)).save(stream, format=image_format)
+        return base64.b64encode(stream.getvalue()).decode()
+
+    def test_jpeg_is_stored_and_served_as_jpeg(self):
+        result = views._store_ai_image(self.encoded('JPEG'))
+        self.assertTrue(result['image_url'].endswith('.jpg'))
+        name = result['image_url'].split('/ai-images/', 1)[1]
+        response = views.ai_image_file(RequestFactory().get('/'), name)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        response.close()
+
+    def test_webp_keeps_its_format(self):
+        result = views._store_ai_image(self.encoded('WEBP'))
+        self.assertTrue(result['image_url'].endswith('.webp'))
+        self.assertTrue(result['image_thumbnail_url'].endswith('_thumb.webp'))
+
+    def test_non_image_payload_is_rejected(self):
+        with self.assertRaises(ValueError):
+            views._store_ai_image(base64.b64encode(b'not an image').decode())
+
+
+@skipUnless(connection.vendor == 'postgresql', "Shartli indekslar rejasi faqat PostgreSQL'da tekshiriladi")
+class HotQueryIndexTests(TestCase):
+    """Ro'yxat so'rovlari EXPLAIN rejasida yangi indekslardan foydalanadi"""
+
+    def test_hot_queries_use_their_indexes(self):
+        command = ExplainHotQueriesCommand()
+        for index_name, queryset in hot_queries():
+            with self.subTest(index=index_name):
+                self.assertIn(index_name, command.explain(queryset))
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=False)
+class SparseFieldsetTests(TemporaryMediaMixin, TestCase):
+    """`?fields=` / `?omit=`: tanlangan maydonlar va noma'lum nomlar uchun 400"""
+
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create_user(username='author', password='parol12345')
+        Material.objects.create(
+            title='Kasrlar', description='', material_type='presentation',
+            category=MaterialCategory.objects.create(name='Matematika'),
+            author=author, file=ContentFile(b'slayd', name='kasrlar.pdf'),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(author)
+
+    def test_selected_fields_only(self):
+        for fast_path in (True, False):
+            with self.subTest(fast_path=fast_path), override_settings(FAST_READ_PATH_ENABLED=fast_path):
+                response = self.client.get('/api/materials/', {'fields': 'id,title'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.json()[0]), ['id', 'title'])
+
+    def test_unknown_fields_are_rejected(self):
+        for fast_path in (True, False):
+            with self.subTest(fast_path=fast_path), override_settings(FAST_READ_PATH_ENABLED=fast_path):
+                response = self.client.get('/api/materials/', {'fields': 'bogus,title'})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'fields': ["Noma'lum maydon: bogus"]})
+
+    def test_unknown_omit_is_rejected(self):
+        response = self.client.get('/api/materials/', {'omit': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('omit', response.json())
+
+    def test_cached_category_list_rejects_unknown_fields(self):
+        self.assertEqual(self.client.get('/api/materials/categories/', {'fields': 'name'}).status_code, 200)
+        self.assertEqual(self.client.get('/api/materials/categories/', {'fields': 'bogus'}).status_code, 400)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=False)
+class ConditionalListTests(TemporaryMediaMixin, TestCase):
+    """Ro'yxat ETag'i updated_at ni o'zgartirmaydigan yozuvlardan keyin ham yangilanadi"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='parol12345')
+        self.category = MaterialCategory.objects.create(name='Matematika')
+        self.material = Material.objects.create(
+            title='Kasrlar', description='', material_type='presentation',
+            category=self.category, author=self.author, file=ContentFile(b'slayd', name='kasrlar.pdf'),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def assert_refreshed(self, etag, field, expected):
+        response = self.client.get('/api/materials/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0][field], expected)
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.client.get('/api/materials/')['ETag']
+        self.assertEqual(self.client.get('/api/materials/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_download_changes_etag(self):
+        etag = self.client.get('/api/materials/')['ETag']
+        response = self.client.get(f'/api/materials/{self.material.pk}/download/')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assert_refreshed(etag, 'download_count', 1)
+
+    def test_rating_changes_etag(self):
+        etag = self.client.get('/api/materials/')['ETag']
+        self.assertEqual(self.client.post(f'/api/materials/{self.material.pk}/rate/', {'rating': 4}).status_code, 200)
+        self.assert_refreshed(etag, 'ratings_count', 1)
+
+    def test_category_rename_changes_etag(self):
+        etag = self.client.get('/api/materials/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Algebra'
+            self.category.save()
+        self.assert_refreshed(etag, 'category_name', 'Algebra')
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=False)
+class ResumableUploadTests(TemporaryMediaMixin, TestCase):
+    """tus yuklash: sessiya, bo'laklar, davom ettirish va upload_id bilan material yaratish"""
+
+    content = b'0123456789' * 10
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='teacher', password='parol12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def metadata(self, **values):
+        return ','.join(f'{key} {base64.b64encode(value.encode()).decode()}' for key, value in values.items())
+
+    def create(self, length=None, **metadata):
+        metadata.setdefault('filename', 'dars.pdf')
+        response = self.client.post(
+            '/api/materials/uploads/', HTTP_TUS_RESUMABLE='1.0.0',
+            HTTP_UPLOAD_LENGTH=str(len(self.content) if length is None else length),
+            HTTP_UPLOAD_METADATA=self.metadata(**metadata),
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def patch(self, upload_id, chunk, offset, **headers):
+        return self.client.generic(
+            'PATCH', f'/api/materials/uploads/{upload_id}/', chunk,
+            content_type='application/offset+octet-stream',
+            HTTP_TUS_RESUMABLE='1.0.0', HTTP_UPLOAD_OFFSET=str(offset), **headers,
+        )
+
+    def test_chunks_resume_from_reported_offset(self):
+        upload_id = self.create()
+        response = self.patch(upload_id, self.content[:40], 0)
+        self.assertEqual((response.status_code, response['Upload-Offset']), (204, '40'))
+
+        # Aloqa uzildi: mijoz HEAD bilan qabul qilingan joyni so'raydi
+        head = self.client.head(f'/api/materials/uploads/{upload_id}/', HTTP_TUS_RESUMABLE='1.0.0')
+        self.assertEqual((head['Upload-Offset'], head['Upload-Length']), ('40', '100'))
+
+        self.assertEqual(self.patch(upload_id, self.content[40:], 40).status_code, 204)
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual((session.status, session.offset), ('completed', 100))
+        with open(temp_path(session), 'rb') as stream:
+            self.assertEqual(stream.read(), self.content)
+
+    def test_offset_mismatch_is_rejected(self):
+        upload_id = self.create()
+        self.patch(upload_id, self.content[:40], 0)
+        response = self.patch(upload_id, self.content[30:60], 30)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).offset, 40)
+
+    def test_chunk_checksum_mismatch_discards_chunk(self):
+        upload_id = self.create()
+        wrong = base64.b64encode(hashlib.sha256(b'boshqa').digest()).decode()
+        response = self.patch(upload_id, self.content[:40], 0, HTTP_UPLOAD_CHECKSUM=f'sha256 {wrong}')
+        self.assertEqual(response.status_code, 460)
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual(session.offset, 0)
+        self.assertEqual(os.path.getsize(temp_path(session)), 0)
+
+    def test_whole_file_checksum_is_verified(self):
+        upload_id = self.create(checksum=f'sha256 {hashlib.sha256(b"boshqa").hexdigest()}')
+        self.assertEqual(self.patch(upload_id, self.content, 0).status_code, 460)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, 'failed')
+
+    def test_completed_upload_creates_material(self):
+        upload_id = self.create(checksum=f'sha256 {hashlib.sha256(self.content).hexdigest()}')
+        self.patch(upload_id, self.content, 0)
+        session = UploadSession.objects.get(pk=upload_id)
+        response = self.client.post('/api/materials/create/', {
+            'title': 'Kasrlar', 'description': 'Dars', 'material_type': 'presentation',
+            'category': MaterialCategory.objects.create(name='Matematika').pk, 'upload_id': upload_id,
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        material = Material.objects.get(pk=response.json()['id'])
+        with material.file.open('rb') as stream:
+            self.assertEqual(stream.read(), self.content)
+        # Sessiya va vaqtinchalik fayl yopiladi
+        self.assertFalse(UploadSession.objects.filter(pk=upload_id).exists())
+        self.assertFalse(os.path.exists(temp_path(session)))
+
+    def test_incomplete_upload_cannot_be_used(self):
+        upload_id = self.create()
+        self.patch(upload_id, self.content[:10], 0)
+        response = self.client.post('/api/materials/create/', {
+            'title': 'Kasrlar', 'description': 'Dars', 'material_type': 'presentation',
+            'category': MaterialCategory.objects.create(name='Matematika').pk, 'upload_id': upload_id,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('upload_id', response.json())
+
+    def test_other_users_cannot_see_upload(self):
+        upload_id = self.create()
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='other', password='parol12345'))
+        response = other.head(f'/api/materials/uploads/{upload_id}/', HTTP_TUS_RESUMABLE='1.0.0')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=False, MODEL3D_PROCESSING_ENABLED=False)
+class MediaBlobTests(TemporaryMediaMixin, TestCase):
+    """Kontent-manzilli ombor: deduplikatsiya, havolalar soni va xavfsiz GC"""
+
+    def setUp(self):
+        super().setUp()
+        self.storage = get_content_addressed_storage()
+        self.author = User.objects.create_user(username='author', password='parol12345')
+        self.category = MaterialCategory.objects.create(name='Matematika')
+
+    def material(self, content, name='dars.pdf'):
+        return Material.objects.create(
+            title='Dars', description='', material_type='presentation', category=self.category,
+            author=self.author, file=ContentFile(content, name=name),
+        )
+
+    def blob(self, name):
+        return MediaBlob.objects.get(name=name)
+
+    def test_identical_files_share_one_blob(self):
+        first, second = self.material(b'slayd'), self.material(b'slayd', name='nusxa.pdf')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith('cas/'))
+        self.assertEqual(self.blob(first.file.name).ref_count, 2)
+
+    def test_delete_and_replace_adjust_ref_count(self):
+        first, second = self.material(b'slayd'), self.material(b'slayd')
+        name = first.file.name
+        first.delete()
+        self.assertEqual(self.blob(name).ref_count, 1)
+
+        second.file = ContentFile(b'yangi slayd', name='dars.pdf')
+        second.save()
+        blob = self.blob(name)
+        self.assertEqual(blob.ref_count, 0)
+        self.assertIsNotNone(blob.unreferenced_at)
+        self.assertEqual(self.blob(second.file.name).ref_count, 1)
+        # Fayl darhol o'chirilmaydi - faqat GC o'chiradi
+        self.assertTrue(self.storage.exists(name))
+
+    def test_collect_waits_for_grace_period(self):
+        name = self.material(b'slayd').file.name
+        Material.objects.get(file=name).delete()
+        self.assertEqual(media_blobs.collect(grace_hours=24), (0, 0))
+        self.assertTrue(self.storage.exists(name))
+
+        MediaBlob.objects.filter(name=name).update(unreferenced_at=timezone.now() - timedelta(hours=25))
+        os.utime(self.storage.path(name), (0, 0))
+        self.assertEqual(media_blobs.collect(grace_hours=24), (1, len(b'slayd')))
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_collect_never_deletes_referenced_blob(self):
+        name = self.material(b'slayd').file.name
+        # Hisoblagich signalsiz (update) o'zgarishlar tufayli eskirgan
+        MediaBlob.objects.filter(name=name).update(
+            ref_count=0, unreferenced_at=timezone.now() - timedelta(hours=25),
+        )
+        os.utime(self.storage.path(name), (0, 0))
+        self.assertEqual(media_blobs.collect(grace_hours=24), (0, 0))
+        self.assertTrue(self.storage.exists(name))
+        blob = self.blob(name)
+        self.assertEqual((blob.ref_count, blob.unreferenced_at), (1, None))
+
+    def test_legacy_files_are_migrated_into_the_store(self):
+        material = self.material(b'slayd')
+        legacy = 'materials/eski.pdf'
+        os.makedirs(os.path.dirname(self.storage.path(legacy)), exist_ok=True)
+        with open(self.storage.path(legacy), 'wb') as stream:
+            stream.write(b'eski slayd')
+        Material.objects.filter(pk=material.pk).update(file=legacy)
+
+        self.assertEqual(media_blobs.migrate_legacy_files('materials.Material'), 1)
+        media_blobs.recount()
+        material.refresh_from_db()
+        self.assertTrue(material.file.name.startswith('cas/'))
+        self.assertFalse(os.path.exists(self.storage.path(legacy)))
+        self.assertEqual(self.blob(material.file.name).ref_count, 1)
+
+
+def _glb(document):
+    """Faqat JSON bo'lagidan iborat GLB (buferlar tahlil uchun kerak emas)"""
+    payload = json.dumps(document).encode()
+    payload += b' ' * (-len(payload) % 4)
+    header = struct.pack('<4sII', b'glTF', 2, 12 + 8 + len(payload))
+    return header + struct.pack('<II', len(payload), model3d_ingest.GLB_JSON_CHUNK) + payload
+
+
+class Model3DIngestTests(TemporaryMediaMixin, SimpleTestCase):
+    """3D model tahlili (OBJ, STL, GLB, PLY) va mijozga mos variant tanlash"""
+
+    triangles = [
+        ((0, 0, 0), (1, 0, 0), (1, 1, 0)),
+        ((0, 0, 0), (1, 1, 0), (0, 1, 2)),
+    ]
+    bounds = {'min': [0.0, 0.0, 0.0], 'max': [1.0, 1.0, 2.0], 'size': [1.0, 1.0, 2.0]}
+
+    def fixture(self, name, content):
+        os.makedirs(self.media_root, exist_ok=True)
+        path = os.path.join(self.media_root, name)
+        with open(path, 'wb') as stream:
+            stream.write(content)
+        return path
+
+    def test_obj(self):
+        path = self.fixture('model.obj', b'# ikki uchburchak\nv 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 2\nf 1 2 3\nf 1 3 4\n')
+        self.assertEqual(model3d_ingest.analyze_obj(path),
+                         {'vertex_count': 4, 'triangle_count': 2, 'bounds': self.bounds})
+
+    def test_obj_polygons_are_fanned(self):
+        path = self.fixture('quad.obj', b'v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nf 1/1 2/2 3/3 4/4\n')
+        self.assertEqual(model3d_ingest.analyze_obj(path)['triangle_count'], 2)
+
+    def test_binary_stl(self):
+        records = b''.join(
+            model3d_ingest.STL_RECORD.pack(0, 0, 1, *a, *b, *c, 0) for a, b, c in self.triangles
+        )
+        path = self.fixture('model.stl', b'\0' * 80 + struct.pack('<I', 2) + records)
+        self.assertEqual(model3d_ingest.analyze_stl(path),
+                         {'vertex_count': 6, 'triangle_count': 2, 'bounds': self.bounds})
+
+    def test_ascii_stl(self):
+        facets = ''.join(
+            'facet normal 0 0 1\n outer loop\n'
+            + ''.join(f'  vertex {x} {y} {z}\n' for x, y, z in triangle)
+            + ' endloop\nendfacet\n'
+            for triangle in self.triangles
+        )
+        path = self.fixture('model.stl', f'solid model\n{facets}endsolid model\n'.encode())
+        self.assertEqual(model3d_ingest.analyze_stl(path),
+                         {'vertex_count': 6, 'triangle_count': 2, 'bounds': self.bounds})
+
+    def test_glb_applies_node_transforms(self):
+        half = math.sqrt(0.5)
+        document = {
+            'asset': {'version': '2.0'},
+            'accessors': [
+                {'count': 4, 'type': 'VEC3', 'componentType': 5126, 'min': [0, 0, 0], 'max': [1, 1, 1]},
+                {'count': 6, 'type': 'SCALAR', 'componentType': 5123},
+            ],
+            'meshes': [{'primitives': [{'attributes': {'POSITION': 0}, 'indices': 1}]}],
+            # Ota tugun siljitadi, bola tugun 2 marta kattalashtirib Z atrofida 90° buradi
+            'nodes': [
+                {'translation': [10, 0, 0], 'children': [1]},
+                {'mesh': 0, 'scale': [2, 2, 2], 'rotation': [0, 0, half, half]},
+            ],
+            'scenes': [{'nodes': [0]}],
+            'scene': 0,
+        }
+        result = model3d_ingest.analyze_gltf(self.fixture('model.glb', _glb(document)))
+        self.assertEqual((result['vertex_count'], result['triangle_count']), (4, 2))
+        self.assertEqual(result['bounds'], {'min': [8.0, 0.0, 0.0], 'max': [10.0, 2.0, 2.0], 'size': [2.0, 2.0, 2.0]})
+
+    def test_ply_header(self):
+        header = (b'ply\nformat binary_little_endian 1.0\nelement vertex 4\nproperty float x\n'
+                  b'element face 2\nproperty list uchar int vertex_indices\nend_header\n')
+        path = self.fixture('model.ply', header + b'\x00' * 16)
+        self.assertEqual(model3d_ingest.analyze_ply(path), {'vertex_count': 4, 'triangle_count': 2, 'bounds': {}})
+
+    def test_unreadable_file_is_not_analyzed(self):
+        self.assertIsNone(model3d_ingest.analyze(self.fixture('broken.glb', b'glTF buzilgan'), '.glb'))
+
+    def request(self, query='', **headers):
+        return Request(RequestFactory().get(f'/{query}', **headers))
+
+    def test_best_variant_follows_client_hints(self):
+        urls = {kind: {'url': f'/{kind}.glb'} for kind in model3d_ingest.VARIANT_CHOICES}
+        cases = [
+            (self.request(), 'optimized'),
+            (self.request(HTTP_SAVE_DATA='on'), 'preview'),
+            (self.request(HTTP_ECT='2g'), 'preview'),
+            (self.request(HTTP_ECT='4g'), 'optimized'),
+            (self.request('?model_variant=original', HTTP_SAVE_DATA='on'), 'original'),
+        ]
+        for request, expected in cases:
+            with self.subTest(expected=expected):
+                self.assertEqual(model3d_ingest.best_variant(urls, request), urls[expected])
+
+    def test_best_variant_falls_back_to_heavier_variant(self):
+        urls = {'original': {'url': '/original.glb'}, 'optimized': {'url': '/optimized.glb'}}
+        self.assertEqual(model3d_ingest.best_variant(urls, self.request(HTTP_SAVE_DATA='on')), urls['optimized'])
+        self.assertEqual(model3d_ingest.best_variant({'original': urls['original']}), urls['original'])
+        self.assertIsNone(model3d_ingest.best_variant({}))
+
+
+class Model3DVaryTests(TestCase):
+    """3D model javoblari mijoz maslahatlariga bog'liq - Vary va Accept-CH"""
+
+    def test_list_varies_on_client_hints(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='viewer', password='parol12345'))
+        response = client.get('/api/materials/3d-models/')
+        self.assertEqual(response.status_code, 200)
+        vary = {value.strip().lower() for value in response['Vary'].split(',')}
+        self.assertTrue({'save-data', 'ect'} <= vary)
+        self.assertEqual(response['Accept-CH'], 'ECT')
+
+
+def _image_bytes(size, format='PNG'):
+    stream = io.BytesIO()
+    Image.new('RGB', size, (200, 40, 40)).save(stream, format=format)
+    return stream.getvalue()
+
+
+@override_settings(
+    BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=True, MODEL3D_PROCESSING_ENABLED=False,
+    MEDIA_THUMBNAIL_WIDTHS=[320, 640, 1280], MEDIA_THUMBNAIL_DEFAULT_WIDTH=640,
+)
+class ThumbnailGenerationTests(TemporaryMediaMixin, TestCase):
+    """Yuklangan fayldan WebP kichik rasmlar (eager rejimda) va srcset"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='parol12345')
+        self.category = MaterialCategory.objects.create(name='Matematika')
+
+    def material(self, content, name):
+        material = Material.objects.create(
+            title='Kasrlar', description='', material_type='handout', category=self.category,
+            author=self.author, file=ContentFile(content, name=name),
+        )
+        material.refresh_from_db()
+        return material
+
+    def assert_variants(self, material, source, widths):
+        variants = material.thumbnail_variants
+        self.assertEqual(variants['source'], source)
+        self.assertEqual(variants['file'], material.file.name)
+        self.assertEqual(sorted(variants['sizes'], key=int), [str(width) for width in widths])
+        storage = material.thumbnail.storage
+        for width, name in variants['sizes'].items():
+            self.assertTrue(name.endswith(f'-{width}w.webp'))
+            with storage.open(name) as stream, Image.open(stream) as image:
+                self.assertEqual((image.format, image.width), ('WEBP', int(width)))
+        self.assertEqual(material.thumbnail.name, variants['sizes']['640'])
+
+    def test_image_upload(self):
+        material = self.material(_image_bytes((1000, 500)), 'rasm.png')
+        # 1000px dan katta variant (1280) yaratilmaydi - kattalashtirilmaydi
+        self.assert_variants(material, 'file', [320, 640])
+        with material.thumbnail.open('rb') as stream, Image.open(stream) as image:
+            self.assertEqual(image.size, (640, 320))
+
+        client = APIClient()
+        client.force_authenticate(self.author)
+        row = client.get(f'/api/materials/{material.pk}/').json()
+        storage = material.thumbnail.storage
+        sizes = material.thumbnail_variants['sizes']
+        self.assertEqual(row['thumbnail_srcset'], f"{storage.url(sizes['320'])} 320w, {storage.url(sizes['640'])} 640w")
+        self.assertEqual(row['thumbnail_url'], storage.url(sizes['640']))
+
+    @skipUnless(thumbnails.fitz is not None or shutil.which('pdftoppm'), 'PDF renderer (PyMuPDF/pdftoppm) yo\'q')
+    def test_pdf_upload(self):
+        material = self.material(_image_bytes((1700, 2200), format='PDF'), 'dars.pdf')
+        self.assert_variants(material, 'file', [320, 640, 1280])
+
+    def test_unrenderable_file_gets_placeholder(self):
+        material = self.material(b'oddiy matn', 'izoh.txt')
+        self.assert_variants(material, 'placeholder', [320, 640, 1280])
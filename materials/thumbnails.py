@@ -0,0 +1,403 @@
+"""
+Yuklangan materiallar uchun kichik rasmlar (thumbnail) va oldindan ko'rish.
+
+Material, video darslik yoki 3D model saqlanganda (fayl yoki qo'lda
+yuklangan rasm o'zgarganda) fon thread pool'iga vazifa qo'yiladi - yuklash
+so'rovi render kutmaydi. Vazifa manba rasmni oladi:
+
+* qo'lda yuklangan thumbnail bo'lsa - o'zi;
+* rasm fayllari - o'zi;
+* PDF - birinchi sahifa (PyMuPDF yoki `pdftoppm`);
+* PPTX/DOCX va boshqa ofis hujjatlari - birinchi slayd/sahifa (LibreOffice
+  `soffice`), bo'lmasa fayl ichidagi `docProps/thumbnail` yoki birinchi
+  slayddagi eng katta rasm;
+* video - poster kadr (`ffmpeg`, bo'lmasa OpenCV);
+* 3D modellar va qolganlar - turi va sarlavhasi yozilgan placeholder.
+
+Natija MEDIA_THUMBNAIL_WIDTHS kengliklarida WebP formatida, nomi kontent
+xeshidan (`<xesh>-<kenglik>w.webp`) saqlanadi: bir xil rasm qayta
+yozilmaydi va URL'larni muddatsiz keshlash mumkin. `thumbnail` maydoni
+MEDIA_THUMBNAIL_DEFAULT_WIDTH ga eng yaqin variantga, `thumbnail_variants`
+esa barcha o'lchamlarga ishora qiladi (serializer'da `thumbnail_srcset`).
+`generate_thumbnails` buyrug'i mavjud yozuvlar uchun rasmlarni yaratadi.
+"""
+import hashlib
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_init, post_save
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from ustoziya_platform import background
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover - optional dependency
+    fitz = None
+
+try:
+    import cv2
+except ImportError:  # pragma: no cover - optional dependency
+    cv2 = None
+
+try:
+    from pptx import Presentation
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+except ImportError:  # pragma: no cover - optional dependency
+    Presentation = None
+
+logger = logging.getLogger(__name__)
+
+# Model -> asosiy fayl maydoni
+THUMBNAIL_SOURCES = {
+    'materials.Material': 'file',
+    'materials.VideoLesson': 'video_file',
+    'materials.Model3D': 'model_file',
+}
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+VIDEO_EXTENSIONS = {'.mp4', '.webm', '.mov', '.avi', '.mkv', '.m4v', '.mpeg', '.mpg', '.ogv'}
+OFFICE_EXTENSIONS = {'.pptx', '.ppt', '.potx', '.odp', '.docx', '.doc', '.odt', '.rtf', '.xlsx', '.xls', '.ods'}
+MODEL_3D_EXTENSIONS = {'.glb', '.gltf', '.obj', '.fbx', '.stl', '.dae', '.3ds', '.ply'}
+
+# Placeholder fon ranglari (fayl turi bo'yicha)
+PLACEHOLDER_COLORS = {
+    'pdf': (192, 57, 43),
+    'office': (41, 128, 185),
+    'video': (44, 62, 80),
+    '3d': (142, 68, 173),
+    'other': (127, 140, 141),
+}
+
+# Yozuvning signallar uchun eslab qolingan holati: (fayl nomi, thumbnail nomi)
+_STATE_ATTR = '_thumbnail_state'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _binary(setting_name, default):
+    return shutil.which(_setting(setting_name, default) or '')
+
+
+def _run(args):
+    subprocess.run(
+        args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        timeout=_setting('MEDIA_RENDER_TIMEOUT', 60),
+    )
+
+
+@contextmanager
+def _local_path(field_file):
+    """Fayl diskdagi yo'li (masofaviy storage bo'lsa vaqtinchalik nusxa)"""
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+    if path:
+        yield path
+        return
+    suffix = os.path.splitext(field_file.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        with field_file.open('rb') as source:
+            shutil.copyfileobj(source, tmp)
+        tmp.flush()
+        yield tmp.name
+
+
+def _open_image(path_or_file):
+    with Image.open(path_or_file) as image:
+        image.load()
+        return ImageOps.exif_transpose(image)
+
+
+# Manba rasmlar
+
+def _render_pdf(path):
+    if fitz is not None:
+        with fitz.open(path) as document:
+            pixmap = document[0].get_pixmap(dpi=110)
+            return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+    pdftoppm = _binary('MEDIA_PDFTOPPM_BINARY', 'pdftoppm')
+    if pdftoppm:
+        with tempfile.TemporaryDirectory() as workdir:
+            prefix = os.path.join(workdir, 'page')
+            _run([pdftoppm, '-png', '-f', '1', '-l', '1', '-singlefile',
+                  '-scale-to', str(max(_widths())), path, prefix])
+            return _open_image(f'{prefix}.png')
+    return None
+
+
+def _embedded_ooxml_thumbnail(path):
+    """PPTX/DOCX ichida saqlangan kichik rasm (docProps/thumbnail.*)"""
+    if not zipfile.is_zipfile(path):
+        return None
+    with zipfile.ZipFile(path) as archive:
+        for name in archive.namelist():
+            if name.lower().startswith('docprops/thumbnail.'):
+                try:
+                    return _open_image(io.BytesIO(archive.read(name)))
+                except (OSError, Image.DecompressionBombError):
+                    return None
+    return None
+
+
+def _first_slide_picture(path):
+    """Birinchi slayddagi eng katta rasm"""
+    if Presentation is None or not path.lower().endswith(('.pptx', '.potx')):
+        return None
+    presentation = Presentation(path)
+    if not presentation.slides:
+        return None
+    pictures = [shape for shape in presentation.slides[0].shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+    if not pictures:
+        return None
+    largest = max(pictures, key=lambda shape: (shape.width or 0) * (shape.height or 0))
+    return _open_image(io.BytesIO(largest.image.blob))
+
+
+def _render_office(path):
+    soffice = _binary('MEDIA_SOFFICE_BINARY', 'soffice')
+    if soffice:
+        with tempfile.TemporaryDirectory() as workdir:
+            # Alohida profil: parallel ishlovchi soffice jarayonlari bir-birini bloklamasin
+            _run([soffice, f'-env:UserInstallation=file://{workdir}/profile', '--headless',
+                  '--convert-to', 'png', '--outdir', workdir, path])
+            output = os.path.join(workdir, os.path.splitext(os.path.basename(path))[0] + '.png')
+            if os.path.exists(output):
+                return _open_image(output)
+    return _embedded_ooxml_thumbnail(path) or _first_slide_picture(path)
+
+
+def _render_video(path):
+    offset = _setting('MEDIA_POSTER_OFFSET_SECONDS', 1)
+    ffmpeg = _binary('MEDIA_FFMPEG_BINARY', 'ffmpeg')
+    if ffmpeg:
+        with tempfile.TemporaryDirectory() as workdir:
+            output = os.path.join(workdir, 'poster.png')
+            # Video offset'dan qisqa bo'lsa birinchi kadr olinadi
+            for seek in (offset, 0):
+                _run([ffmpeg, '-v', 'error', '-y', '-ss', str(seek), '-i', path, '-frames:v', '1', output])
+                if os.path.exists(output):
+                    return _open_image(output)
+    if cv2 is not None:
+        capture = cv2.VideoCapture(path)
+        try:
+            capture.set(cv2.CAP_PROP_POS_MSEC, offset * 1000)
+            ok, frame = capture.read()
+            if not ok:
+                capture.set(cv2.CAP_PROP_POS_MSEC, 0)
+                ok, frame = capture.read()
+            if ok:
+                return Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        finally:
+            capture.release()
+    return None
+
+
+def _file_kind(model_label, name):
+    extension = os.path.splitext(name)[1].lower()
+    if model_label == 'materials.Model3D' or extension in MODEL_3D_EXTENSIONS:
+        return '3d'
+    if model_label == 'materials.VideoLesson' or extension in VIDEO_EXTENSIONS:
+        return 'video'
+    if extension in IMAGE_EXTENSIONS:
+        return 'image'
+    if extension == '.pdf':
+        return 'pdf'
+    if extension in OFFICE_EXTENSIONS:
+        return 'office'
+    return 'other'
+
+
+RENDERERS = {
+    'image': _open_image,
+    'pdf': _render_pdf,
+    'office': _render_office,
+    'video': _render_video,
+}
+
+
+def render_source(model_label, field_file):
+    """Faylning birinchi sahifasi/kadri; render qilib bo'lmasa None"""
+    renderer = RENDERERS.get(_file_kind(model_label, field_file.name))
+    if renderer is None:
+        return None
+    try:
+        with _local_path(field_file) as path:
+            return renderer(path)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("%s uchun oldindan ko'rish rasmi yaratilmadi: %s", field_file.name, exc)
+        return None
+
+
+def placeholder(model_label, file_name, title):
+    """Fayl turi va sarlavha yozilgan oddiy rasm"""
+    kind = _file_kind(model_label, file_name)
+    width = max(_widths())
+    height = width * 9 // 16
+    image = Image.new('RGB', (width, height), PLACEHOLDER_COLORS.get(kind, PLACEHOLDER_COLORS['other']))
+    draw = ImageDraw.Draw(image)
+    label = '3D' if kind == '3d' else (os.path.splitext(file_name)[1].lstrip('.').upper() or 'FILE')
+    label_font = ImageFont.load_default(size=height // 4)
+    title_font = ImageFont.load_default(size=height // 14)
+    draw.text((width / 2, height * 0.42), label, font=label_font, fill='white', anchor='mm')
+    title = title if len(title) <= 48 else title[:47] + '…'
+    draw.text((width / 2, height * 0.75), title, font=title_font, fill='white', anchor='mm')
+    return image
+
+
+# Variantlar
+
+def _widths():
+    return sorted(_setting('MEDIA_THUMBNAIL_WIDTHS', [320, 640, 1280]))
+
+
+def _save_variant(storage, upload_to, image):
+    stream = io.BytesIO()
+    image.save(stream, format='WEBP', quality=_setting('MEDIA_THUMBNAIL_QUALITY', 80), method=4)
+    content = stream.getvalue()
+    name = f"{upload_to}{hashlib.sha256(content).hexdigest()[:24]}-{image.width}w.webp"
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(content))
+    return name
+
+
+def save_variants(image, field):
+    """Rasmni responsiv WebP o'lchamlarda saqlaydi: {'kenglik': nom}"""
+    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    upload_to = field.upload_to if isinstance(field.upload_to, str) else ''
+    sizes = {}
+    for width in _widths():
+        if width > image.width and sizes:
+            break  # kattalashtirilmaydi
+        variant = image
+        if image.width > width:
+            variant = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        sizes[str(variant.width)] = _save_variant(field.storage, upload_to, variant)
+    return sizes
+
+
+def _default_variant(sizes):
+    target = _setting('MEDIA_THUMBNAIL_DEFAULT_WIDTH', 640)
+    widths = sorted(int(width) for width in sizes)
+    fitting = [width for width in widths if width <= target]
+    return sizes[str(fitting[-1] if fitting else widths[0])]
+
+
+def srcset(variants, storage):
+    """<img srcset> qiymati: 'url 320w, url 640w'"""
+    sizes = (variants or {}).get('sizes') or {}
+    if not sizes:
+        return None
+    return ', '.join(
+        f'{storage.url(name)} {width}w' for width, name in sorted(sizes.items(), key=lambda item: int(item[0]))
+    )
+
+
+def generate_thumbnails(model_label, pk, force=False):
+    """Yozuv uchun kichik rasmlarni yaratadi; natija holati (source) yoki None qaytadi"""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    file_field = THUMBNAIL_SOURCES[model_label]
+    source_file = getattr(instance, file_field)
+    file_name = source_file.name or ''
+    variants = instance.thumbnail_variants or {}
+    generated = set((variants.get('sizes') or {}).values())
+    thumbnail_name = instance.thumbnail.name or ''
+    upload_name = variants.get('upload')
+
+    if thumbnail_name and thumbnail_name not in generated:
+        # O'qituvchi o'zi rasm yuklagan
+        upload_name, source_image = thumbnail_name, None
+        try:
+            with instance.thumbnail.open('rb') as stream:
+                source_image = _open_image(stream)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("%s rasmni o'qib bo'lmadi: %s", thumbnail_name, exc)
+        source = 'upload'
+    elif variants.get('source') == 'upload' and upload_name and thumbnail_name:
+        if not force:
+            return None  # yuklangan rasm allaqachon qayta ishlangan
+        source_image = None
+        try:
+            with instance.thumbnail.field.storage.open(upload_name, 'rb') as stream:
+                source_image = _open_image(stream)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("%s rasmni o'qib bo'lmadi: %s", upload_name, exc)
+        source = 'upload'
+    else:
+        if not force and thumbnail_name and variants.get('file') == file_name:
+            return None  # fayl o'zgarmagan
+        upload_name = None
+        source_image = render_source(model_label, source_file) if file_name else None
+        source = 'file'
+
+    if source_image is None:
+        source_image = placeholder(model_label, file_name, instance.title)
+        source = 'placeholder'
+
+    sizes = save_variants(source_image, model._meta.get_field('thumbnail'))
+    values = {
+        'thumbnail': _default_variant(sizes),
+        'thumbnail_variants': {'source': source, 'file': file_name, 'upload': upload_name, 'sizes': sizes},
+    }
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        values['updated_at'] = timezone.now()
+    # Vazifa navbatda turganda fayl yana almashtirilgan bo'lsa, eski natija yozilmaydi
+    model.objects.filter(pk=pk, **{file_field: file_name}).update(**values)
+    return source
+
+
+# Signallar
+
+def _field_name(instance, attname):
+    value = instance.__dict__.get(attname)
+    return getattr(value, 'name', value) or ''
+
+
+def _thumbnail_receivers(model_label):
+    file_field = THUMBNAIL_SOURCES[model_label]
+
+    def state(instance):
+        if file_field not in instance.__dict__ or 'thumbnail' not in instance.__dict__:
+            return None
+        return _field_name(instance, file_field), _field_name(instance, 'thumbnail')
+
+    def on_init(sender, instance, **kwargs):
+        instance.__dict__[_STATE_ATTR] = state(instance) if instance.pk is not None else None
+
+    def on_save(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        previous = instance.__dict__.get(_STATE_ATTR)
+        current = state(instance)
+        instance.__dict__[_STATE_ATTR] = current
+        if current is None or not _setting('MEDIA_THUMBNAILS_ENABLED', True):
+            return
+        if created or previous != current or not current[1]:
+            background.submit(generate_thumbnails, model_label, instance.pk)
+
+    return on_init, on_save
+
+
+def connect_signals():
+    """Fayl yoki rasm o'zgarganda kichik rasmlarni fonda yaratish"""
+    for model_label in THUMBNAIL_SOURCES:
+        model = apps.get_model(model_label)
+        on_init, on_save = _thumbnail_receivers(model_label)
+        post_init.connect(on_init, sender=model, weak=False, dispatch_uid=f'thumbnails:{model_label}:init')
+        post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f'thumbnails:{model_label}:save')
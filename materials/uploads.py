@@ -0,0 +1,291 @@
+"""
+Bo'laklab, uzilishdan keyin davom ettiriladigan yuklash (tus 1.0 protokoli).
+
+Katta material, video va 3D model fayllari bitta multipart so'rovda emas,
+bo'laklarda yuklanadi:
+
+1. `POST /api/materials/uploads/` (`Upload-Length`, `Upload-Metadata`:
+   `filename`, ixtiyoriy `checksum` = "sha256 <hex>") - sessiya yaratiladi.
+2. `PATCH /api/materials/uploads/<id>/` (`Upload-Offset`,
+   `Content-Type: application/offset+octet-stream`, ixtiyoriy
+   `Upload-Checksum: sha256 <base64>`) - bo'lak diskdagi vaqtinchalik faylga
+   64 KB dan oqim bilan yoziladi, xotira sarfi bo'lak hajmiga bog'liq emas.
+3. Aloqa uzilsa `HEAD` so'rovi qabul qilingan `Upload-Offset` ni qaytaradi va
+   mijoz shu joydan davom etadi.
+4. Yakunlangan yuklash material/video/3D model yaratishda `upload_id` orqali
+   ishlatiladi: fayl storage'ga ko'chiriladi (FileSystemStorage'da rename).
+
+Muddati o'tgan sessiyalarni `cleanup_uploads` buyrug'i o'chiradi.
+"""
+import base64
+import binascii
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import UploadSession
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,checksum,termination,expiration'
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Protokol xatoligi; `status_code` javob holati"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def max_size():
+    return _setting('UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+
+
+def temp_path(session):
+    return os.path.join(_setting('UPLOAD_TEMP_DIR', 'upload_tmp'), f'{session.pk.hex}.part')
+
+
+def _expiry():
+    return timezone.now() + timedelta(hours=_setting('UPLOAD_EXPIRY_HOURS', 24))
+
+
+def parse_metadata(header):
+    """tus `Upload-Metadata`: 'kalit base64,kalit base64' -> lug'at"""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode() if value else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f"Upload-Metadata noto'g'ri: {key}")
+    return metadata
+
+
+def _parse_checksum(value, encoding):
+    """'algoritm qiymat' -> (algoritm, baytlar); qiymat base64 yoki hex"""
+    algorithm, _, digest = (value or '').strip().partition(' ')
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS or not digest:
+        raise UploadError("Nazorat summasi algoritmi qo'llab-quvvatlanmaydi")
+    try:
+        raw = base64.b64decode(digest, validate=True) if encoding == 'base64' else bytes.fromhex(digest)
+    except (binascii.Error, ValueError):
+        raise UploadError("Nazorat summasi noto'g'ri")
+    return algorithm, raw
+
+
+def create_session(user, length, metadata):
+    if length is None or length < 0:
+        raise UploadError('Upload-Length talab qilinadi')
+    if length > max_size():
+        raise UploadError('Fayl hajmi ruxsat etilganidan katta', 413)
+    filename = os.path.basename(metadata.get('filename') or metadata.get('name') or '').strip()
+    if not filename:
+        raise UploadError("Upload-Metadata da filename bo'lishi kerak")
+    checksum = ''
+    if metadata.get('checksum'):
+        algorithm, raw = _parse_checksum(metadata['checksum'], 'hex')
+        checksum = f'{algorithm}:{raw.hex()}'
+
+    session = UploadSession.objects.create(
+        user=user, filename=filename[:255], length=length, checksum=checksum, expires_at=_expiry(),
+    )
+    os.makedirs(os.path.dirname(temp_path(session)), exist_ok=True)
+    open(temp_path(session), 'wb').close()
+    if length == 0:
+        _complete(session)
+    return session
+
+
+def get_session(pk, user):
+    """Foydalanuvchining faol sessiyasi; muddati o'tgan bo'lsa o'chiriladi"""
+    session = UploadSession.objects.filter(pk=pk, user=user).first()
+    if session is None:
+        raise UploadError('Yuklash topilmadi', 404)
+    if session.expires_at <= timezone.now():
+        delete_session(session)
+        raise UploadError('Yuklash muddati tugagan', 410)
+    return session
+
+
+def _file_digest(path, algorithm):
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as stream:
+        for block in iter(lambda: stream.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _complete(session):
+    if session.checksum:
+        algorithm, expected = session.checksum.split(':', 1)
+        if _file_digest(temp_path(session), algorithm) != expected:
+            UploadSession.objects.filter(pk=session.pk).update(status='failed')
+            session.status = 'failed'
+            raise UploadError('Fayl nazorat summasi mos kelmadi', 460)
+    UploadSession.objects.filter(pk=session.pk).update(status='completed')
+    session.status = 'completed'
+
+
+def append_chunk(session, stream, offset, content_length, checksum_header=None):
+    """Bo'lakni `offset` dan yozadi va yangi offset'ni qaytaradi
+
+    Checksum berilmagan bo'lsa uzilgan bo'lakning qabul qilingan qismi ham
+    saqlanadi (mijoz shu joydan davom etadi); berilgan bo'lsa bo'lak butunlay
+    tekshiriladi va mos kelmasa tashlab yuboriladi.
+    """
+    if session.status != 'uploading':
+        raise UploadError('Yuklash allaqachon yakunlangan', 403)
+    if offset != session.offset:
+        raise UploadError('Upload-Offset mos kelmadi', 409)
+    if content_length is None:
+        raise UploadError('Content-Length talab qilinadi', 411)
+    if content_length > _setting('UPLOAD_CHUNK_MAX_BYTES', 32 * 1024 * 1024) or \
+            offset + content_length > session.length:
+        raise UploadError("Bo'lak hajmi ruxsat etilganidan katta", 413)
+    expected = _parse_checksum(checksum_header, 'base64') if checksum_header else None
+
+    path = temp_path(session)
+    if not os.path.exists(path):
+        raise UploadError('Yuklash topilmadi', 404)
+    with open(path, 'r+b') as target:
+        if fcntl is not None:
+            try:
+                fcntl.flock(target, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                raise UploadError("Bu yuklashga boshqa so'rov yozmoqda", 423)
+        target.seek(offset)
+        target.truncate()
+        digest = hashlib.new(expected[0]) if expected else None
+        written = 0
+        try:
+            while written < content_length:
+                block = stream.read(min(READ_SIZE, content_length - written))
+                if not block:
+                    break
+                target.write(block)
+                if digest is not None:
+                    digest.update(block)
+                written += len(block)
+        except OSError:
+            pass  # aloqa uzildi - qabul qilingan qism saqlanadi
+        if expected and (written != content_length or digest.digest() != expected[1]):
+            target.truncate(offset)
+            raise UploadError("Bo'lak nazorat summasi mos kelmadi", 460)
+        target.flush()
+
+    new_offset = offset + written
+    updated = UploadSession.objects.filter(pk=session.pk, offset=offset).update(
+        offset=new_offset, expires_at=_expiry(), updated_at=timezone.now(),
+    )
+    if not updated:
+        raise UploadError('Upload-Offset mos kelmadi', 409)
+    session.offset = new_offset
+    if new_offset == session.length:
+        _complete(session)
+    return new_offset
+
+
+def delete_session(session):
+    try:
+        os.remove(temp_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def cleanup_expired():
+    """Muddati o'tgan sessiyalar va egasiz vaqtinchalik fayllarni o'chiradi"""
+    deleted = 0
+    for session in UploadSession.objects.filter(expires_at__lte=timezone.now()).iterator():
+        delete_session(session)
+        deleted += 1
+
+    directory = _setting('UPLOAD_TEMP_DIR', 'upload_tmp')
+    if os.path.isdir(directory):
+        cutoff = (timezone.now() - timedelta(hours=_setting('UPLOAD_EXPIRY_HOURS', 24))).timestamp()
+        known = {f'{pk.hex}.part' for pk in UploadSession.objects.values_list('pk', flat=True)}
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.part') and entry.name not in known and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+    return deleted
+
+
+class UploadedChunks(File):
+    """Yakunlangan yuklash; FileSystemStorage uni nusxalamasdan ko'chiradi"""
+
+    def __init__(self, session):
+        super().__init__(open(temp_path(session), 'rb'), name=session.filename)
+        self.session = session
+
+    def temporary_file_path(self):
+        return temp_path(self.session)
+
+
+def completed_file(upload_id, user):
+    session = get_session(upload_id, user)
+    if session.status != 'completed':
+        raise UploadError('Yuklash hali yakunlanmagan', 409)
+    return UploadedChunks(session)
+
+
+def finish(uploaded):
+    """Fayl storage'ga saqlangandan keyin sessiyani yopadi"""
+    uploaded.close()
+    delete_session(uploaded.session)
+
+
+class ResumableUploadSerializerMixin:
+    """Fayl o'rniga yakunlangan yuklashning `upload_id` sini qabul qiladi"""
+
+    upload_file_field = None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields['upload_id'] = serializers.UUIDField(write_only=True, required=False)
+        fields[self.upload_file_field].required = False
+        return fields
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        upload_id = attrs.pop('upload_id', None)
+        if upload_id is not None:
+            request = self.context.get('request')
+            try:
+                attrs[self.upload_file_field] = completed_file(upload_id, getattr(request, 'user', None))
+            except UploadError as exc:
+                raise serializers.ValidationError({'upload_id': str(exc)})
+        elif self.instance is None and not attrs.get(self.upload_file_field):
+            raise serializers.ValidationError({self.upload_file_field: 'Fayl yoki upload_id talab qilinadi'})
+        return attrs
+
+    def _finish_upload(self, validated_data):
+        uploaded = validated_data.get(self.upload_file_field)
+        if isinstance(uploaded, UploadedChunks):
+            finish(uploaded)
+
+    def create(self, validated_data):
+        instance = super().create(validated_data)
+        self._finish_upload(validated_data)
+        return instance
+
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        self._finish_upload(validated_data)
+        return instance
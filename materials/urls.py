@@ -9,4 +9,5 @@ urlpatterns = [
     path('interactive/', views.material_interactive_view, name='interactive'),
     path('image/', views.material_image_view, name='image'),
     path('resources/', views.material_resources_view, name='resources'),
+    path('ai-images/<path:name>', views.ai_image_file, name='ai_image_file'),
 ]
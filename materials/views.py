@@ -2,23 +2,43 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404, render
 from django.http import HttpResponse, Http404, FileResponse, JsonResponse
-from django.db.models import Q
+from django.db.models import Count, F, Max, Prefetch, Q, Sum
 from django.utils import timezone
+from django.utils.http import http_date
 from django.utils.text import slugify
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.urls import reverse
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_POST
+import base64
+import hashlib
 import io
 import logging
 import os
 import re
 import json
-from openai import OpenAI, OpenAIError
+from openai import OpenAIError
 from pptx import Presentation
+from PIL import Image
+
+from ustoziya_platform import ai_clients
+from ustoziya_platform.quotas import ai_generation_slot, provider_call_slot
+from ustoziya_platform.category_lists import CachedCategoryListMixin, CategoryNamesConditionalMixin
+from ustoziya_platform.conditional import ConditionalGetMixin
+from ustoziya_platform.db_router import ReplicaReadMixin, replica_reads
+from ustoziya_platform.projections import FastListMixin, list_data
+from ustoziya_platform.serializers import SparseFieldsetViewMixin, requested_fields, shape_queryset
+from accounts import stats as user_stats
+from accounts.stats import get_user_stats
+
+from .ai_providers import build_text_router
 
 try:
     from google import genai
@@ -40,15 +60,20 @@ IMAGE_PROVIDER_LABELS = {
     'gemini': "Google Gemini 1.5",
 }
 
+AI_IMAGE_THUMBNAIL_SIZE = (256, 256)
+AI_IMAGE_CACHE_SECONDS = 60 * 60 * 24 * 365
+MEDIA_BLOB_CACHE_SECONDS = 60 * 60 * 24 * 365
 
-def _resolve_text_provider() -> str:
+
+def _configured_text_providers() -> list[str]:
+    providers = []
     if getattr(settings, 'OPENAI_API_KEY', ''):
-        return 'openai'
+        providers.append('openai')
     if getattr(settings, 'OPENROUTER_API_KEY', ''):
-        return 'openrouter'
+        providers.append('openrouter')
     if getattr(settings, 'GOOGLE_GEMINI_API_KEY', ''):
-        return 'gemini'
-    raise ValueError("Hech qanday matnli AI API kaliti topilmadi. Iltimos, .env faylini tekshiring.")
+        providers.append('gemini')
+    return providers
 
 
 def _resolve_image_provider() -> str:
@@ -66,6 +91,10 @@ from .models import (
     Material, MaterialCategory, MaterialRating, MaterialDownload,
     Assignment, StudentSubmission, VideoLesson, Model3D
 )
+from . import uploads
+from .model3d_ingest import Model3DVariantHintsMixin
+from .storage import CAS_PREFIX, blob_digest, get_content_addressed_storage
+from .projections import MaterialProjection
 from .serializers import (
     MaterialCategorySerializer,
     MaterialSerializer,
@@ -77,17 +106,34 @@ from .serializers import (
 )
 
 
-class MaterialCategoryListView(generics.ListAPIView):
-    """Material kategoriyalari ro'yxati"""
+# Yuklab olish va baholash updated_at ni o'zgartirmaydi - hisoblagichlar ETag ga alohida kiradi.
+# ratings JOIN qatorlarni ko'paytiradi; yig'indilar faqat o'zgarishni sezish uchun ishlatiladi.
+MATERIAL_CONDITIONAL_AGGREGATES = {
+    'count': Count('pk', distinct=True),
+    'last_modified': Max('updated_at'),
+    'authors_modified': Max('author__updated_at'),
+    'downloads_total': Sum('download_count'),
+    'rating_total': Sum('rating'),
+    'ratings_total': Count('ratings', distinct=True),
+}
+
+
+class MaterialCategoryListView(CachedCategoryListMixin, generics.ListAPIView):
+    """Material kategoriyalari ro'yxati (keshdan)"""
     queryset = MaterialCategory.objects.all()
     serializer_class = MaterialCategorySerializer
     permission_classes = [permissions.AllowAny]
+    category_label = 'materials.MaterialCategory'
 
 
-class MaterialListView(generics.ListCreateAPIView):
+class MaterialListView(ReplicaReadMixin, CategoryNamesConditionalMixin, ConditionalGetMixin, SparseFieldsetViewMixin,
+                       FastListMixin, generics.ListCreateAPIView):
     """Materiallar ro'yxati va yaratish"""
     serializer_class = MaterialSerializer
+    projection_class = MaterialProjection
     permission_classes = [IsAuthenticated]
+    conditional_aggregates = MATERIAL_CONDITIONAL_AGGREGATES
+    category_label = 'materials.MaterialCategory'
     
     def get_queryset(self):
         queryset = Material.objects.filter(is_public=True)
@@ -120,10 +166,13 @@ class MaterialListView(generics.ListCreateAPIView):
         serializer.save(author=self.request.user)
 
 
-class MaterialDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MaterialDetailView(CategoryNamesConditionalMixin, ConditionalGetMixin, SparseFieldsetViewMixin,
+                         generics.RetrieveUpdateDestroyAPIView):
     """Material tafsilotlari"""
     serializer_class = MaterialSerializer
     permission_classes = [IsAuthenticated]
+    conditional_aggregates = MATERIAL_CONDITIONAL_AGGREGATES
+    category_label = 'materials.MaterialCategory'
     
     def get_queryset(self):
         return Material.objects.filter(
@@ -140,7 +189,7 @@ class MaterialCreateView(generics.CreateAPIView):
         serializer.save(author=self.request.user)
 
 
-class MaterialUpdateView(generics.UpdateAPIView):
+class MaterialUpdateView(SparseFieldsetViewMixin, generics.UpdateAPIView):
     """Materialni yangilash"""
     serializer_class = MaterialSerializer
     permission_classes = [IsAuthenticated]
@@ -157,6 +206,20 @@ class MaterialDeleteView(generics.DestroyAPIView):
         return Material.objects.filter(author=self.request.user)
 
 
+def _file_download(field_file, title):
+    """Faylni xotiraga o'qimasdan oqim bilan beradi; blob xeshi ETag sifatida"""
+    response = FileResponse(
+        field_file.open('rb'),
+        as_attachment=True,
+        filename=f"{title}.{field_file.name.split('.')[-1]}",
+        content_type='application/octet-stream',
+    )
+    digest = blob_digest(field_file.name)
+    if digest:
+        response['ETag'] = f'"{digest}"'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def download_material(request, pk):
@@ -170,9 +233,10 @@ def download_material(request, pk):
         }, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        # Yuklab olish statistikasini yangilash
-        material.download_count += 1
-        material.save()
+        # Yuklab olish statistikasini yangilash - bitta atomar UPDATE (updated_at o'zgarmaydi,
+        # ETag download_count yig'indisidan yangilanadi)
+        Material.objects.filter(pk=material.pk).update(download_count=F('download_count') + 1)
+        user_stats.increment(material.author_id, 'total_downloads', 1)
         
         # Yuklab olish tarixini saqlash
         MaterialDownload.objects.create(
@@ -183,10 +247,7 @@ def download_material(request, pk):
         
         # Faylni yuklab olish
         if os.path.exists(material.file.path):
-            with open(material.file.path, 'rb') as f:
-                response = HttpResponse(f.read(), content_type='application/octet-stream')
-                response['Content-Disposition'] = f'attachment; filename="{material.title}.{material.file.name.split(".")[-1]}"'
-                return response
+            return _file_download(material.file, material.title)
         else:
             return Response({
                 'error': 'Fayl topilmadi'
@@ -228,7 +289,9 @@ def rate_material(request, pk):
     ratings = MaterialRating.objects.filter(material=material)
     avg_rating = sum(r.rating for r in ratings) / ratings.count()
     material.rating = avg_rating
-    material.save()
+    # Faqat reyting yoziladi - updated_at o'zgarmaydi, ro'yxat ETag'i reyting agregatidan yangilanadi
+    material.save(update_fields=['rating'])
+    user_stats.refresh_material_rating(material.author_id)
     
     return Response({
         'message': 'Reyting muvaffaqiyatli saqlandi',
@@ -238,6 +301,7 @@ def rate_material(request, pk):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def search_materials(request):
     """Materiallarni qidirish"""
     query = request.query_params.get('q', '')
@@ -268,8 +332,7 @@ def search_materials(request):
     sort_by = request.query_params.get('sort', '-created_at')
     queryset = queryset.order_by(sort_by)
     
-    serializer = MaterialSerializer(queryset, many=True)
-    return Response(serializer.data)
+    return Response(list_data(MaterialProjection, queryset, request))
 
 
 @api_view(['GET'])
@@ -277,7 +340,8 @@ def search_materials(request):
 def my_materials(request):
     """Foydalanuvchining materiallari"""
     materials = Material.objects.filter(author=request.user).order_by('-created_at')
-    serializer = MaterialSerializer(materials, many=True)
+    materials = shape_queryset(materials, MaterialSerializer, request)
+    serializer = MaterialSerializer(materials, many=True, context={'request': request})
     return Response(serializer.data)
 
 
@@ -286,26 +350,41 @@ def my_materials(request):
 def material_stats(request):
     """Material statistikasi"""
     user = request.user
-    
-    total_materials = Material.objects.filter(author=user).count()
-    total_downloads = sum(m.download_count for m in Material.objects.filter(author=user))
-    avg_rating = Material.objects.filter(author=user).aggregate(
-        avg_rating=models.Avg('rating')
-    )['avg_rating'] or 0
+    stats = get_user_stats(user)
     
     # Eng ko'p yuklab olingan materiallar
     popular_materials = Material.objects.filter(author=user).order_by('-download_count')[:5]
     
     return Response({
-        'total_materials': total_materials,
-        'total_downloads': total_downloads,
-        'avg_rating': round(avg_rating, 2),
+        'total_materials': stats.materials_count,
+        'total_downloads': stats.total_downloads,
+        'avg_rating': round(stats.avg_rating, 2),
         'popular_materials': MaterialSerializer(popular_materials, many=True).data
     })
 
 
 # ============ ASSIGNMENT VIEWS ============
 
+def with_assignment_relations(queryset, request):
+    """Topshiriqlar sahifasi uchun bog'liq ma'lumotlarni oldindan yuklash
+
+    O'qituvchi va kategoriya JOIN bilan, materiallar bitta prefetch so'rovi
+    bilan (ixcham havolalar uchun faqat kerakli ustunlar), topshirishlar soni
+    annotatsiya bilan olinadi - sahifadagi topshiriqlar soniga bog'liq emas.
+    `?fields=`/`?omit=` bilan chiqarilgan maydonlar uchun hech narsa yuklanmaydi.
+    """
+    queryset = shape_queryset(queryset, AssignmentSerializer, request)
+    if 'materials_list' not in requested_fields(request, ['materials_list']):
+        return queryset
+    if 'materials' in AssignmentSerializer.expanded(request):
+        materials = Material.objects.select_related('author', 'category').annotate(
+            ratings_count=Count('ratings')
+        )
+    else:
+        materials = Material.objects.only('id', 'title', 'material_type')
+    return queryset.prefetch_related(Prefetch('materials', queryset=materials))
+
+
 class AssignmentListView(generics.ListCreateAPIView):
     """Topshiriqlar ro'yxati va yaratish"""
     serializer_class = AssignmentSerializer
@@ -332,7 +411,7 @@ class AssignmentListView(generics.ListCreateAPIView):
         if teacher:
             queryset = queryset.filter(teacher_id=teacher)
         
-        return queryset.order_by('-created_at')
+        return with_assignment_relations(queryset, self.request).order_by('-created_at')
     
     def perform_create(self, serializer):
         serializer.save(teacher=self.request.user)
@@ -344,12 +423,13 @@ class AssignmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Assignment.objects.filter(
+        queryset = Assignment.objects.filter(
             Q(is_active=True) | Q(teacher=self.request.user)
         )
+        return with_assignment_relations(queryset, self.request)
 
 
-class StudentSubmissionListView(generics.ListCreateAPIView):
+class StudentSubmissionListView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """O'quvchi topshirig'lari ro'yxati"""
     serializer_class = StudentSubmissionSerializer
     permission_classes = [IsAuthenticated]
@@ -364,7 +444,7 @@ class StudentSubmissionListView(generics.ListCreateAPIView):
         serializer.save()
 
 
-class StudentSubmissionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StudentSubmissionDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """O'quvchi topshirig'i tafsilotlari"""
     serializer_class = StudentSubmissionSerializer
     permission_classes = [IsAuthenticated]
@@ -402,7 +482,7 @@ def grade_submission(request, pk):
 
 # ============ VIDEO LESSON VIEWS ============
 
-class VideoLessonListView(generics.ListCreateAPIView):
+class VideoLessonListView(ReplicaReadMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """Video darsliklar ro'yxati"""
     serializer_class = VideoLessonSerializer
     permission_classes = [IsAuthenticated]
@@ -435,7 +515,7 @@ class VideoLessonListView(generics.ListCreateAPIView):
         serializer.save(author=self.request.user)
 
 
-class VideoLessonDetailView(generics.RetrieveUpdateDestroyAPIView):
+class VideoLessonDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """Video darslik tafsilotlari"""
     serializer_class = VideoLessonSerializer
     permission_classes = [IsAuthenticated]
@@ -468,7 +548,7 @@ def watch_video(request, pk):
 
 # ============ 3D MODEL VIEWS ============
 
-class Model3DListView(generics.ListCreateAPIView):
+class Model3DListView(Model3DVariantHintsMixin, ReplicaReadMixin, SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """3D modellar ro'yxati"""
     serializer_class = Model3DSerializer
     permission_classes = [IsAuthenticated]
@@ -506,7 +586,7 @@ class Model3DListView(generics.ListCreateAPIView):
         serializer.save(author=self.request.user)
 
 
-class Model3DDetailView(generics.RetrieveUpdateDestroyAPIView):
+class Model3DDetailView(Model3DVariantHintsMixin, SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """3D model tafsilotlari"""
     serializer_class = Model3DSerializer
     permission_classes = [IsAuthenticated]
@@ -529,16 +609,12 @@ def download_3d_model(request, pk):
         }, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        # Yuklab olish statistikasini yangilash
-        model.download_count += 1
-        model.save()
+        # Yuklab olish statistikasini yangilash - bitta atomar UPDATE
+        Model3D.objects.filter(pk=model.pk).update(download_count=F('download_count') + 1)
         
         # Faylni yuklab olish
         if os.path.exists(model.model_file.path):
-            with open(model.model_file.path, 'rb') as f:
-                response = HttpResponse(f.read(), content_type='application/octet-stream')
-                response['Content-Disposition'] = f'attachment; filename="{model.title}.{model.model_file.name.split(".")[-1]}"'
-                return response
+            return _file_download(model.model_file, model.title)
         else:
             return Response({
                 'error': 'Fayl topilmadi'
@@ -550,49 +626,113 @@ def download_3d_model(request, pk):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-# ============ AI-ASSISTED MATERIAL CREATOR ============
+# ============ RESUMABLE UPLOAD VIEWS (tus 1.0) ============
+
+def _tus_response(data=None, status_code=status.HTTP_204_NO_CONTENT, session=None, **headers):
+    response = Response(data, status=status_code)
+    response['Tus-Resumable'] = uploads.TUS_VERSION
+    response['Cache-Control'] = 'no-store'
+    if session is not None:
+        response['Upload-Offset'] = str(session.offset)
+        response['Upload-Length'] = str(session.length)
+        response['Upload-Expires'] = http_date(session.expires_at.timestamp())
+    for name, value in headers.items():
+        response[name.replace('_', '-')] = value
+    return response
+
+
+def _tus_options_response():
+    return _tus_response(
+        Tus_Version=uploads.TUS_VERSION,
+        Tus_Extension=uploads.TUS_EXTENSIONS,
+        Tus_Max_Size=str(uploads.max_size()),
+        Tus_Checksum_Algorithm=','.join(uploads.CHECKSUM_ALGORITHMS),
+    )
+
+
+def _int_header(request, name):
+    value = request.headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        raise uploads.UploadError(f"{name} noto'g'ri")
+
+
+class TusView(APIView):
+    """tus so'rovlari uchun umumiy: versiya tekshiruvi va xatoliklar"""
+    permission_classes = [IsAuthenticated]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        version = request.headers.get('Tus-Resumable')
+        if request.method != 'OPTIONS' and version and version != uploads.TUS_VERSION:
+            raise uploads.UploadError("tus versiyasi qo'llab-quvvatlanmaydi", status.HTTP_412_PRECONDITION_FAILED)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, uploads.UploadError):
+            return _tus_response({'error': str(exc)}, exc.status_code, Tus_Version=uploads.TUS_VERSION)
+        return super().handle_exception(exc)
 
-_openai_client = None
-_openrouter_client = None
-_gemini_client = None
-
-
-def _get_openai_client():
-    global _openai_client
-    api_key = getattr(settings, 'OPENAI_API_KEY', '')
-    if not api_key:
-        raise ValueError("OpenAI API kaliti topilmadi. Iltimos, .env faylida OPENAI_API_KEY ni belgilang.")
-    if _openai_client is None:
-        _openai_client = OpenAI(api_key=api_key)
-    return _openai_client
-
-
-def _get_openrouter_client():
-    global _openrouter_client
-    api_key = getattr(settings, 'OPENROUTER_API_KEY', '')
-    if not api_key:
-        raise ValueError("OpenRouter API kaliti topilmadi. Iltimos, .env faylida OPENROUTER_API_KEY ni belgilang.")
-    if _openrouter_client is None:
-        base_url = getattr(settings, 'OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
-        default_headers = {}
-        site_url = getattr(settings, 'OPENROUTER_SITE_URL', '')
-        site_name = getattr(settings, 'OPENROUTER_SITE_NAME', '')
-        if site_url:
-            default_headers['HTTP-Referer'] = site_url
-        if site_name:
-            default_headers['X-Title'] = site_name
-        _openrouter_client = OpenAI(
-            api_key=api_key,
-            base_url=base_url,
-            default_headers=default_headers or None,
+    def options(self, request, *args, **kwargs):
+        return _tus_options_response()
+
+
+class ResumableUploadCreateView(TusView):
+    """Bo'laklab yuklash sessiyasini yaratish"""
+
+    def post(self, request):
+        session = uploads.create_session(
+            request.user,
+            _int_header(request, 'Upload-Length'),
+            uploads.parse_metadata(request.headers.get('Upload-Metadata')),
+        )
+        location = request.build_absolute_uri(reverse('upload_detail', args=[session.pk]))
+        return _tus_response(
+            {'id': str(session.pk), 'offset': session.offset, 'length': session.length, 'status': session.status},
+            status.HTTP_201_CREATED, session, Location=location,
+        )
+
+
+class ResumableUploadDetailView(TusView):
+    """Yuklash holati (HEAD), bo'lak yozish (PATCH) va bekor qilish (DELETE)"""
+
+    def head(self, request, pk):
+        return _tus_response(status_code=status.HTTP_200_OK, session=uploads.get_session(pk, request.user))
+
+    def get(self, request, pk):
+        session = uploads.get_session(pk, request.user)
+        return _tus_response(
+            {'id': str(session.pk), 'offset': session.offset, 'length': session.length, 'status': session.status},
+            status.HTTP_200_OK, session,
+        )
+
+    def patch(self, request, pk):
+        session = uploads.get_session(pk, request.user)
+        if request.content_type.split(';')[0].strip() != 'application/offset+octet-stream':
+            raise uploads.UploadError(
+                "Content-Type application/offset+octet-stream bo'lishi kerak",
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        offset = _int_header(request, 'Upload-Offset')
+        if offset is None:
+            raise uploads.UploadError('Upload-Offset talab qilinadi')
+        uploads.append_chunk(
+            session, request.stream or io.BytesIO(), offset,
+            _int_header(request, 'Content-Length'), request.headers.get('Upload-Checksum'),
         )
-    return _openrouter_client
+        return _tus_response(session=session)
 
+    def delete(self, request, pk):
+        uploads.delete_session(uploads.get_session(pk, request.user))
+        return _tus_response()
+
+
+# ============ AI-ASSISTED MATERIAL CREATOR ============
 
 def _generate_openai_chat(system_prompt: str, user_prompt: str, temperature: float = 0.7) -> str:
     model_name = getattr(settings, 'OPENAI_CHAT_MODEL', 'gpt-4o-mini')
     try:
-        client = _get_openai_client()
+        client = ai_clients.get_openai_client()
         response = client.chat.completions.create(
             model=model_name,
             messages=[
@@ -629,7 +769,7 @@ def _generate_openrouter_chat(system_prompt: str, user_prompt: str, temperature:
     else:
         model_name = configured_model
     try:
-        client = _get_openrouter_client()
+        client = ai_clients.get_openrouter_client()
         response = client.chat.completions.create(
             model=model_name,
             messages=[
@@ -650,7 +790,7 @@ def _generate_openrouter_chat(system_prompt: str, user_prompt: str, temperature:
 def _generate_openai_image(prompt: str, size: str = '1024x1024') -> str:
     model_name = getattr(settings, 'OPENAI_IMAGE_MODEL', 'gpt-image-1')
     try:
-        client = _get_openai_client()
+        client = ai_clients.get_openai_client()
         response = client.images.generate(
             model=model_name,
             prompt=prompt,
@@ -673,17 +813,12 @@ def _generate_gemini_text(prompt: str, temperature: float = 0.7) -> str:
     if genai is None:
         raise ValueError("google-genai kutubxonasi o'rnatilmagan. `pip install google-genai` buyruqini bajaring.")
     try:
-        global _gemini_client
-        if _gemini_client is None:
-            api_key = getattr(settings, 'GOOGLE_GEMINI_API_KEY', '')
-            if not api_key:
-                raise ValueError("Google Gemini API kaliti topilmadi. Iltimos, .env faylida GOOGLE_GEMINI_API_KEY ni belgilang.")
-            _gemini_client = genai.Client(api_key=api_key)
+        gemini_client = ai_clients.get_gemini_client()
 
         configured_model = getattr(settings, 'GOOGLE_GEMINI_MODEL', 'models/gemini-1.5-flash-latest')
         model_name = configured_model if configured_model.startswith("models/") else f"models/{configured_model}"
 
-        response = _gemini_client.models.generate_content(
+        response = gemini_client.models.generate_content(
             model=model_name,
             contents=[{"role": "user", "parts": [{"text": prompt}]}],
             config={"temperature": float(temperature)},
@@ -726,6 +861,26 @@ def _generate_ai_text(provider: str, system_prompt: str, user_prompt: str, tempe
     return _generate_openai_chat(system_prompt, user_prompt, temperature=temperature)
 
 
+_text_router = None
+
+
+def _get_text_router():
+    global _text_router
+    if _text_router is None:
+        live_providers = {
+            name: (lambda system_prompt, user_prompt, temperature, name=name:
+                   _generate_ai_text(name, system_prompt, user_prompt, temperature=temperature))
+            for name in _configured_text_providers()
+        }
+        _text_router = build_text_router(live_providers, call_slot=provider_call_slot)
+    return _text_router
+
+
+def _route_ai_text(user, system_prompt: str, user_prompt: str, temperature: float = 0.7) -> tuple[str, str]:
+    with ai_generation_slot(user):
+        return _get_text_router().generate(system_prompt, user_prompt, temperature=temperature)
+
+
 def _parse_presentation_slides(text: str) -> list[dict]:
     if not text:
         return []
@@ -825,6 +980,82 @@ def _generate_ai_image(provider: str, prompt: str, size: str) -> dict:
     return {'image_base64': image_base64}
 
 
+AI_IMAGE_NAME_PATTERN = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{64}(?:\.(?:png|jpg|webp|gif)|_thumb\.webp)$')
+# Pillow formati -> (kengaytma, MIME turi); provayder qaysi formatda qaytargan bo'lsa shunda saqlanadi
+AI_IMAGE_FORMATS = {
+    'PNG': ('.png', 'image/png'),
+    'JPEG': ('.jpg', 'image/jpeg'),
+    'WEBP': ('.webp', 'image/webp'),
+    'GIF': ('.gif', 'image/gif'),
+}
+AI_IMAGE_CONTENT_TYPES = dict(AI_IMAGE_FORMATS.values())
+
+
+def _ai_image_extension(image_bytes: bytes) -> str:
+    """Rasm formatini baytlaridan aniqlaydi (javobdagi MIME turiga ishonilmaydi)"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image_format = image.format
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise ValueError("AI xizmati yaroqsiz rasm qaytardi.") from exc
+    if image_format not in AI_IMAGE_FORMATS:
+        raise ValueError(f"AI xizmati qo'llab-quvvatlanmaydigan rasm formatini qaytardi: {image_format}")
+    return AI_IMAGE_FORMATS[image_format][0]
+
+
+def _store_ai_image(image_base64: str) -> dict:
+    """Generatsiya qilingan rasmni kontent xeshi nomi bilan media omboriga yozadi"""
+    image_bytes = base64.b64decode(image_base64)
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    relative_name = f"{digest[:2]}/{digest}"
+    image_name = f"{relative_name}{_ai_image_extension(image_bytes)}"
+    thumbnail_name = f"{relative_name}_thumb.webp"
+
+    # Bir xil tasvir qayta generatsiya qilinsa, fayl qayta yozilmaydi
+    if not default_storage.exists(f"ai_images/{image_name}"):
+        default_storage.save(f"ai_images/{image_name}", ContentFile(image_bytes))
+
+    if not default_storage.exists(f"ai_images/{thumbnail_name}"):
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image.thumbnail(AI_IMAGE_THUMBNAIL_SIZE)
+            thumbnail_stream = io.BytesIO()
+            image.save(thumbnail_stream, format='WEBP', quality=80)
+        default_storage.save(f"ai_images/{thumbnail_name}", ContentFile(thumbnail_stream.getvalue()))
+
+    return {
+        'image_url': reverse('materials:ai_image_file', args=[image_name]),
+        'image_thumbnail_url': reverse('materials:ai_image_file', args=[thumbnail_name]),
+    }
+
+
+@cache_control(public=True, max_age=AI_IMAGE_CACHE_SECONDS, immutable=True)
+def ai_image_file(request, name):
+    """AI rasmlarini uzoq muddatli kesh sarlavhalari bilan berish (nomi kontent xeshi)"""
+    if not AI_IMAGE_NAME_PATTERN.match(name):
+        raise Http404
+    storage_name = f"ai_images/{name}"
+    if not default_storage.exists(storage_name):
+        raise Http404
+    content_type = AI_IMAGE_CONTENT_TYPES[os.path.splitext(name)[1]]
+    response = FileResponse(default_storage.open(storage_name, 'rb'), content_type=content_type)
+    response['ETag'] = f'"{os.path.basename(name)}"'
+    return response
+
+
+@cache_control(public=True, max_age=MEDIA_BLOB_CACHE_SECONDS, immutable=True)
+def media_blob_file(request, name):
+    """Kontent-manzilli media blob'i (DEBUG; production'da /media/cas/ ni nginx beradi)"""
+    storage_name = f"{CAS_PREFIX}/{name}"
+    if not blob_digest(storage_name):
+        raise Http404
+    storage = get_content_addressed_storage()
+    if not storage.exists(storage_name):
+        raise Http404
+    response = FileResponse(storage.open(storage_name, 'rb'))
+    response['ETag'] = f'"{blob_digest(storage_name)}"'
+    return response
+
+
 def _build_ai_cards(request):
     return [
         {
@@ -872,7 +1103,7 @@ def material_ai_categories(request):
 
 def _process_text_generation(request, *, template_name: str, system_prompt: str, hero: dict, temperature: float = 0.7):
     try:
-        default_provider = _resolve_text_provider()
+        default_provider = _get_text_router().primary_provider()
     except ValueError as exc:
         context = {
             'hero': hero,
@@ -903,7 +1134,7 @@ def _process_text_generation(request, *, template_name: str, system_prompt: str,
             if export_ppt:
                 if not existing_result:
                     try:
-                        existing_result = _generate_ai_text(provider, system_prompt, prompt, temperature=temperature)
+                        existing_result, provider = _route_ai_text(request.user, system_prompt, prompt, temperature=temperature)
                     except ValueError as exc:
                         context['error'] = str(exc)
                 if existing_result and 'error' not in context:
@@ -918,7 +1149,7 @@ def _process_text_generation(request, *, template_name: str, system_prompt: str,
                 context['result'] = existing_result
             else:
                 try:
-                    result = _generate_ai_text(provider, system_prompt, prompt, temperature=temperature)
+                    result, provider = _route_ai_text(request.user, system_prompt, prompt, temperature=temperature)
                     context['result'] = result
                 except ValueError as exc:
                     context['error'] = str(exc)
@@ -1039,14 +1270,16 @@ def material_image_view(request):
             context['error'] = "Iltimos, rasm tavsifini kiriting."
         else:
             try:
-                context.pop('image_data_url', None)
-                context.pop('image_base64', None)
+                context.pop('image_url', None)
+                context.pop('image_thumbnail_url', None)
                 context.pop('description', None)
-                result = _generate_ai_image(context['selected_provider'], prompt, size)
+                with ai_generation_slot(request.user), provider_call_slot():
+                    result = _generate_ai_image(context['selected_provider'], prompt, size)
+                image_base64 = result.pop('image_base64', None)
                 context.update(result)
                 context['provider_label'] = _get_provider_label(context['selected_provider'], IMAGE_PROVIDER_LABELS)
-                if 'image_base64' in result:
-                    context['image_data_url'] = f"data:image/png;base64,{result['image_base64']}"
+                if image_base64:
+                    context.update(_store_ai_image(image_base64))
             except ValueError as exc:
                 context['error'] = str(exc)
 
@@ -0,0 +1,346 @@
+"""
+Natijalarni eksport qilish freymvorki.
+
+Ma'lumotlar to'plamlari (OCR natijalari, test topshirishlar, o'quvchi
+javoblari) va yozuvchilar (XLSX, CSV, Parquet) bir-biridan ajratilgan.
+Qatorlar bazadan birlamchi kalit bo'yicha keyset-paginatsiya bilan
+bo'laklab o'qiladi va darhol faylga yoziladi, shuning uchun xotira sarfi
+qatorlar soniga bog'liq emas. Barcha formatlar bir xil filtrlarni qo'llab-quvvatlaydi.
+"""
+import csv
+import hashlib
+import io
+import json
+from datetime import date, datetime
+
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+from tests.models import StudentAnswer, TestAttempt
+from .models import TestResult
+
+CHUNK_SIZE = 2000
+
+FILTER_FIELDS = ('student_class', 'date_from', 'date_to')
+
+
+class Column:
+    """Eksport ustuni: sarlavha, `values()` maydoni va turi"""
+
+    def __init__(self, header, field, kind='string', computed=False):
+        self.header = header
+        self.field = field
+        self.kind = kind
+        # Hisoblanadigan ustunlar bazadan o'qilmaydi, enrich() da to'ldiriladi
+        self.computed = computed
+
+
+class Dataset:
+    """Eksport qilinadigan ma'lumotlar to'plami"""
+
+    name = None
+    model = None
+    columns = []
+    test_lookup = None
+    class_lookup = None
+    date_lookup = None
+    version_sums = ()
+    version_maxes = ()
+
+    def queryset(self, test, filters=None):
+        """Test va filtrlar bo'yicha queryset"""
+        filters = filters or {}
+        queryset = self.model.objects.filter(**{self.test_lookup: test})
+        if filters.get('student_class'):
+            queryset = queryset.filter(**{self.class_lookup: filters['student_class']})
+        if filters.get('date_from'):
+            queryset = queryset.filter(**{f'{self.date_lookup}__date__gte': filters['date_from']})
+        if filters.get('date_to'):
+            queryset = queryset.filter(**{f'{self.date_lookup}__date__lte': filters['date_to']})
+        return queryset
+
+    def version(self, queryset):
+        """Natijalar o'zgarganini aniqlash uchun agregatlar"""
+        aggregates = {'count': Count('pk'), 'last_pk': Max('pk')}
+        aggregates.update({f'sum_{field}': Sum(field) for field in self.version_sums})
+        aggregates.update({f'max_{field}': Max(field) for field in self.version_maxes})
+        return queryset.aggregate(**aggregates)
+
+    def enrich(self, rows):
+        """Bo'lakdagi qatorlarga qo'shimcha ma'lumot qo'shish (kerak bo'lsa)"""
+        return rows
+
+    def iter_chunks(self, queryset, chunk_size=CHUNK_SIZE):
+        """Qatorlarni lug'atlar ro'yxati ko'rinishida bo'laklab qaytaradi"""
+        fields = ['pk'] + [
+            column.field for column in self.columns
+            if column.field != 'pk' and not column.computed
+        ]
+        last_pk = None
+        while True:
+            chunk_queryset = queryset.order_by('pk')
+            if last_pk is not None:
+                chunk_queryset = chunk_queryset.filter(pk__gt=last_pk)
+            rows = list(chunk_queryset.values(*fields)[:chunk_size])
+            if not rows:
+                return
+            last_pk = rows[-1]['pk']
+            yield self.enrich(rows)
+            if len(rows) < chunk_size:
+                return
+
+
+class TestResultDataset(Dataset):
+    """OCR orqali tekshirilgan natijalar"""
+
+    name = 'results'
+    model = TestResult
+    columns = [
+        Column("ID", 'pk', 'int'),
+        Column("O'quvchi ismi", 'student_name'),
+        Column("Sinf", 'student_class'),
+        Column("Jami savollar", 'total_questions', 'int'),
+        Column("To'g'ri javoblar", 'correct_answers', 'int'),
+        Column("Noto'g'ri javoblar", 'wrong_answers', 'int'),
+        Column("Ball", 'score', 'int'),
+        Column("Foiz", 'percentage', 'float'),
+        Column("Baholash", 'grade'),
+        Column("Qayta ishlangan vaqt", 'processed_at', 'datetime'),
+    ]
+    test_lookup = 'ocr_processing__test'
+    class_lookup = 'student_class'
+    date_lookup = 'processed_at'
+    version_sums = ('score', 'correct_answers', 'percentage')
+    version_maxes = ('processed_at',)
+
+
+class TestAttemptDataset(Dataset):
+    """Onlayn test topshirishlar"""
+
+    name = 'attempts'
+    model = TestAttempt
+    columns = [
+        Column("ID", 'pk', 'int'),
+        Column("O'quvchi ismi", 'student_name'),
+        Column("Sinf", 'student_class'),
+        Column("Boshlangan vaqt", 'started_at', 'datetime'),
+        Column("Tugatilgan vaqt", 'completed_at', 'datetime'),
+        Column("Ball", 'score', 'int'),
+        Column("Foiz", 'percentage', 'float'),
+        Column("Tugatilgan", 'is_completed', 'bool'),
+    ]
+    test_lookup = 'test'
+    class_lookup = 'student_class'
+    date_lookup = 'started_at'
+    version_sums = ('score', 'percentage')
+    version_maxes = ('completed_at',)
+
+
+class StudentAnswerDataset(Dataset):
+    """O'quvchilarning har bir savolga bergan javoblari"""
+
+    name = 'answers'
+    model = StudentAnswer
+    columns = [
+        Column("ID", 'pk', 'int'),
+        Column("Topshirish ID", 'attempt_id', 'int'),
+        Column("O'quvchi ismi", 'attempt__student_name'),
+        Column("Sinf", 'attempt__student_class'),
+        Column("Savol ID", 'question_id', 'int'),
+        Column("Savol tartibi", 'question__order', 'int'),
+        Column("Tanlangan javoblar", 'selected_answers', computed=True),
+        Column("Matnli javob", 'text_answer'),
+        Column("To'g'ri", 'is_correct', 'bool'),
+        Column("Olingan ball", 'points_earned', 'int'),
+        Column("Javob berilgan vaqt", 'answered_at', 'datetime'),
+    ]
+    test_lookup = 'attempt__test'
+    class_lookup = 'attempt__student_class'
+    date_lookup = 'answered_at'
+    version_sums = ('points_earned',)
+    version_maxes = ('answered_at',)
+
+    def enrich(self, rows):
+        # Tanlangan javoblar (M2M) har bir bo'lak uchun bitta so'rov bilan olinadi
+        through = StudentAnswer.selected_answers.through
+        selected = {}
+        for answer_id, text in through.objects.filter(
+            studentanswer_id__in=[row['pk'] for row in rows]
+        ).order_by('answer__order').values_list('studentanswer_id', 'answer__answer_text'):
+            selected.setdefault(answer_id, []).append(text)
+        for row in rows:
+            row['selected_answers'] = '; '.join(selected.get(row['pk'], []))
+        return rows
+
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in (TestResultDataset(), TestAttemptDataset(), StudentAnswerDataset())
+}
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+class XLSXWriter:
+    """openpyxl write-only rejimidagi oddiy jadval"""
+
+    extension = 'xlsx'
+    content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def __init__(self, output, columns, title='Eksport'):
+        self.output = output
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title)
+        header_font = Font(bold=True)
+        header_cells = []
+        for column in columns:
+            cell = WriteOnlyCell(self.sheet, value=column.header)
+            cell.font = header_font
+            header_cells.append(cell)
+        self.sheet.append(header_cells)
+        self.fields = [column.field for column in columns]
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.sheet.append([_format_value(row[field]) for field in self.fields])
+
+    def close(self):
+        self.workbook.save(self.output)
+
+
+class CSVWriter:
+    """UTF-8 CSV; birinchi qatorda maydon nomlari (pandas uchun qulay)"""
+
+    extension = 'csv'
+    content_type = 'text/csv; charset=utf-8'
+
+    def __init__(self, output, columns, title=None):
+        self.stream = io.TextIOWrapper(output, encoding='utf-8', newline='', write_through=True)
+        self.writer = csv.writer(self.stream)
+        self.fields = [column.field for column in columns]
+        self.writer.writerow(self.fields)
+
+    def write_rows(self, rows):
+        self.writer.writerows(
+            [_format_value(row[field]) for field in self.fields] for row in rows
+        )
+
+    def close(self):
+        self.stream.flush()
+        # Asosiy fayl yopilmasligi uchun wrapper ajratiladi
+        self.stream.detach()
+
+
+PARQUET_TYPES = {
+    'int': 'int64',
+    'float': 'float64',
+    'bool': 'bool_',
+    'string': 'string',
+}
+
+
+class ParquetWriter:
+    """Ustunli Parquet fayl; har bir bo'lak alohida row group sifatida yoziladi"""
+
+    extension = 'parquet'
+    content_type = 'application/vnd.apache.parquet'
+
+    def __init__(self, output, columns, title=None):
+        if pa is None:
+            raise ValueError("Parquet eksport uchun pyarrow kutubxonasi o'rnatilmagan.")
+        self.fields = [column.field for column in columns]
+        self.schema = pa.schema([
+            (column.field, pa.timestamp('us', tz='UTC') if column.kind == 'datetime'
+             else getattr(pa, PARQUET_TYPES[column.kind])())
+            for column in columns
+        ])
+        self.writer = pq.ParquetWriter(output, self.schema, compression='snappy')
+
+    def write_rows(self, rows):
+        arrays = {field: [row[field] for row in rows] for field in self.fields}
+        self.writer.write_table(pa.Table.from_pydict(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    'xlsx': XLSXWriter,
+    'csv': CSVWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def available_formats():
+    """O'rnatilgan kutubxonalarga ko'ra mavjud formatlar"""
+    return [name for name in WRITERS if name != 'parquet' or pa is not None]
+
+
+def clean_filters(data):
+    """So'rovdan filtrlarni ajratib oladi va tekshiradi"""
+    filters = {}
+    for name in FILTER_FIELDS:
+        value = data.get(name)
+        if not value:
+            continue
+        if name.startswith('date_'):
+            if isinstance(value, date):
+                value = value.isoformat()
+            elif parse_date(str(value)) is None:
+                raise ValueError(f"Noto'g'ri sana formati: {name} (YYYY-MM-DD kutilmoqda)")
+        filters[name] = str(value)
+    return filters
+
+
+def get_dataset(name):
+    if name not in DATASETS:
+        raise ValueError(f"Noma'lum ma'lumotlar to'plami: {name}")
+    return DATASETS[name]
+
+
+def get_writer_class(export_format):
+    if export_format not in WRITERS:
+        raise ValueError(f"Noma'lum eksport formati: {export_format}")
+    if export_format not in available_formats():
+        raise ValueError("Parquet eksport uchun pyarrow kutubxonasi o'rnatilmagan.")
+    return WRITERS[export_format]
+
+
+def export_version(test, dataset_name, export_format, filters):
+    """Eksport versiyasi: test, to'plam, format, filtrlar va natijalar agregatlari"""
+    dataset = get_dataset(dataset_name)
+    stats = dataset.version(dataset.queryset(test, filters))
+    parts = [
+        test.pk, test.updated_at.isoformat(), dataset_name, export_format,
+        json.dumps(filters, sort_keys=True),
+    ] + [stats[key] for key in sorted(stats)]
+    return hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def write_dataset(dataset_name, export_format, test, filters, output, on_progress=None):
+    """To'plamni tanlangan formatda `output` ga oqim bilan yozadi; qatorlar sonini qaytaradi"""
+    dataset = get_dataset(dataset_name)
+    writer = get_writer_class(export_format)(output, dataset.columns, title=dataset.name)
+    written = 0
+    for rows in dataset.iter_chunks(dataset.queryset(test, filters)):
+        writer.write_rows(rows)
+        written += len(rows)
+        if on_progress:
+            on_progress(written)
+    writer.close()
+    return written
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from ocr_processing.services import ExcelExportService
+
+
+class Command(BaseCommand):
+    help = "Eski Excel eksport fayllarini o'chirish (cron orqali ishga tushiriladi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Saqlash muddati (kun)')
+        parser.add_argument('--stale-minutes', type=int, default=None, help='Osilib qolgan vazifalar chegarasi (daqiqa)')
+
+    def handle(self, *args, **options):
+        deleted = ExcelExportService().cleanup(
+            retention_days=options['days'],
+            stale_minutes=options['stale_minutes'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{deleted} ta eski eksport o'chirildi"))
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:26
+
+from django.db import migrations, models
+
+
+def mark_existing_completed(apps, schema_editor):
+    # Fon vazifalaridan oldin yaratilgan eksportlar allaqachon tayyor fayllar
+    ExcelExport = apps.get_model('ocr_processing', 'ExcelExport')
+    ExcelExport.objects.update(status='completed', progress=100, completed_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_processing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='excelexport',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Tugatilgan vaqt'),
+        ),
+        migrations.AddField(
+            model_name='excelexport',
+            name='error_message',
+            field=models.TextField(blank=True, null=True, verbose_name='Xatolik xabari'),
+        ),
+        migrations.AddField(
+            model_name='excelexport',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Jarayon (%)'),
+        ),
+        migrations.AddField(
+            model_name='excelexport',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Kutilmoqda'), ('processing', 'Qayta ishlanmoqda'), ('completed', 'Tugatilgan'), ('failed', 'Xatolik')], default='pending', max_length=20, verbose_name='Holat'),
+        ),
+        migrations.AddField(
+            model_name='excelexport',
+            name='version_key',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Natijalar versiyasi'),
+        ),
+        migrations.RunPython(mark_existing_completed, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='excelexport',
+            name='file',
+            field=models.FileField(blank=True, upload_to='excel_exports/', verbose_name='Excel fayl'),
+        ),
+        migrations.AddConstraint(
+            model_name='excelexport',
+            constraint=models.UniqueConstraint(condition=models.Q(('version_key', ''), _negated=True), fields=('test', 'version_key'), name='unique_excel_export_version'),
+        ),
+    ]
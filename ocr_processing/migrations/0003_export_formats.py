@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_processing', '0002_excel_export_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='excelexport',
+            name='dataset',
+            field=models.CharField(choices=[('results', 'OCR natijalari'), ('attempts', 'Test topshirishlar'), ('answers', "O'quvchi javoblari")], default='results', max_length=20, verbose_name="Ma'lumotlar to'plami"),
+        ),
+        migrations.AddField(
+            model_name='excelexport',
+            name='export_format',
+            field=models.CharField(choices=[('xlsx', 'Excel (XLSX)'), ('csv', 'CSV'), ('parquet', 'Parquet')], default='xlsx', max_length=10, verbose_name='Format'),
+        ),
+        migrations.AddField(
+            model_name='excelexport',
+            name='filters',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Filtrlar'),
+        ),
+    ]
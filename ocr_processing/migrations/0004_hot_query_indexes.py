@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_processing', '0003_export_formats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ocrprocessing',
+            index=models.Index(fields=['user', '-created_at'], name='ocr_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocrprocessing',
+            index=models.Index(fields=['test', '-created_at'], name='ocr_test_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['-processed_at'], name='testresult_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_processing', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrprocessing',
+            name='original_image',
+            field=models.FileField(blank=True, null=True, upload_to='ocr_originals/', verbose_name='Asl rasm'),
+        ),
+    ]
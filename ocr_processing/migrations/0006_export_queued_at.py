@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_processing', '0005_original_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='excelexport',
+            name='queued_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name="Navbatga qo'yilgan vaqt"),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -32,6 +33,12 @@ class OCRProcessing(models.Model):
         upload_to='ocr_images/',
         verbose_name='Rasm'
     )
+    original_image = models.FileField(
+        upload_to='ocr_originals/',
+        blank=True,
+        null=True,
+        verbose_name='Asl rasm'
+    )
     processed_text = models.TextField(
         blank=True,
         null=True,
@@ -70,6 +77,10 @@ class OCRProcessing(models.Model):
         verbose_name = 'OCR qayta ishlash'
         verbose_name_plural = 'OCR qayta ishlashlar'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='ocr_user_recent_idx'),
+            models.Index(fields=['test', '-created_at'], name='ocr_test_recent_idx'),
+        ]
     
     def __str__(self):
         return f"OCR - {self.user.get_full_name()} ({self.status})"
@@ -129,6 +140,9 @@ class TestResult(models.Model):
         verbose_name = 'Test natijasi'
         verbose_name_plural = 'Test natijalari'
         ordering = ['-processed_at']
+        indexes = [
+            models.Index(fields=['-processed_at'], name='testresult_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student_name} - {self.score} ball ({self.percentage}%)"
@@ -137,6 +151,25 @@ class TestResult(models.Model):
 class ExcelExport(models.Model):
     """Excel eksport fayllari"""
     
+    STATUS_CHOICES = [
+        ('pending', 'Kutilmoqda'),
+        ('processing', 'Qayta ishlanmoqda'),
+        ('completed', 'Tugatilgan'),
+        ('failed', 'Xatolik'),
+    ]
+    
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel (XLSX)'),
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+    ]
+    
+    DATASET_CHOICES = [
+        ('results', 'OCR natijalari'),
+        ('attempts', 'Test topshirishlar'),
+        ('answers', 'O\'quvchi javoblari'),
+    ]
+    
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -151,8 +184,47 @@ class ExcelExport(models.Model):
     )
     file = models.FileField(
         upload_to='excel_exports/',
+        blank=True,
         verbose_name='Excel fayl'
     )
+    export_format = models.CharField(
+        max_length=10,
+        choices=FORMAT_CHOICES,
+        default='xlsx',
+        verbose_name='Format'
+    )
+    dataset = models.CharField(
+        max_length=20,
+        choices=DATASET_CHOICES,
+        default='results',
+        verbose_name='Ma\'lumotlar to\'plami'
+    )
+    filters = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Filtrlar'
+    )
+    version_key = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        verbose_name='Natijalar versiyasi'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        verbose_name='Holat'
+    )
+    progress = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Jarayon (%)'
+    )
+    error_message = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Xatolik xabari'
+    )
     total_students = models.PositiveIntegerField(
         default=0,
         verbose_name='Jami o\'quvchilar soni'
@@ -161,11 +233,28 @@ class ExcelExport(models.Model):
         auto_now_add=True,
         verbose_name='Yaratilgan vaqt'
     )
+    # Oxirgi marta navbatga qo'yilgan vaqt - osilib qolgan vazifalar shu bo'yicha aniqlanadi
+    queued_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Navbatga qo\'yilgan vaqt'
+    )
+    completed_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Tugatilgan vaqt'
+    )
     
     class Meta:
         verbose_name = 'Excel eksport'
         verbose_name_plural = 'Excel eksportlar'
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['test', 'version_key'],
+                condition=~models.Q(version_key=''),
+                name='unique_excel_export_version',
+            ),
+        ]
     
     def __str__(self):
         return f"Excel - {self.test.title} ({self.total_students} o'quvchi)"
\ No newline at end of file
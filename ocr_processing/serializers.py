@@ -1,10 +1,16 @@
 from rest_framework import serializers
+from ustoziya_platform.serializers import SparseFieldsetMixin
 from .models import OCRProcessing, TestResult, ExcelExport
 
 
-class OCRProcessingSerializer(serializers.ModelSerializer):
+class OCRProcessingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """OCR qayta ishlash serializeri"""
     
+    query_hints = {
+        'user_name': {'select_related': ['user']},
+        'test_title': {'select_related': ['test']},
+    }
+    
     user_name = serializers.SerializerMethodField()
     test_title = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
@@ -39,9 +45,13 @@ class OCRProcessingSerializer(serializers.ModelSerializer):
         return obj.get_status_display()
 
 
-class TestResultSerializer(serializers.ModelSerializer):
+class TestResultSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Test natijasi serializeri"""
     
+    query_hints = {
+        'test_title': {'select_related': ['ocr_processing__test']},
+    }
+    
     student_name = serializers.CharField(read_only=True)
     test_title = serializers.SerializerMethodField()
     grade_display = serializers.SerializerMethodField()
@@ -65,22 +75,29 @@ class TestResultSerializer(serializers.ModelSerializer):
         return obj.grade
 
 
-class ExcelExportSerializer(serializers.ModelSerializer):
+class ExcelExportSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Excel eksport serializeri"""
     
+    query_hints = {
+        'user_name': {'select_related': ['user']},
+        'test_title': {'select_related': ['test']},
+    }
+    
     user_name = serializers.SerializerMethodField()
     test_title = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
     file_size = serializers.SerializerMethodField()
+    status_display = serializers.SerializerMethodField()
     
     class Meta:
         model = ExcelExport
         fields = [
             'id', 'user', 'user_name', 'test', 'test_title',
             'file', 'file_url', 'file_size', 'total_students',
-            'created_at'
+            'dataset', 'export_format', 'filters', 'status', 'status_display', 'progress', 'error_message',
+            'created_at', 'completed_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'completed_at']
     
     def get_user_name(self, obj):
         """Foydalanuvchi nomini qaytaradi"""
@@ -96,6 +113,10 @@ class ExcelExportSerializer(serializers.ModelSerializer):
             return obj.file.url
         return None
     
+    def get_status_display(self, obj):
+        """Holat nomini qaytaradi"""
+        return obj.get_status_display()
+    
     def get_file_size(self, obj):
         """Fayl hajmini qaytaradi"""
         if obj.file:
@@ -7,16 +7,29 @@ import json
 import logging
 import os
 import io
+import tempfile
+from datetime import timedelta
 from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Max
+from django.db.models.functions import Length
+from django.utils import timezone
 from google.cloud import vision
 from google.oauth2 import service_account
+from ustoziya_platform import ai_clients, background
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
-from .models import OCRProcessing, TestResult
+from accounts.models import User
+from .models import OCRProcessing, TestResult, ExcelExport
+from . import exports
 
 logger = logging.getLogger(__name__)
 
+SUBJECT_DISPLAY = dict(User.SUBJECT_CHOICES)
+
 
 class OCRService:
     """OCR xizmati"""
@@ -26,12 +39,9 @@ class OCRService:
         if hasattr(settings, 'TESSERACT_PATH'):
             pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_PATH
         
-        # Google Vision API'ni sozlash
+        # Google Vision API klienti reestrdan olinadi (har yuklashda qayta yaratilmaydi)
         try:
-            # API key orqali autentifikatsiya
-            import os
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = getattr(settings, 'GOOGLE_API_KEY', '')
-            self.vision_client = vision.ImageAnnotatorClient()
+            self.vision_client = ai_clients.get_vision_client()
         except Exception as e:
             logger.warning(f"Google Vision API sozlanmadi: {e}")
             self.vision_client = None
@@ -45,6 +55,9 @@ class OCRService:
             # Rangli rasmni kulrangga aylantirish
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             
+            # Tesseract uchun ish o'lchami (katta massivlarda vaqt ortadi, aniqlik emas)
+            gray = self.fit_for_ocr(gray)
+            
             # Shovqinni kamaytirish
             denoised = cv2.medianBlur(gray, 3)
             
@@ -60,6 +73,21 @@ class OCRService:
             logger.error(f"Rasmni qayta ishlashda xatolik: {e}")
             return None
     
+    def fit_for_ocr(self, gray):
+        """Uzun tomonni OCR_IMAGE_MIN_SIDE..OCR_IMAGE_MAX_SIDE oralig'iga keltiradi"""
+        height, width = gray.shape[:2]
+        longest = max(height, width)
+        max_side = getattr(settings, 'OCR_IMAGE_MAX_SIDE', 2400)
+        min_side = getattr(settings, 'OCR_IMAGE_MIN_SIDE', 1600)
+        if longest > max_side:
+            scale, interpolation = max_side / longest, cv2.INTER_AREA
+        elif longest < min_side:
+            scale, interpolation = min_side / longest, cv2.INTER_CUBIC
+        else:
+            return gray
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(gray, size, interpolation=interpolation)
+    
     def extract_text(self, image_path):
         """Rasmdan matnni ajratib olish"""
         try:
@@ -258,91 +286,274 @@ class TestGradingService:
 
 
 class ExcelExportService:
-    """Excel eksport xizmati"""
+    """Excel eksport xizmati
+
+    Workbook openpyxl'ning write-only rejimida yoziladi: qatorlar queryset'dan
+    `.iterator()` orqali oqim bilan o'qiladi va to'g'ridan-to'g'ri vaqtinchalik
+    faylga yoziladi, shuning uchun xotira sarfi qatorlar soniga bog'liq emas.
+    """
+    
+    RESULT_COLUMNS = [
+        ("O'quvchi ismi", 'student_name'),
+        ("Sinf", 'student_class'),
+        ("Jami savollar", 'total_questions'),
+        ("To'g'ri javoblar", 'correct_answers'),
+        ("Noto'g'ri javoblar", 'wrong_answers'),
+        ("Ball", 'score'),
+        ("Foiz", 'percentage'),
+        ("Baholash", 'grade'),
+        ("Qayta ishlangan vaqt", 'processed_at'),
+    ]
+    # Matnli ustunlar kengligi bazadagi eng uzun qiymat bo'yicha aniqlanadi
+    TEXT_FIELDS = ('student_name', 'student_class', 'grade')
+    # Formatlangan ustunlarning maksimal kengligi oldindan ma'lum
+    FIXED_WIDTHS = {
+        'total_questions': 5,
+        'correct_answers': 5,
+        'wrong_answers': 5,
+        'score': 5,
+        'percentage': 6,
+        'processed_at': 19,
+    }
+    MAX_COLUMN_WIDTH = 40
+    CHUNK_SIZE = 2000
     
     def __init__(self):
         self.header_font = Font(bold=True)
     
-    def _auto_fit_columns(self, worksheet):
-        for column_cells in worksheet.columns:
-            max_length = 0
-            column = column_cells[0].column
-            for cell in column_cells:
+    def _column_widths(self, headers, results):
+        """Ustun kengliklari: sarlavha, qat'iy formatlar va bitta MAX(LENGTH()) so'rovi"""
+        max_lengths = results.aggregate(**{
+            field: Max(Length(field)) for field in self.TEXT_FIELDS
+        })
+        widths = []
+        for header, field in zip(headers, (field for _, field in self.RESULT_COLUMNS)):
+            value_length = max_lengths.get(field) or self.FIXED_WIDTHS.get(field, 0)
+            widths.append(min(max(len(header), value_length) + 2, self.MAX_COLUMN_WIDTH))
+        return widths
+    
+    def _create_sheet(self, workbook, title, headers, widths):
+        """Write-only varaq; kengliklar birinchi qatordan oldin belgilanishi shart"""
+        sheet = workbook.create_sheet(title)
+        for index, width in enumerate(widths, 1):
+            sheet.column_dimensions[get_column_letter(index)].width = width
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(sheet, value=header)
+            cell.font = self.header_font
+            header_cells.append(cell)
+        sheet.append(header_cells)
+        return sheet
+    
+    def _format_row(self, row):
+        (student_name, student_class, total_questions, correct_answers,
+         wrong_answers, score, percentage, grade, processed_at) = row
+        return [
+            student_name,
+            student_class or '',
+            total_questions,
+            correct_answers,
+            wrong_answers,
+            score,
+            f"{percentage:.1f}%",
+            grade,
+            timezone.localtime(processed_at).strftime('%Y-%m-%d %H:%M:%S'),
+        ]
+    
+    def write_test_results(self, test, results, output, on_progress=None):
+        """Test natijalarini Excel formatida `output` (fayl yoki fayl-obyekt) ga oqim bilan yozish"""
+        results = results.order_by('-processed_at')
+        headers = [header for header, _ in self.RESULT_COLUMNS]
+        fields = [field for _, field in self.RESULT_COLUMNS]
+        
+        workbook = Workbook(write_only=True)
+        results_sheet = self._create_sheet(
+            workbook, 'Test natijalari', headers, self._column_widths(headers, results)
+        )
+        
+        total_students = 0
+        for row in results.values_list(*fields).iterator(chunk_size=self.CHUNK_SIZE):
+            results_sheet.append(self._format_row(row))
+            total_students += 1
+            if on_progress and total_students % self.CHUNK_SIZE == 0:
+                on_progress(total_students)
+        
+        avg_percentage = results.aggregate(avg=Avg('percentage'))['avg'] or 0
+        summary_data = [
+            ("Test nomi", test.title),
+            ("Fan", SUBJECT_DISPLAY.get(test.subject, test.subject)),
+            ("Sinf darajasi", test.grade_level),
+            ("Jami o'quvchilar", total_students),
+            ("O'rtacha foiz", f"{avg_percentage:.1f}%"),
+            ("Eksport vaqti", timezone.localtime().strftime('%Y-%m-%d %H:%M:%S'))
+        ]
+        summary_widths = [
+            min(max(len(str(value)) for value in column) + 2, self.MAX_COLUMN_WIDTH)
+            for column in zip(("Ko'rsatkich", "Qiymat"), *summary_data)
+        ]
+        summary_sheet = self._create_sheet(workbook, "Umumiy ma'lumot", ["Ko'rsatkich", "Qiymat"], summary_widths)
+        for label, value in summary_data:
+            summary_sheet.append([label, value])
+        
+        workbook.save(output)
+        return total_students
+    
+    def request_export(self, user, test, dataset='results', export_format='xlsx', filters=None):
+        """Eksport vazifasini navbatga qo'yadi; (eksport, yangi_vazifa) juftligini qaytaradi
+        
+        Natijalar o'zgarmagan bo'lsa mavjud eksport qaytariladi, ikkinchi fayl yaratilmaydi.
+        EXCEL_EXPORT_STALE_MINUTES dan uzoq kutilmoqda/qayta ishlanmoqda holatida
+        turgan vazifa (masalan, jarayon qayta ishga tushib ip yo'qolgan) xatolik deb
+        hisoblanadi va qayta navbatga qo'yiladi.
+        """
+        exports.get_writer_class(export_format)
+        filters = filters or {}
+        version_key = exports.export_version(test, dataset, export_format, filters)
+        now = timezone.now()
+        stale_before = now - timedelta(minutes=getattr(settings, 'EXCEL_EXPORT_STALE_MINUTES', 30))
+        
+        with transaction.atomic():
+            # Test qatori qulflanadi: shartli UniqueConstraint MySQL'da yaratilmaydi,
+            # shuning uchun bir xil versiyaning parallel navbatga qo'yilishi shu qulf bilan to'xtatiladi
+            list(type(test).objects.select_for_update().filter(pk=test.pk).values_list('pk', flat=True))
+            export = ExcelExport.objects.filter(test=test, version_key=version_key).first()
+            if export and export.status in ('pending', 'processing'):
+                if export.queued_at >= stale_before:
+                    return export, False
+                logger.warning(f"Eksport #{export.pk} osilib qolgan ({export.status}), qayta navbatga qo'yilmoqda")
+            elif export and export.status == 'completed' and export.file and export.file.storage.exists(export.file.name):
+                return export, False
+            
+            if export:
+                # Xatolik bilan tugagan, fayli yo'qolgan yoki osilib qolgan eksport qayta ishga tushiriladi
+                export.status = 'pending'
+                export.progress = 0
+                export.error_message = None
+                export.queued_at = now
+                export.save(update_fields=['status', 'progress', 'error_message', 'queued_at'])
+            else:
                 try:
-                    cell_length = len(str(cell.value)) if cell.value is not None else 0
-                    max_length = max(max_length, cell_length)
-                except Exception:
-                    continue
-            adjusted_width = min(max_length + 2, 40)
-            worksheet.column_dimensions[get_column_letter(column)].width = adjusted_width
+                    with transaction.atomic():
+                        export = ExcelExport.objects.create(
+                            user=user,
+                            test=test,
+                            dataset=dataset,
+                            export_format=export_format,
+                            filters=filters,
+                            version_key=version_key,
+                            queued_at=now,
+                            total_students=exports.get_dataset(dataset).queryset(test, filters).count()
+                        )
+                except IntegrityError:
+                    # Parallel so'rov xuddi shu versiyani allaqachon navbatga qo'ydi
+                    return ExcelExport.objects.get(test=test, version_key=version_key), False
+        
+        background.submit(run_excel_export, export.pk)
+        export.refresh_from_db()
+        return export, True
     
-    def export_test_results(self, test, results):
-        """Test natijalarini Excel ga eksport qilish"""
+    def run_export(self, export):
+        """Eksport vazifasini bajaradi va faylni Django storage orqali saqlaydi"""
+        claimed = ExcelExport.objects.filter(
+            pk=export.pk, status='pending'
+        ).update(status='processing', progress=0)
+        if not claimed:
+            return
+        
+        expected = max(export.total_students, 1)
+        
+        def on_progress(written):
+            # Oxirgi 1% fayl storage'ga saqlangandan keyin belgilanadi
+            progress = min(99, written * 100 // expected)
+            ExcelExport.objects.filter(pk=export.pk).update(progress=progress)
+        
         try:
-            if not results:
-                logger.warning("Excel eksport qilish uchun natijalar topilmadi")
-                return None
-            
-            export_dir = os.path.join('media', 'excel_exports')
-            os.makedirs(export_dir, exist_ok=True)
-            timestamp = results[0].processed_at.strftime('%Y%m%d_%H%M%S')
-            excel_path = os.path.join(export_dir, f"test_{test.id}_{timestamp}.xlsx")
-            
-            workbook = Workbook()
-            results_sheet = workbook.active
-            results_sheet.title = 'Test natijalari'
-            
-            headers = [
-                "O'quvchi ismi",
-                "Sinf",
-                "Jami savollar",
-                "To'g'ri javoblar",
-                "Noto'g'ri javoblar",
-                "Ball",
-                "Foiz",
-                "Baholash",
-                "Qayta ishlangan vaqt"
-            ]
-            results_sheet.append(headers)
-            for cell in results_sheet[1]:
-                cell.font = self.header_font
-            
-            for result in results:
-                results_sheet.append([
-                    result.student_name,
-                    result.student_class or '',
-                    result.total_questions,
-                    result.correct_answers,
-                    result.wrong_answers,
-                    result.score,
-                    f"{result.percentage:.1f}%",
-                    result.grade,
-                    result.processed_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-            
-            self._auto_fit_columns(results_sheet)
-            
-            summary_sheet = workbook.create_sheet("Umumiy ma'lumot")
-            summary_data = [
-                ("Test nomi", test.title),
-                ("Fan", test.get_subject_display()),
-                ("Sinf darajasi", test.grade_level),
-                ("Jami o'quvchilar", len(results)),
-                ("O'rtacha foiz", f"{sum(r.percentage for r in results) / len(results):.1f}%"),
-                ("Eksport vaqti", results[0].processed_at.strftime('%Y-%m-%d %H:%M:%S'))
-            ]
-            summary_sheet.append(["Ko'rsatkich", "Qiymat"])
-            for cell in summary_sheet[1]:
-                cell.font = self.header_font
-            
-            for label, value in summary_data:
-                summary_sheet.append([label, value])
-            
-            self._auto_fit_columns(summary_sheet)
-            
-            workbook.save(excel_path)
-            return excel_path
-            
+            extension = exports.WRITERS[export.export_format].extension
+            with tempfile.TemporaryFile(suffix=f'.{extension}') as output:
+                if export.dataset == 'results' and export.export_format == 'xlsx':
+                    # OCR natijalari uchun Excel - umumiy ma'lumot varag'i bilan
+                    results = exports.get_dataset('results').queryset(export.test, export.filters)
+                    total_students = self.write_test_results(export.test, results, output, on_progress=on_progress)
+                else:
+                    total_students = exports.write_dataset(
+                        export.dataset, export.export_format, export.test, export.filters,
+                        output, on_progress=on_progress
+                    )
+                output.seek(0)
+                export.file.save(
+                    f"test_{export.test_id}_{export.dataset}_{export.version_key[:12]}.{extension}",
+                    File(output), save=False
+                )
+            export.status = 'completed'
+            export.progress = 100
+            export.total_students = total_students
+            export.completed_at = timezone.now()
+            export.save(update_fields=['file', 'status', 'progress', 'total_students', 'completed_at'])
         except Exception as e:
-            logger.error(f"Excel eksportda xatolik: {e}")
-            return None
+            logger.error(f"Eksportda xatolik: {e}")
+            ExcelExport.objects.filter(pk=export.pk).update(
+                status='failed', error_message=str(e)
+            )
+    
+    def cleanup(self, retention_days=None, stale_minutes=None):
+        """Eski eksport fayllarini o'chiradi; o'chirilgan eksportlar sonini qaytaradi
+        
+        Har bir test, to'plam va format uchun oxirgi tayyor eksport saqlanadi,
+        qolganlari saqlash muddati o'tgach o'chiriladi. Uzoq vaqt osilib qolgan
+        vazifalar xatolik deb belgilanadi, bazada yozuvi yo'q fayllar storage'dan
+        o'chiriladi.
+        """
+        if retention_days is None:
+            retention_days = getattr(settings, 'EXCEL_EXPORT_RETENTION_DAYS', 7)
+        if stale_minutes is None:
+            stale_minutes = getattr(settings, 'EXCEL_EXPORT_STALE_MINUTES', 30)
+        now = timezone.now()
+        
+        ExcelExport.objects.filter(
+            status__in=['pending', 'processing'],
+            queued_at__lt=now - timedelta(minutes=stale_minutes)
+        ).update(status='failed', error_message='Eksport vaqti tugadi')
+        
+        latest_ids = [
+            row['latest_id'] for row in ExcelExport.objects.filter(status='completed')
+            .values('test', 'dataset', 'export_format').annotate(latest_id=Max('id'))
+        ]
+        expired = ExcelExport.objects.filter(
+            created_at__lt=now - timedelta(days=retention_days)
+        ).exclude(
+            status__in=['pending', 'processing']
+        ).exclude(pk__in=latest_ids)
+        
+        deleted = 0
+        for export in list(expired):
+            if export.file:
+                export.file.delete(save=False)
+            export.delete()
+            deleted += 1
+        
+        self._delete_orphan_files(older_than=now - timedelta(minutes=stale_minutes))
+        return deleted
+    
+    def _delete_orphan_files(self, older_than):
+        """Bazada yozuvi bo'lmagan eksport fayllarini o'chiradi (yozilayotganlari tegilmaydi)"""
+        storage = ExcelExport._meta.get_field('file').storage
+        directory = 'excel_exports'
+        try:
+            _, filenames = storage.listdir(directory)
+        except (FileNotFoundError, NotImplementedError):
+            return
+        
+        referenced = set(
+            ExcelExport.objects.exclude(file='').values_list('file', flat=True)
+        )
+        for filename in filenames:
+            name = f'{directory}/{filename}'
+            if name not in referenced and storage.get_modified_time(name) < older_than:
+                storage.delete(name)
+
+
+def run_excel_export(export_id):
+    """Fon vazifasi: eksportni bajaradi"""
+    export = ExcelExport.objects.select_related('test').filter(pk=export_id).first()
+    if export:
+        ExcelExportService().run_export(export)
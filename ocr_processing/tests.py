@@ -1,3 +1,167 @@
-from django.test import TestCase
+import csv
+import io
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tests.models import Answer, Question, StudentAnswer, Test, TestAttempt, TestCategory
+from ustoziya_platform.testing import TemporaryMediaMixin
+
+from . import exports
+from .models import ExcelExport, OCRProcessing, TestResult
+from .services import ExcelExportService
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, EXCEL_EXPORT_STALE_MINUTES=30)
+class ExcelExportLifecycleTests(TemporaryMediaMixin, TestCase):
+    """Eksport vazifasi: navbat, qayta ishlatish, osilib qolgan vazifani qayta navbatga qo'yish"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='teacher', password='parol12345')
+        self.test = Test.objects.create(
+            title='Kasrlar', description='', category=TestCategory.objects.create(name='Matematika'),
+            author=self.user, subject='mathematics', grade_level='5',
+        )
+        self.service = ExcelExportService()
+
+    def test_export_completes_and_is_reused(self):
+        export, created = self.service.request_export(self.user, self.test)
+        self.assertTrue(created)
+        self.assertEqual((export.status, export.progress), ('completed', 100))
+        self.assertTrue(export.file.storage.exists(export.file.name))
+
+        again, created = self.service.request_export(self.user, self.test)
+        self.assertFalse(created)
+        self.assertEqual(again.pk, export.pk)
+        self.assertEqual(ExcelExport.objects.count(), 1)
+
+    def test_running_export_is_not_queued_twice(self):
+        with override_settings(BACKGROUND_TASKS_EAGER=False), self.captureOnCommitCallbacks() as callbacks:
+            export, created = self.service.request_export(self.user, self.test)
+            self.assertTrue(created)
+            again, created = self.service.request_export(self.user, self.test)
+        self.assertFalse(created)
+        self.assertEqual((again.pk, again.status), (export.pk, 'pending'))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_stale_export_is_requeued(self):
+        with override_settings(BACKGROUND_TASKS_EAGER=False), self.captureOnCommitCallbacks():
+            export, _ = self.service.request_export(self.user, self.test)
+        # Ip yo'qolgan: vazifa hech qachon tugamaydi
+        ExcelExport.objects.filter(pk=export.pk).update(
+            status='processing', progress=40, queued_at=timezone.now() - timedelta(minutes=31),
+        )
+        requeued, created = self.service.request_export(self.user, self.test)
+        self.assertTrue(created)
+        self.assertEqual((requeued.pk, requeued.status, requeued.progress), (export.pk, 'completed', 100))
+
+    def test_failed_export_is_retried(self):
+        export, _ = self.service.request_export(self.user, self.test)
+        ExcelExport.objects.filter(pk=export.pk).update(status='failed', error_message='disk to\'la')
+        retried, created = self.service.request_export(self.user, self.test)
+        self.assertTrue(created)
+        self.assertEqual((retried.status, retried.error_message), ('completed', None))
+
+    def test_cleanup_marks_stale_jobs_failed(self):
+        with override_settings(BACKGROUND_TASKS_EAGER=False), self.captureOnCommitCallbacks():
+            export, _ = self.service.request_export(self.user, self.test)
+        ExcelExport.objects.filter(pk=export.pk).update(queued_at=timezone.now() - timedelta(minutes=31))
+        self.service.cleanup()
+        export.refresh_from_db()
+        self.assertEqual(export.status, 'failed')
+
+
+class ExportWriterTests(TestCase):
+    """CSV va Parquet eksport: sarlavhalar, qatorlar soni, ekranlash va filtrlar"""
+
+    tricky_name = 'Aliyev, "Ali"\nikkinchi qator'
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='teacher', password='parol12345')
+        self.test = Test.objects.create(
+            title='Kasrlar', description='', category=TestCategory.objects.create(name='Matematika'),
+            author=user, subject='mathematics', grade_level='5',
+        )
+        for index, (name, student_class) in enumerate(((self.tricky_name, '5-A'), ('Vali', '5-B'))):
+            processing = OCRProcessing.objects.create(user=user, test=self.test, image=f'ocr_images/{index}.png')
+            TestResult.objects.create(
+                ocr_processing=processing, student_name=name, student_class=student_class,
+                total_questions=10, correct_answers=8 - index, score=8 - index, percentage=80.0 - index * 10,
+            )
+        question = Question.objects.create(test=self.test, question_text='2 + 2?')
+        first = Answer.objects.create(question=question, answer_text='4', is_correct=True, order=1)
+        second = Answer.objects.create(question=question, answer_text='to\'rt; "4"', order=2)
+        attempt = TestAttempt.objects.create(
+            test=self.test, student_name=self.tricky_name, student_class='5-A',
+            completed_at=timezone.now(), is_completed=True, score=1, percentage=100.0,
+        )
+        TestAttempt.objects.create(test=self.test, student_name='Vali', student_class='5-B')
+        answer = StudentAnswer.objects.create(attempt=attempt, question=question, is_correct=True, points_earned=1)
+        answer.selected_answers.set([second, first])
+
+    def export(self, dataset_name, export_format, filters=None):
+        output = io.BytesIO()
+        progress = []
+        written = exports.write_dataset(
+            dataset_name, export_format, self.test, filters or {}, output, on_progress=progress.append,
+        )
+        self.assertEqual(progress[-1] if progress else 0, written)
+        return output.getvalue(), written
+
+    def read_csv(self, dataset_name, filters=None):
+        content, written = self.export(dataset_name, 'csv', filters)
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8'), newline='')))
+        self.assertEqual(rows[0], [column.field for column in exports.get_dataset(dataset_name).columns])
+        self.assertEqual(len(rows) - 1, written)
+        return rows[1:]
+
+    def test_csv_results(self):
+        rows = self.read_csv('results')
+        self.assertEqual([row[1] for row in rows], [self.tricky_name, 'Vali'])
+        self.assertEqual(rows[0][7], '80.0')
+        self.assertRegex(rows[0][9], r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+    def test_csv_filters(self):
+        self.assertEqual([row[2] for row in self.read_csv('results', {'student_class': '5-B'})], ['5-B'])
+        self.assertEqual(self.read_csv('attempts', {'date_to': '2000-01-01'}), [])
+
+    def test_csv_attempts(self):
+        rows = self.read_csv('attempts')
+        self.assertEqual([(row[1], row[7]) for row in rows], [(self.tricky_name, 'True'), ('Vali', 'False')])
+        self.assertEqual(rows[1][4], '')
+
+    def test_csv_answers_join_selected_answers(self):
+        (row,) = self.read_csv('answers')
+        self.assertEqual(row[2], self.tricky_name)
+        self.assertEqual(row[6], '4; to\'rt; "4"')
+
+    def test_chunks_cover_all_rows(self):
+        dataset = exports.get_dataset('attempts')
+        chunks = list(dataset.iter_chunks(dataset.queryset(self.test), chunk_size=1))
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 1])
+
+    @skipUnless(exports.pa is not None, "pyarrow o'rnatilmagan")
+    def test_parquet(self):
+        for dataset_name, expected_rows in (('results', 2), ('attempts', 2), ('answers', 1)):
+            with self.subTest(dataset=dataset_name):
+                content, written = self.export(dataset_name, 'parquet')
+                table = exports.pq.read_table(io.BytesIO(content))
+                columns = exports.get_dataset(dataset_name).columns
+                self.assertEqual(table.column_names, [column.field for column in columns])
+                self.assertEqual((table.num_rows, written), (expected_rows, expected_rows))
+                for column in columns:
+                    if column.kind == 'datetime':
+                        self.assertEqual(str(table.schema.field(column.field).type), 'timestamp[us, tz=UTC]')
+        table = exports.pq.read_table(io.BytesIO(self.export('results', 'parquet')[0]))
+        self.assertEqual(table.column('student_name').to_pylist(), [self.tricky_name, 'Vali'])
+        self.assertEqual(table.column('percentage').to_pylist(), [80.0, 70.0])
+
+    def test_parquet_requires_pyarrow(self):
+        with mock.patch.object(exports, 'pa', None):
+            self.assertNotIn('parquet', exports.available_formats())
+            with self.assertRaisesMessage(ValueError, 'pyarrow'):
+                exports.get_writer_class('parquet')
@@ -3,14 +3,17 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.http import FileResponse
 from django.conf import settings
-import os
+from django.urls import reverse
 import logging
 
 from .models import OCRProcessing, TestResult, ExcelExport
-from .services import OCRService
+from .services import OCRService, ExcelExportService
+from . import exports
 from tests.models import Test
+from ustoziya_platform import images
+from ustoziya_platform.serializers import SparseFieldsetViewMixin, shape_queryset
 from .serializers import (
     OCRProcessingSerializer,
     TestResultSerializer,
@@ -33,10 +36,19 @@ def upload_test_image(request):
         image_file = request.FILES['image']
         test_id = request.data.get('test_id')
         
+        # EXIF burilishi, OCR uchun o'lcham, metama'lumotlarsiz qayta kodlash
+        try:
+            normalized_image = images.normalize_image(image_file, 'ocr')
+        except images.InvalidImage:
+            return Response({
+                'error': 'Yuklangan fayl rasm emas yoki buzilgan'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         # OCR qayta ishlash obyektini yaratish
         ocr_processing = OCRProcessing.objects.create(
             user=request.user,
-            image=image_file,
+            image=normalized_image,
+            original_image=image_file if images.keeps_original('ocr') else None,
             status='pending'
         )
         
@@ -95,7 +107,8 @@ def upload_test_image(request):
 def ocr_processing_list(request):
     """OCR qayta ishlashlar ro'yxati"""
     processings = OCRProcessing.objects.filter(user=request.user).order_by('-created_at')
-    serializer = OCRProcessingSerializer(processings, many=True)
+    processings = shape_queryset(processings, OCRProcessingSerializer, request)
+    serializer = OCRProcessingSerializer(processings, many=True, context={'request': request})
     return Response(serializer.data)
 
 
@@ -114,46 +127,54 @@ def test_results_list(request, test_id):
     """Test natijalari ro'yxati"""
     test = get_object_or_404(Test, pk=test_id, author=request.user)
     results = TestResult.objects.filter(ocr_processing__test=test).order_by('-processed_at')
-    serializer = TestResultSerializer(results, many=True)
+    results = shape_queryset(results, TestResultSerializer, request)
+    serializer = TestResultSerializer(results, many=True, context={'request': request})
     return Response(serializer.data)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def export_to_excel(request, test_id):
-    """Test natijalarini Excel ga eksport qilish"""
+    """Test natijalarini eksport qilish (fon vazifasi sifatida)
+    
+    Parametrlar: format (xlsx, csv, parquet), dataset (results, attempts,
+    answers) va filtrlar (student_class, date_from, date_to).
+    """
     try:
         test = get_object_or_404(Test, pk=test_id, author=request.user)
-        results = TestResult.objects.filter(ocr_processing__test=test)
-        
-        if not results.exists():
+        dataset_name = request.data.get('dataset', 'results')
+        export_format = request.data.get('format', 'xlsx')
+        try:
+            filters = exports.clean_filters(request.data)
+            exports.get_writer_class(export_format)
+            rows = exports.get_dataset(dataset_name).queryset(test, filters)
+        except ValueError as e:
             return Response({
-                'error': 'Eksport qilish uchun natijalar mavjud emas'
+                'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Excel fayl yaratish (vaqtincha o'chirilgan)
-        excel_path = None
-        # excel_service = ExcelExportService()
-        # excel_path = excel_service.export_test_results(test, list(results))
-        
-        if not excel_path:
+        if not rows.exists():
             return Response({
-                'error': 'Excel fayl yaratishda xatolik'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'error': 'Eksport qilish uchun natijalar mavjud emas'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Excel eksport obyektini yaratish
-        excel_export = ExcelExport.objects.create(
-            user=request.user,
-            test=test,
-            file=excel_path,
-            total_students=results.count()
+        # Natijalar o'zgarmagan bo'lsa mavjud eksport qaytariladi
+        excel_service = ExcelExportService()
+        excel_export, created = excel_service.request_export(
+            request.user, test, dataset=dataset_name, export_format=export_format, filters=filters
         )
         
-        return Response({
-            'message': 'Excel fayl muvaffaqiyatli yaratildi',
+        data = {
             'excel_export': ExcelExportSerializer(excel_export).data,
-            'download_url': excel_export.file.url
-        })
+            'status_url': reverse('excel_export_status', args=[excel_export.pk]),
+        }
+        if excel_export.status == 'completed':
+            data['message'] = 'Eksport fayli muvaffaqiyatli yaratildi'
+            data['download_url'] = reverse('download_excel', args=[excel_export.pk])
+            return Response(data)
+        
+        data['message'] = 'Eksport navbatga qo\'yildi' if created else 'Eksport allaqachon tayyorlanmoqda'
+        return Response(data, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         logger.error(f"Excel eksportda xatolik: {e}")
@@ -162,22 +183,42 @@ def export_to_excel(request, test_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def excel_export_status(request, export_id):
+    """Excel eksport holati va jarayoni"""
+    excel_export = get_object_or_404(ExcelExport, pk=export_id, test__author=request.user)
+    data = ExcelExportSerializer(excel_export).data
+    if excel_export.status == 'completed':
+        data['download_url'] = reverse('download_excel', args=[excel_export.pk])
+    return Response(data)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def download_excel(request, export_id):
     """Excel faylini yuklab olish"""
     try:
-        excel_export = get_object_or_404(ExcelExport, pk=export_id, user=request.user)
+        excel_export = get_object_or_404(ExcelExport, pk=export_id, test__author=request.user)
         
-        if not os.path.exists(excel_export.file.path):
+        if excel_export.status != 'completed':
+            return Response({
+                'error': 'Fayl hali tayyor emas'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        if not excel_export.file or not excel_export.file.storage.exists(excel_export.file.name):
             return Response({
                 'error': 'Fayl topilmadi'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        with open(excel_export.file.path, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="test_results_{excel_export.test.id}.xlsx"'
-            return response
+        # Fayl xotiraga to'liq o'qilmaydi, bo'laklab uzatiladi
+        writer_class = exports.WRITERS[excel_export.export_format]
+        return FileResponse(
+            excel_export.file.open('rb'),
+            as_attachment=True,
+            filename=f"test_{excel_export.dataset}_{excel_export.test_id}.{writer_class.extension}",
+            content_type=writer_class.content_type
+        )
             
     except Exception as e:
         logger.error(f"Excel yuklab olishda xatolik: {e}")
@@ -191,11 +232,12 @@ def download_excel(request, export_id):
 def excel_exports_list(request):
     """Excel eksportlar ro'yxati"""
     exports = ExcelExport.objects.filter(user=request.user).order_by('-created_at')
-    serializer = ExcelExportSerializer(exports, many=True)
+    exports = shape_queryset(exports, ExcelExportSerializer, request)
+    serializer = ExcelExportSerializer(exports, many=True, context={'request': request})
     return Response(serializer.data)
 
 
-class OCRProcessingListView(generics.ListAPIView):
+class OCRProcessingListView(SparseFieldsetViewMixin, generics.ListAPIView):
     """OCR qayta ishlashlar ro'yxati (Generic View)"""
     serializer_class = OCRProcessingSerializer
     permission_classes = [IsAuthenticated]
@@ -204,7 +246,7 @@ class OCRProcessingListView(generics.ListAPIView):
         return OCRProcessing.objects.filter(user=self.request.user).order_by('-created_at')
 
 
-class TestResultListView(generics.ListAPIView):
+class TestResultListView(SparseFieldsetViewMixin, generics.ListAPIView):
     """Test natijalari ro'yxati (Generic View)"""
     serializer_class = TestResultSerializer
     permission_classes = [IsAuthenticated]
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tests'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from ustoziya_platform.category_lists import connect_signals
+        connect_signals('tests.TestCategory')
@@ -0,0 +1,229 @@
+from django.conf import settings
+from django.db.models import Count, Prefetch, prefetch_related_objects
+import hashlib
+import io
+import logging
+import os
+
+from docx import Document
+
+from ustoziya_platform import caching
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    from xml.sax.saxutils import escape
+except ImportError:  # pragma: no cover - optional dependency
+    SimpleDocTemplate = None
+
+from .models import Test, Question, Answer
+
+logger = logging.getLogger(__name__)
+
+SUBJECT_NAMES = {
+    'mathematics': 'Matematika',
+    'physics': 'Fizika',
+    'chemistry': 'Kimyo',
+    'biology': 'Biologiya',
+    'geography': 'Geografiya',
+    'history': 'Tarix',
+    'literature': 'Adabiyot',
+    'language': 'Til va adabiyot',
+    'english': 'Ingliz tili',
+    'russian': 'Rus tili',
+    'computer_science': 'Informatika',
+    'art': 'San\'at',
+    'physical_education': 'Jismoniy tarbiya',
+    'other': 'Boshqa'
+}
+
+DOCUMENT_FORMATS = {
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pdf': 'application/pdf',
+}
+
+# Kirill va o'zbek lotin harflari uchun Unicode shrift (Helvetica faqat Latin-1)
+DEFAULT_PDF_FONT_PATHS = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+)
+
+
+class TestDocumentService:
+    """Testni Word va PDF hujjatlariga aylantirish xizmati
+
+    Kesh kaliti bitta so'rov bilan aniqlanadi; keshda bo'lmasa test savollar
+    va javoblari bilan bitta so'rovlar grafida yuklanadi, hujjat bir marta
+    chiziladi va baytlari testning kontent versiyasi bo'yicha keshlanadi.
+    """
+
+    CACHE_PREFIX = 'tests:document'
+    CACHE_TAG = 'test_documents'
+
+    def load_test(self, test_id, author):
+        """Testni kontent versiyasi uchun savol/javob sonlari bilan yuklash (bitta so'rov)"""
+        return Test.objects.annotate(
+            questions_count=Count('questions', distinct=True),
+            answers_count=Count('questions__answers'),
+        ).get(id=test_id, author=author)
+
+    def content_version(self, test):
+        """Kontent versiyasi: savol yoki javob o'zgarsa testning updated_at yangilanadi"""
+        raw = f"{test.pk}|{test.updated_at.isoformat()}|{test.questions_count}|{test.answers_count}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+    def _prefetch(self, test):
+        """Savollar va javoblarni bitta so'rovlar grafida yuklash"""
+        questions = Question.objects.order_by('order').prefetch_related(
+            Prefetch('answers', queryset=Answer.objects.order_by('order'))
+        )
+        prefetch_related_objects([test], Prefetch('questions', queryset=questions))
+
+    def render(self, test, document_format='docx'):
+        """Hujjat baytlarini qaytaradi (keshdan yoki yangidan chizib)"""
+        if document_format not in DOCUMENT_FORMATS:
+            raise ValueError(f"Noma'lum hujjat formati: {document_format}")
+
+        cache_key = f"{self.CACHE_PREFIX}:{document_format}:{test.pk}:{self.content_version(test)}"
+        content = caching.get(cache_key, tags=[self.CACHE_TAG])
+        if content is not None:
+            return content
+
+        self._prefetch(test)
+        context = self._build_context(test)
+        if document_format == 'pdf':
+            content = self._render_pdf(context)
+        else:
+            content = self._render_docx(context)
+
+        if len(content) <= getattr(settings, 'TEST_DOCUMENT_CACHE_MAX_BYTES', 5 * 1024 * 1024):
+            caching.set(
+                cache_key, content, getattr(settings, 'TEST_DOCUMENT_CACHE_SECONDS', 86400), tags=[self.CACHE_TAG]
+            )
+        return content
+
+    def _build_context(self, test):
+        """Chizish uchun tayyor ma'lumotlar (barcha savol va javoblar xotirada)"""
+        questions = []
+        for number, question in enumerate(test.questions.all(), 1):
+            answers = []
+            correct_letter = None
+            for index, answer in enumerate(question.answers.all()):
+                letter = chr(65 + index)  # A, B, C, D
+                answers.append((letter, answer.answer_text))
+                if answer.is_correct and correct_letter is None:
+                    correct_letter = letter
+            questions.append({
+                'number': number,
+                'text': question.question_text,
+                'answers': answers,
+                'explanation': question.explanation,
+                'correct_letter': correct_letter,
+            })
+
+        info = [
+            f"Fan: {SUBJECT_NAMES.get(test.subject, test.subject)}",
+            f"Sinf: {test.grade_level}",
+            f"Qiyinlik: {test.get_difficulty_display()}",
+            f"Vaqt chegarasi: {test.time_limit} daqiqa",
+            f"Savollar soni: {len(questions)}",
+        ]
+        if test.description:
+            info.append(f"Tavsif: {test.description}")
+
+        return {'title': test.title, 'info': info, 'questions': questions}
+
+    def _render_docx(self, context):
+        """Word hujjati"""
+        doc = Document()
+
+        title = doc.add_heading(context['title'], 0)
+        title.alignment = 1  # Markazga tekislash
+
+        for line in context['info']:
+            doc.add_paragraph(line)
+        doc.add_paragraph()  # Bo'sh qator
+
+        for question in context['questions']:
+            doc.add_heading(f"Savol {question['number']}", level=2)
+            doc.add_paragraph(question['text'])
+            for letter, text in question['answers']:
+                doc.add_paragraph(f"{letter}) {text}")
+            if question['explanation']:
+                doc.add_paragraph(f"Tushuntirish: {question['explanation']}")
+            doc.add_paragraph()  # Bo'sh qator
+
+        # Javoblar jadvali
+        doc.add_heading("Javoblar jadvali", level=1)
+        table = doc.add_table(rows=1, cols=2)
+        table.style = 'Table Grid'
+        hdr_cells = table.rows[0].cells
+        hdr_cells[0].text = 'Savol'
+        hdr_cells[1].text = 'To\'g\'ri javob'
+        for question in context['questions']:
+            row_cells = table.add_row().cells
+            row_cells[0].text = str(question['number'])
+            row_cells[1].text = question['correct_letter'] or "Javob yo'q"
+
+        output = io.BytesIO()
+        doc.save(output)
+        return output.getvalue()
+
+    def _pdf_font(self):
+        """PDF uchun Unicode shriftini ro'yxatdan o'tkazadi (topilmasa Helvetica)"""
+        paths = [getattr(settings, 'PDF_FONT_PATH', '')] + list(DEFAULT_PDF_FONT_PATHS)
+        for path in paths:
+            if path and os.path.exists(path):
+                name = os.path.splitext(os.path.basename(path))[0]
+                if name not in pdfmetrics.getRegisteredFontNames():
+                    pdfmetrics.registerFont(TTFont(name, path))
+                return name
+        logger.warning("PDF uchun Unicode shrift topilmadi, Helvetica ishlatiladi")
+        return 'Helvetica'
+
+    def _render_pdf(self, context):
+        """Chop etish uchun PDF hujjati"""
+        if SimpleDocTemplate is None:
+            raise ValueError("PDF eksport uchun reportlab kutubxonasi o'rnatilmagan.")
+
+        font = self._pdf_font()
+        styles = getSampleStyleSheet()
+        for style in styles.byName.values():
+            style.fontName = font
+
+        story = [Paragraph(escape(context['title']), styles['Title'])]
+        for line in context['info']:
+            story.append(Paragraph(escape(line), styles['Normal']))
+        story.append(Spacer(1, 6 * mm))
+
+        for question in context['questions']:
+            story.append(Paragraph(f"Savol {question['number']}", styles['Heading2']))
+            story.append(Paragraph(escape(question['text']), styles['Normal']))
+            for letter, text in question['answers']:
+                story.append(Paragraph(escape(f"{letter}) {text}"), styles['Normal']))
+            if question['explanation']:
+                story.append(Paragraph(escape(f"Tushuntirish: {question['explanation']}"), styles['Italic']))
+            story.append(Spacer(1, 4 * mm))
+
+        story.append(Paragraph("Javoblar jadvali", styles['Heading1']))
+        rows = [['Savol', 'To\'g\'ri javob']] + [
+            [str(question['number']), question['correct_letter'] or "Javob yo'q"]
+            for question in context['questions']
+        ]
+        table = Table(rows, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('GRID', (0, 0), (-1, -1), 0.5, '#000000'),
+        ]))
+        story.append(table)
+
+        output = io.BytesIO()
+        SimpleDocTemplate(
+            output, pagesize=A4, title=context['title'],
+            leftMargin=20 * mm, rightMargin=20 * mm, topMargin=20 * mm, bottomMargin=20 * mm
+        ).build(story)
+        return output.getvalue()
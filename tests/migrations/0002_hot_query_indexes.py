@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='test',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_public', True)), fields=['-created_at'], name='test_pub_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='test',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_public', True)), fields=['category', '-created_at'], name='test_pub_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='test',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_public', True)), fields=['subject', '-created_at'], name='test_pub_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='test',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_public', True)), fields=['grade_level', '-created_at'], name='test_pub_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='test',
+            index=models.Index(fields=['author', '-created_at'], name='test_author_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['test', '-started_at'], name='attempt_test_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['test'], name='attempt_test_completed_idx'),
+        ),
+    ]
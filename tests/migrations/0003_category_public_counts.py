@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+def count_public_tests(apps, schema_editor):
+    TestCategory = apps.get_model('tests', 'TestCategory')
+    Test = apps.get_model('tests', 'Test')
+    for category_id in TestCategory.objects.values_list('pk', flat=True):
+        TestCategory.objects.filter(pk=category_id).update(
+            public_tests_count=Test.objects.filter(category_id=category_id, is_public=True, is_active=True).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tests', '0002_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testcategory',
+            name='public_tests_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ommaviy testlar soni'),
+        ),
+        migrations.RunPython(count_public_tests, migrations.RunPython.noop),
+    ]
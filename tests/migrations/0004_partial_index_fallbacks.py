@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from ustoziya_platform.db_indexes import partial_index_fallbacks
+
+
+class Migration(migrations.Migration):
+    """MySQL: shartli indekslar o'rniga oddiy kompozit indekslar (ustoziya_platform.db_indexes)"""
+
+    dependencies = [
+        ('tests', '0003_category_public_counts'),
+    ]
+
+    operations = [
+        partial_index_fallbacks('tests'),
+    ]
@@ -10,6 +10,8 @@ class TestCategory(models.Model):
     
     name = models.CharField(max_length=100, verbose_name='Kategoriya nomi')
     description = models.TextField(blank=True, null=True, verbose_name='Tavsif')
+    # Signallar orqali yuritiladi (ustoziya_platform.category_lists)
+    public_tests_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Ommaviy testlar soni')
     
     class Meta:
         verbose_name = 'Test kategoriyasi'
@@ -90,6 +92,32 @@ class Test(models.Model):
         verbose_name = 'Test'
         verbose_name_plural = 'Testlar'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['-created_at'],
+                name='test_pub_recent_idx',
+                condition=models.Q(is_public=True, is_active=True),
+            ),
+            models.Index(
+                fields=['category', '-created_at'],
+                name='test_pub_cat_idx',
+                condition=models.Q(is_public=True, is_active=True),
+            ),
+            models.Index(
+                fields=['subject', '-created_at'],
+                name='test_pub_subject_idx',
+                condition=models.Q(is_public=True, is_active=True),
+            ),
+            models.Index(
+                fields=['grade_level', '-created_at'],
+                name='test_pub_grade_idx',
+                condition=models.Q(is_public=True, is_active=True),
+            ),
+            models.Index(
+                fields=['author', '-created_at'],
+                name='test_author_recent_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.title
@@ -230,6 +258,17 @@ class TestAttempt(models.Model):
         verbose_name = 'Test topshirish'
         verbose_name_plural = 'Test topshirishlar'
         ordering = ['-started_at']
+        indexes = [
+            models.Index(
+                fields=['test', '-started_at'],
+                name='attempt_test_recent_idx',
+            ),
+            models.Index(
+                fields=['test'],
+                name='attempt_test_completed_idx',
+                condition=models.Q(is_completed=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.test.title} - {self.student_name}"
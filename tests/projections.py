@@ -0,0 +1,36 @@
+from accounts.models import User
+from ustoziya_platform.projections import Projection
+from .models import Test
+from .serializers import SUBJECT_DISPLAY_NAMES, TestSerializer
+
+
+class TestProjection(Projection):
+    """TestSerializer bilan bir xil natija (values() orqali)"""
+
+    serializer_class = TestSerializer
+
+    def get_columns(self):
+        return {
+            'id': self.value('id'),
+            'title': self.value('title'),
+            'description': self.value('description'),
+            'category': self.value('category_id'),
+            'category_name': self.value('category__name'),
+            'author': self.value('author_id'),
+            'author_name': self.full_name('author'),
+            'author_subject': self.display('author__subject', User.SUBJECT_CHOICES),
+            'difficulty': self.value('difficulty'),
+            'difficulty_display': self.display('difficulty', Test.DIFFICULTY_CHOICES),
+            'grade_level': self.value('grade_level'),
+            'subject': self.value('subject'),
+            'subject_display': self.display('subject', SUBJECT_DISPLAY_NAMES.items()),
+            'time_limit': self.value('time_limit'),
+            'total_questions': self.value('total_questions'),
+            'total_points': self.value('total_points'),
+            'is_public': self.value('is_public'),
+            'is_active': self.value('is_active'),
+            'questions_count': self.value('questions_count'),
+            'attempts_count': self.value('attempts_count'),
+            'created_at': self.datetime('created_at'),
+            'updated_at': self.datetime('updated_at'),
+        }
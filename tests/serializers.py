@@ -1,19 +1,36 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from ustoziya_platform.serializers import SparseFieldsetMixin, related_count
 from .models import Test, Question, Answer, TestAttempt, StudentAnswer, TestCategory
 
 
-class TestCategorySerializer(serializers.ModelSerializer):
+# Fan nomlari (Test.subject erkin matn, shuning uchun choices emas)
+SUBJECT_DISPLAY_NAMES = {
+    'mathematics': 'Matematika',
+    'physics': 'Fizika',
+    'chemistry': 'Kimyo',
+    'biology': 'Biologiya',
+    'geography': 'Geografiya',
+    'history': 'Tarix',
+    'literature': 'Adabiyot',
+    'language': 'Til va adabiyot',
+    'english': 'Ingliz tili',
+    'russian': 'Rus tili',
+    'computer_science': 'Informatika',
+    'art': 'San\'at',
+    'physical_education': 'Jismoniy tarbiya',
+    'other': 'Boshqa'
+}
+
+
+class TestCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Test kategoriya serializeri"""
     
-    tests_count = serializers.SerializerMethodField()
+    tests_count = serializers.IntegerField(source='public_tests_count', read_only=True)
     
     class Meta:
         model = TestCategory
         fields = ['id', 'name', 'description', 'tests_count']
-    
-    def get_tests_count(self, obj):
-        """Kategoriyadagi testlar soni"""
-        return obj.tests.filter(is_public=True, is_active=True).count()
 
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -25,9 +42,14 @@ class AnswerSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Savol serializeri"""
     
+    query_hints = {
+        'test_title': {'select_related': ['test']},
+        'answers': {'prefetch_related': ['answers']},
+    }
+    
     answers = AnswerSerializer(many=True, read_only=True)
     test_title = serializers.SerializerMethodField()
     image_url = serializers.SerializerMethodField()
@@ -57,9 +79,17 @@ class QuestionSerializer(serializers.ModelSerializer):
         return obj.get_question_type_display()
 
 
-class TestSerializer(serializers.ModelSerializer):
+class TestSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Test serializeri"""
     
+    query_hints = {
+        'author_name': {'select_related': ['author']},
+        'author_subject': {'select_related': ['author']},
+        'category_name': {'select_related': ['category']},
+        'questions_count': {'annotate': {'questions_count': related_count(Question.objects.all(), 'test')}},
+        'attempts_count': {'annotate': {'attempts_count': related_count(TestAttempt.objects.all(), 'test')}},
+    }
+    
     author_name = serializers.SerializerMethodField()
     author_subject = serializers.SerializerMethodField()
     category_name = serializers.SerializerMethodField()
@@ -93,24 +123,7 @@ class TestSerializer(serializers.ModelSerializer):
     
     def get_subject_display(self, obj):
         """Fan nomini qaytaradi"""
-        # Subject field mapping
-        subject_choices = {
-            'mathematics': 'Matematika',
-            'physics': 'Fizika',
-            'chemistry': 'Kimyo',
-            'biology': 'Biologiya',
-            'geography': 'Geografiya',
-            'history': 'Tarix',
-            'literature': 'Adabiyot',
-            'language': 'Til va adabiyot',
-            'english': 'Ingliz tili',
-            'russian': 'Rus tili',
-            'computer_science': 'Informatika',
-            'art': 'San\'at',
-            'physical_education': 'Jismoniy tarbiya',
-            'other': 'Boshqa'
-        }
-        return subject_choices.get(obj.subject, obj.subject)
+        return SUBJECT_DISPLAY_NAMES.get(obj.subject, obj.subject)
     
     def get_difficulty_display(self, obj):
         """Qiyinlik darajasi nomini qaytaradi"""
@@ -118,16 +131,25 @@ class TestSerializer(serializers.ModelSerializer):
     
     def get_questions_count(self, obj):
         """Savollar soni"""
+        if hasattr(obj, 'questions_count'):
+            return obj.questions_count
         return obj.questions.count()
     
     def get_attempts_count(self, obj):
         """Topshirishlar soni"""
+        if hasattr(obj, 'attempts_count'):
+            return obj.attempts_count
         return obj.attempts.count()
 
 
-class StudentAnswerSerializer(serializers.ModelSerializer):
+class StudentAnswerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """O'quvchi javob serializeri"""
     
+    query_hints = {
+        'question_text': {'select_related': ['question']},
+        'selected_answers_text': {'prefetch_related': ['selected_answers']},
+    }
+    
     question_text = serializers.SerializerMethodField()
     selected_answers_text = serializers.SerializerMethodField()
     
@@ -149,9 +171,18 @@ class StudentAnswerSerializer(serializers.ModelSerializer):
         return [answer.answer_text for answer in obj.selected_answers.all()]
 
 
-class TestAttemptSerializer(serializers.ModelSerializer):
+class TestAttemptSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Test topshirish serializeri"""
     
+    query_hints = {
+        'test_title': {'select_related': ['test']},
+        'student_answers': {'prefetch_related': [
+            Prefetch('student_answers', queryset=StudentAnswer.objects.select_related('question').prefetch_related(
+                'selected_answers'
+            )),
+        ]},
+    }
+    
     test_title = serializers.SerializerMethodField()
     student_answers = StudentAnswerSerializer(many=True, read_only=True)
     duration = serializers.SerializerMethodField()
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Test, Question, Answer
+
+
+def _touch_test(test_id):
+    """Savol yoki javob o'zgarganda testning kontent versiyasini yangilaydi"""
+    if test_id:
+        Test.objects.filter(pk=test_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    _touch_test(instance.test_id)
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    test_id = Question.objects.filter(pk=instance.question_id).values_list('test_id', flat=True).first()
+    _touch_test(test_id)
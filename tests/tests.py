@@ -1,3 +1,214 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from ustoziya_platform import caching
+
+from .ai_service import AITestGenerationService, supports_json_mode
+from .document_service import TestDocumentService
+from .models import Answer, Question, Test, TestCategory
+
+QUESTION_JSON = (
+    '{"questions": [{"question_text": "2 + 2 nechaga teng?", "question_type": "single_choice", '
+    '"points": 1, "explanation": "Qo\'shish", "answers": ['
+    '{"answer_text": "A) 4", "is_correct": true}, {"answer_text": "B) 5", "is_correct": false}]}]}'
+)
+
+
+class FakeModel:
+    """Gemini modeli o'rnida: har chaqiruvda bitta savol qaytaradi yoki xatolik beradi"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.configs = []
+
+    def generate_content(self, prompt, request_options=None, generation_config=None):
+        self.configs.append(generation_config)
+        if self.fail:
+            raise RuntimeError('Gemini xatoligi')
+        return mock.Mock(text=QUESTION_JSON)
+
+
+@override_settings(
+    GOOGLE_GEMINI_API_KEY='test-key',
+    AI_TEST_CHUNK_SIZE=2,
+    AI_TEST_CHUNK_RETRIES=1,
+)
+class AITestGenerationServiceTests(SimpleTestCase):
+    """AI test generatsiyasi: JSON rejimi va qisman muvaffaqiyatsizlik"""
+
+    def make_service(self, model, model_name='gemini-1.5-flash'):
+        with override_settings(GOOGLE_GEMINI_TEST_MODEL=model_name), \
+                mock.patch('tests.ai_service.ai_clients.get_generative_model', return_value=model):
+            return AITestGenerationService()
+
+    def test_json_mode_only_for_supported_models(self):
+        self.assertTrue(supports_json_mode('models/gemini-1.5-flash-latest'))
+        self.assertTrue(supports_json_mode('gemini-2.0-flash'))
+        self.assertFalse(supports_json_mode('gemini-pro'))
+        self.assertFalse(supports_json_mode('gemini-1.0-pro'))
+
+    def test_legacy_model_is_called_without_json_mime_type(self):
+        model = FakeModel()
+        service = self.make_service(model, model_name='gemini-pro')
+        service.generate_test_questions('mathematics', '5', 'medium', num_questions=1)
+        self.assertEqual(model.configs, [None])
+
+    def test_failed_chunks_are_not_padded_with_mock_questions(self):
+        model = FakeModel(fail=True)
+        service = self.make_service(model)
+        self.assertEqual(service.generate_test_questions('mathematics', '5', 'medium', num_questions=3), [])
+        # Har bir bo'lak uchun birinchi urinish va bitta qayta urinish
+        self.assertEqual(len(model.configs), 4)
+        self.assertEqual(model.configs[0], {'response_mime_type': 'application/json'})
+
+    def test_retries_request_only_missing_questions(self):
+        questions = self.make_service(FakeModel()).generate_test_questions(
+            'mathematics', '5', 'medium', num_questions=3,
+        )
+        self.assertEqual(len(questions), 3)
+        self.assertEqual({question['question_text'] for question in questions}, {'2 + 2 nechaga teng?'})
+
+
+class TestDocumentCacheTests(TestCase):
+    """Hujjat kontent versiyasi bo'yicha keshlanadi; savol/javob o'zgarsa qayta chiziladi"""
+
+    def setUp(self):
+        cache.clear()
+        caches['local'].clear()
+        self.author = User.objects.create_user(username='author', password='parol12345')
+        self.test = Test.objects.create(
+            title='Kasrlar', description='', category=TestCategory.objects.create(name='Algebra'),
+            author=self.author, subject='mathematics', grade_level='5',
+        )
+        self.question = Question.objects.create(test=self.test, question_text='1/2 + 1/2 = ?')
+        self.answer = Answer.objects.create(question=self.question, answer_text='1', is_correct=True)
+        self.service = TestDocumentService()
+
+    def render(self):
+        test = self.service.load_test(self.test.pk, self.author)
+        with mock.patch.object(self.service, '_render_docx', wraps=self.service._render_docx) as render_docx:
+            content = self.service.render(test, 'docx')
+        return content, render_docx.call_count
+
+    def test_rendered_document_is_cached(self):
+        content, renders = self.render()
+        self.assertEqual(renders, 1)
+        self.assertEqual(self.render(), (content, 0))
+
+    def test_question_edit_renders_again(self):
+        content, _ = self.render()
+        self.question.question_text = '1/3 + 1/3 = ?'
+        self.question.save()
+        new_content, renders = self.render()
+        self.assertEqual(renders, 1)
+        self.assertNotEqual(new_content, content)
+        self.assertEqual(self.render(), (new_content, 0))
+
+    def test_answer_edit_renders_again(self):
+        self.render()
+        self.answer.answer_text = '2/3'
+        self.answer.save()
+        self.assertEqual(self.render()[1], 1)
+
+    def test_added_and_deleted_answers_render_again(self):
+        self.render()
+        extra = Answer.objects.create(question=self.question, answer_text='0', order=2)
+        self.assertEqual(self.render()[1], 1)
+        extra.delete()
+        self.assertEqual(self.render()[1], 1)
+
+    def test_invalidating_the_tag_renders_again(self):
+        self.render()
+        caching.invalidate(TestDocumentService.CACHE_TAG)
+        self.assertEqual(self.render()[1], 1)
+
+
+class FakeGenerationService:
+    """AITestGenerationService o'rnida: bo'laklarni `chunks` bo'yicha beradi, keyin `fail_with` ni ko'taradi"""
+
+    chunks = []
+    fail_with = None
+    description_error = None
+    during_generation = None
+
+    def __init__(self):
+        self.quota_error = None
+
+    def generate_test_title(self, subject, grade_level, difficulty, topic):
+        return 'AI testi'
+
+    def generate_test_questions(self, subject, grade_level, difficulty, num_questions, on_chunk):
+        for chunk in self.chunks:
+            on_chunk(chunk)
+        if self.during_generation:
+            self.during_generation()
+        if self.fail_with:
+            raise self.fail_with
+
+    def generate_test_description(self, subject, grade_level, difficulty, questions_count):
+        if self.description_error:
+            raise self.description_error
+        return f'{questions_count} ta savol'
+
+
+@override_settings(AI_USER_BUCKET_CAPACITY=100)
+class AITestCreationTests(TestCase):
+    """AI test: savollar saqlanguncha qoralama, muvaffaqiyatsizlikda o'chiriladi"""
+
+    question = {'question_text': '2 + 2?', 'points': 2, 'answers': [{'answer_text': '4', 'is_correct': True}]}
+
+    def setUp(self):
+        caches['quotas'].clear()
+        self.author = User.objects.create_user(username='author', password='parol12345')
+        self.category = TestCategory.objects.create(name='Algebra')
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def generate(self, **service_attrs):
+        service = type('Service', (FakeGenerationService,), service_attrs)
+        with mock.patch('tests.views.AITestGenerationService', service):
+            return self.client.post('/api/tests/generate-ai/', {
+                'subject': 'mathematics', 'grade_level': '5', 'num_questions': 2, 'category_id': self.category.pk,
+            }, format='json')
+
+    def test_test_is_published_after_questions_are_saved(self):
+        response = self.generate(chunks=[[self.question], [self.question]])
+        self.assertEqual(response.status_code, 200)
+        test = Test.objects.get()
+        self.assertEqual((test.is_public, test.is_active), (True, True))
+        self.assertEqual((test.total_questions, test.total_points, test.description), (2, 4, '2 ta savol'))
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.public_tests_count, 1)
+
+    def test_draft_is_hidden_while_generating(self):
+        seen = {}
+
+        def check_lists():
+            seen['list'] = self.client.get('/api/tests/').json()
+            seen['search'] = self.client.get('/api/tests/search/').json()
+            self.category.refresh_from_db()
+            seen['count'] = self.category.public_tests_count
+
+        self.assertEqual(self.generate(chunks=[[self.question]], during_generation=staticmethod(check_lists)).status_code, 200)
+        self.assertEqual(seen, {'list': [], 'search': [], 'count': 0})
+
+    def test_partial_failure_keeps_saved_questions(self):
+        response = self.generate(chunks=[[self.question]], fail_with=RuntimeError('provayder xatoligi'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('warning', response.json())
+        self.assertEqual(Test.objects.get().total_questions, 1)
+
+    def test_no_questions_deletes_the_draft(self):
+        response = self.generate(fail_with=RuntimeError('provayder xatoligi'))
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Test.objects.exists())
+
+    def test_failure_after_questions_deletes_the_draft(self):
+        response = self.generate(chunks=[[self.question]], description_error=RuntimeError('tavsif xatoligi'))
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Test.objects.exists())
+        self.assertFalse(Question.objects.exists())
@@ -22,4 +22,5 @@ urlpatterns = [
     path('<int:pk>/stats/', views.test_stats, name='test_stats'),
     path('generate-ai/', views.generate_ai_test, name='generate_ai_test'),
     path('export-word/', views.export_test_to_word, name='export_test_to_word'),
+    path('export-pdf/', views.export_test_to_pdf, name='export_test_to_pdf'),
 ]
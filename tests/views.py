@@ -3,13 +3,17 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Avg
+from django.db import transaction
+from django.db.models import Q, Avg, Count, Max, Sum
+from django.http import FileResponse
 from django.utils import timezone
+import io
 import logging
 
 logger = logging.getLogger(__name__)
 
 from .models import Test, Question, Answer, TestAttempt, StudentAnswer, TestCategory
+from .projections import TestProjection
 from .serializers import (
     TestCategorySerializer,
     TestSerializer,
@@ -19,19 +23,166 @@ from .serializers import (
     StudentAnswerSerializer
 )
 from .ai_service import AITestGenerationService
+from .document_service import DOCUMENT_FORMATS, TestDocumentService
+from ustoziya_platform.quotas import QuotaExceeded, ai_generation_slot
+from ustoziya_platform.category_lists import CachedCategoryListMixin, CategoryNamesConditionalMixin
+from ustoziya_platform.conditional import ConditionalGetMixin
+from ustoziya_platform.db_router import ReplicaReadMixin, replica_reads
+from ustoziya_platform.projections import FastListMixin, list_data
+from ustoziya_platform.serializers import SparseFieldsetViewMixin, shape_queryset
+
+
+def _quota_exceeded_response(exc):
+    """Kvota yoki navbat tufayli bajarilmagan AI so'rovi uchun 429 javobi"""
+    headers = {'Retry-After': str(exc.retry_after)} if exc.retry_after else None
+    return Response({
+        'error': str(exc),
+        'queue_position': exc.position,
+        'retry_after': exc.retry_after
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers=headers)
+
+
+def _persist_ai_questions(test, questions_data, start_order):
+    """AI yaratgan savollar bo'lagini bitta tranzaksiyada saqlash"""
+    with transaction.atomic():
+        for offset, question_data in enumerate(questions_data):
+            question = Question.objects.create(
+                test=test,
+                question_text=question_data.get('question_text', ''),
+                question_type=question_data.get('question_type', 'single_choice'),
+                points=question_data.get('points', 1),
+                order=start_order + offset,
+                explanation=question_data.get('explanation', '')
+            )
+            
+            # Javoblarni yaratish
+            Answer.objects.bulk_create([
+                Answer(
+                    question=question,
+                    answer_text=answer_data.get('answer_text', ''),
+                    is_correct=answer_data.get('is_correct', False),
+                    order=j + 1
+                )
+                for j, answer_data in enumerate(question_data.get('answers', []))
+            ])
+
+
+def _create_ai_test(request, required_error):
+    """AI yordamida test yaratish - savollar har bir bo'lak tayyor bo'lishi bilan saqlanadi"""
+    subject = request.data.get('subject')
+    grade_level = request.data.get('grade_level')
+    difficulty = request.data.get('difficulty', 'medium')
+    num_questions = int(request.data.get('num_questions', 5))
+    category_id = request.data.get('category_id')
+    topic = request.data.get('topic', '')
+    
+    if not all([subject, grade_level]):
+        return Response({
+            'error': required_error
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # AI service'ni ishga tushirish
+    ai_service = AITestGenerationService()
+    
+    with ai_generation_slot(request.user):
+        # Test sarlavhasi savollar sonidan bog'liq emas, shuning uchun test oldindan yaratiladi.
+        # Savollar saqlanguncha u qoralama: ro'yxatlarda, qidiruvda va boshqalar uchun ko'rinmaydi
+        test = Test.objects.create(
+            title=ai_service.generate_test_title(subject, grade_level, difficulty, topic),
+            description='',
+            category_id=category_id,
+            subject=subject,
+            grade_level=grade_level,
+            difficulty=difficulty,
+            time_limit=num_questions * 2,  # Har bir savol uchun 2 daqiqa
+            author=request.user,
+            is_public=False,
+            is_active=False,
+        )
+        
+        saved = {'count': 0}
+        
+        def persist_chunk(chunk):
+            _persist_ai_questions(test, chunk, saved['count'] + 1)
+            saved['count'] += len(chunk)
+        
+        try:
+            ai_service.generate_test_questions(
+                subject=subject,
+                grade_level=grade_level,
+                difficulty=difficulty,
+                num_questions=num_questions,
+                on_chunk=persist_chunk
+            )
+        except Exception as e:
+            # Saqlangan bo'laklar yo'qolmaydi
+            logger.error(f"AI savollar generatsiyasi to'xtadi ({saved['count']} ta saqlandi): {e}")
+        
+        questions_count = saved['count']
+        if not questions_count:
+            test.delete()
+            if ai_service.quota_error is not None:
+                # ai_generation_slot foydalanuvchi tokenini qaytaradi
+                raise ai_service.quota_error
+            return Response({
+                'error': 'AI savollar yarata olmadi'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        try:
+            test.description = ai_service.generate_test_description(subject, grade_level, difficulty, questions_count)
+            
+            # Test statistikasini yangilash va nashr qilish
+            test.time_limit = questions_count * 2
+            test.total_questions = questions_count
+            test.total_points = test.questions.aggregate(total=Sum('points'))['total'] or 0
+            test.is_public = True
+            test.is_active = True
+            test.save()
+        except Exception:
+            # Yarim tayyor qoralama qoldirilmaydi
+            test.delete()
+            raise
+    
+    data = {
+        'message': 'AI yordamida test muvaffaqiyatli yaratildi',
+        'test': TestSerializer(test).data,
+        'questions_count': questions_count,
+        'requested_count': num_questions,
+    }
+    if questions_count < num_questions:
+        data['warning'] = (
+            f"AI {num_questions} ta savoldan faqat {questions_count} tasini yarata oldi; "
+            f"qolganlarini qo'lda qo'shishingiz mumkin"
+        )
+    return Response(data)
+
 
+# Savollar o'zgarsa testning updated_at yangilanadi (tests.signals), topshirishlar va
+# muallif ma'lumotlari esa alohida hisobga olinadi
+TEST_CONDITIONAL_AGGREGATES = {
+    'count': Count('pk', distinct=True),
+    'last_modified': Max('updated_at'),
+    'authors_modified': Max('author__updated_at'),
+    'attempts_total': Count('attempts'),
+}
 
-class TestCategoryListView(generics.ListAPIView):
-    """Test kategoriyalari ro'yxati"""
+
+class TestCategoryListView(CachedCategoryListMixin, generics.ListAPIView):
+    """Test kategoriyalari ro'yxati (keshdan)"""
     queryset = TestCategory.objects.all()
     serializer_class = TestCategorySerializer
     permission_classes = [permissions.AllowAny]
+    category_label = 'tests.TestCategory'
 
 
-class TestListView(generics.ListCreateAPIView):
+class TestListView(ReplicaReadMixin, CategoryNamesConditionalMixin, ConditionalGetMixin, SparseFieldsetViewMixin,
+                   FastListMixin, generics.ListCreateAPIView):
     """Testlar ro'yxati va yaratish"""
     serializer_class = TestSerializer
+    projection_class = TestProjection
     permission_classes = [IsAuthenticated]
+    conditional_aggregates = TEST_CONDITIONAL_AGGREGATES
+    category_label = 'tests.TestCategory'
     
     def get_queryset(self):
         queryset = Test.objects.filter(is_public=True, is_active=True)
@@ -63,10 +214,13 @@ class TestListView(generics.ListCreateAPIView):
         serializer.save(author=self.request.user)
 
 
-class TestDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TestDetailView(CategoryNamesConditionalMixin, ConditionalGetMixin, SparseFieldsetViewMixin,
+                     generics.RetrieveUpdateDestroyAPIView):
     """Test tafsilotlari"""
     serializer_class = TestSerializer
     permission_classes = [IsAuthenticated]
+    conditional_aggregates = TEST_CONDITIONAL_AGGREGATES
+    category_label = 'tests.TestCategory'
     
     def get_queryset(self):
         return Test.objects.filter(
@@ -90,81 +244,9 @@ class TestCreateView(generics.CreateAPIView):
         if ai_request:
             # AI yordamida test yaratish
             try:
-                subject = request.data.get('subject')
-                grade_level = request.data.get('grade_level')
-                difficulty = request.data.get('difficulty', 'medium')
-                num_questions = int(request.data.get('num_questions', 5))
-                category_id = request.data.get('category_id')
-                topic = request.data.get('topic', '')
-                
-                if not all([subject, grade_level]):
-                    return Response({
-                        'error': 'AI test yaratish uchun subject va grade_level majburiy'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                # AI service'ni ishga tushirish
-                ai_service = AITestGenerationService()
-                
-                # AI yordamida savollar yaratish
-                questions_data = ai_service.generate_test_questions(
-                    subject=subject,
-                    grade_level=grade_level,
-                    difficulty=difficulty,
-                    num_questions=num_questions
-                )
-                
-                if not questions_data:
-                    return Response({
-                        'error': 'AI savollar yarata olmadi'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
-                # Test sarlavhasi va tavsifini yaratish
-                test_title = ai_service.generate_test_title(subject, grade_level, difficulty, topic)
-                test_description = ai_service.generate_test_description(subject, grade_level, difficulty, len(questions_data))
-                
-                # Test yaratish
-                test = Test.objects.create(
-                    title=test_title,
-                    description=test_description,
-                    category_id=category_id,
-                    subject=subject,
-                    grade_level=grade_level,
-                    difficulty=difficulty,
-                    time_limit=len(questions_data) * 2,  # Har bir savol uchun 2 daqiqa
-                    author=request.user
-                )
-                
-                # Savollar va javoblarni yaratish
-                for i, question_data in enumerate(questions_data):
-                    question = Question.objects.create(
-                        test=test,
-                        question_text=question_data.get('question_text', ''),
-                        question_type=question_data.get('question_type', 'single_choice'),
-                        points=question_data.get('points', 1),
-                        order=i + 1,
-                        explanation=question_data.get('explanation', '')
-                    )
-                    
-                    # Javoblarni yaratish
-                    for j, answer_data in enumerate(question_data.get('answers', [])):
-                        Answer.objects.create(
-                            question=question,
-                            answer_text=answer_data.get('answer_text', ''),
-                            is_correct=answer_data.get('is_correct', False),
-                            order=j + 1
-                        )
-                
-                # Test statistikasini yangilash
-                test.total_questions = test.questions.count()
-                test.total_points = sum(q.points for q in test.questions.all())
-                test.save()
-                
-                return Response({
-                    'message': 'AI yordamida test muvaffaqiyatli yaratildi',
-                    'test': TestSerializer(test).data,
-                    'questions_count': len(questions_data)
-                })
-                
+                return _create_ai_test(request, 'AI test yaratish uchun subject va grade_level majburiy')
+            except QuotaExceeded as exc:
+                return _quota_exceeded_response(exc)
             except Exception as e:
                 logger.error(f"AI test generation xatoligi: {e}")
                 return Response({
@@ -175,7 +257,7 @@ class TestCreateView(generics.CreateAPIView):
         return super().create(request, *args, **kwargs)
 
 
-class TestUpdateView(generics.UpdateAPIView):
+class TestUpdateView(SparseFieldsetViewMixin, generics.UpdateAPIView):
     """Testni yangilash"""
     serializer_class = TestSerializer
     permission_classes = [IsAuthenticated]
@@ -192,7 +274,7 @@ class TestDeleteView(generics.DestroyAPIView):
         return Test.objects.filter(author=self.request.user)
 
 
-class QuestionListView(generics.ListCreateAPIView):
+class QuestionListView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """Test savollari ro'yxati"""
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
@@ -208,7 +290,7 @@ class QuestionListView(generics.ListCreateAPIView):
         serializer.save(test=test)
 
 
-class QuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class QuestionDetailView(SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """Savol tafsilotlari"""
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
@@ -228,7 +310,7 @@ class QuestionCreateView(generics.CreateAPIView):
         serializer.save(test=test)
 
 
-class QuestionUpdateView(generics.UpdateAPIView):
+class QuestionUpdateView(SparseFieldsetViewMixin, generics.UpdateAPIView):
     """Savolni yangilash"""
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
@@ -245,7 +327,7 @@ class QuestionDeleteView(generics.DestroyAPIView):
         return Question.objects.filter(test__author=self.request.user)
 
 
-class TestAttemptListView(generics.ListAPIView):
+class TestAttemptListView(SparseFieldsetViewMixin, generics.ListAPIView):
     """Test topshirishlar ro'yxati"""
     serializer_class = TestAttemptSerializer
     permission_classes = [IsAuthenticated]
@@ -256,7 +338,7 @@ class TestAttemptListView(generics.ListAPIView):
         return TestAttempt.objects.filter(test=test).order_by('-started_at')
 
 
-class TestAttemptDetailView(generics.RetrieveAPIView):
+class TestAttemptDetailView(SparseFieldsetViewMixin, generics.RetrieveAPIView):
     """Test topshirish tafsilotlari"""
     serializer_class = TestAttemptSerializer
     permission_classes = [IsAuthenticated]
@@ -414,6 +496,7 @@ def submit_test(request, pk):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def search_tests(request):
     """Testlarni qidirish"""
     query = request.query_params.get('q', '')
@@ -443,8 +526,7 @@ def search_tests(request):
     sort_by = request.query_params.get('sort', '-created_at')
     queryset = queryset.order_by(sort_by)
     
-    serializer = TestSerializer(queryset, many=True)
-    return Response(serializer.data)
+    return Response(list_data(TestProjection, queryset, request))
 
 
 @api_view(['GET'])
@@ -452,7 +534,8 @@ def search_tests(request):
 def my_tests(request):
     """Foydalanuvchining testlari"""
     tests = Test.objects.filter(author=request.user).order_by('-created_at')
-    serializer = TestSerializer(tests, many=True)
+    tests = shape_queryset(tests, TestSerializer, request)
+    serializer = TestSerializer(tests, many=True, context={'request': request})
     return Response(serializer.data)
 
 
@@ -486,82 +569,9 @@ def test_stats(request, pk):
 def generate_ai_test(request):
     """AI yordamida test yaratish"""
     try:
-        # Ma'lumotlarni olish
-        subject = request.data.get('subject')
-        grade_level = request.data.get('grade_level')
-        difficulty = request.data.get('difficulty', 'medium')
-        num_questions = int(request.data.get('num_questions', 5))
-        category_id = request.data.get('category_id')
-        topic = request.data.get('topic', '')
-        
-        if not all([subject, grade_level]):
-            return Response({
-                'error': 'Subject va grade_level majburiy'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # AI service'ni ishga tushirish
-        ai_service = AITestGenerationService()
-        
-        # AI yordamida savollar yaratish
-        questions_data = ai_service.generate_test_questions(
-            subject=subject,
-            grade_level=grade_level,
-            difficulty=difficulty,
-            num_questions=num_questions
-        )
-        
-        if not questions_data:
-            return Response({
-                'error': 'AI savollar yarata olmadi'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Test sarlavhasi va tavsifini yaratish
-        test_title = ai_service.generate_test_title(subject, grade_level, difficulty, topic)
-        test_description = ai_service.generate_test_description(subject, grade_level, difficulty, len(questions_data))
-        
-        # Test yaratish
-        test = Test.objects.create(
-            title=test_title,
-            description=test_description,
-            category_id=category_id,
-            subject=subject,
-            grade_level=grade_level,
-            difficulty=difficulty,
-            time_limit=len(questions_data) * 2,  # Har bir savol uchun 2 daqiqa
-            author=request.user
-        )
-        
-        # Savollar va javoblarni yaratish
-        for i, question_data in enumerate(questions_data):
-            question = Question.objects.create(
-                test=test,
-                question_text=question_data.get('question_text', ''),
-                question_type=question_data.get('question_type', 'single_choice'),
-                points=question_data.get('points', 1),
-                order=i + 1,
-                explanation=question_data.get('explanation', '')
-            )
-            
-            # Javoblarni yaratish
-            for j, answer_data in enumerate(question_data.get('answers', [])):
-                Answer.objects.create(
-                    question=question,
-                    answer_text=answer_data.get('answer_text', ''),
-                    is_correct=answer_data.get('is_correct', False),
-                    order=j + 1
-                )
-        
-        # Test statistikasini yangilash
-        test.total_questions = test.questions.count()
-        test.total_points = sum(q.points for q in test.questions.all())
-        test.save()
-        
-        return Response({
-            'message': 'AI yordamida test muvaffaqiyatli yaratildi',
-            'test': TestSerializer(test).data,
-            'questions_count': len(questions_data)
-        })
-        
+        return _create_ai_test(request, 'Subject va grade_level majburiy')
+    except QuotaExceeded as exc:
+        return _quota_exceeded_response(exc)
     except Exception as e:
         logger.error(f"AI test generation xatoligi: {e}")
         return Response({
@@ -569,125 +579,47 @@ def generate_ai_test(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _test_document_response(request, document_format):
+    """Test hujjatini (keshdan yoki yangidan chizilgan) fayl sifatida qaytaradi"""
+    test_id = request.data.get('test_id')
+    if not test_id:
+        return Response({'error': 'Test ID kerak'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    service = TestDocumentService()
+    test = service.load_test(test_id, request.user)
+    content = service.render(test, document_format)
+    
+    return FileResponse(
+        io.BytesIO(content),
+        as_attachment=True,
+        filename=f"{test.title}.{document_format}",
+        content_type=DOCUMENT_FORMATS[document_format]
+    )
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def export_test_to_word(request):
     """Testni Word formatida export qilish"""
     try:
-        from docx import Document
-        from docx.shared import Inches
-        from django.http import HttpResponse
-        import io
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        
-        test_id = request.data.get('test_id')
-        if not test_id:
-            return Response({'error': 'Test ID kerak'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Testni olish
-        test = Test.objects.get(id=test_id, author=request.user)
-        questions = test.questions.all().order_by('order')
-        
-        # Word hujjatini yaratish
-        doc = Document()
-        
-        # Sarlavha
-        title = doc.add_heading(test.title, 0)
-        title.alignment = 1  # Markazga tekislash
-        
-        # Subject mapping
-        subject_choices = {
-            'mathematics': 'Matematika',
-            'physics': 'Fizika',
-            'chemistry': 'Kimyo',
-            'biology': 'Biologiya',
-            'geography': 'Geografiya',
-            'history': 'Tarix',
-            'literature': 'Adabiyot',
-            'language': 'Til va adabiyot',
-            'english': 'Ingliz tili',
-            'russian': 'Rus tili',
-            'computer_science': 'Informatika',
-            'art': 'San\'at',
-            'physical_education': 'Jismoniy tarbiya',
-            'other': 'Boshqa'
-        }
-        
-        # Difficulty mapping
-        difficulty_choices = {
-            'easy': 'Oson',
-            'medium': 'O\'rta',
-            'hard': 'Qiyin'
-        }
-        
-        # Test ma'lumotlari
-        doc.add_paragraph(f"Fan: {subject_choices.get(test.subject, test.subject)}")
-        doc.add_paragraph(f"Sinf: {test.grade_level}")
-        doc.add_paragraph(f"Qiyinlik: {difficulty_choices.get(test.difficulty, test.difficulty)}")
-        doc.add_paragraph(f"Vaqt chegarasi: {test.time_limit} daqiqa")
-        doc.add_paragraph(f"Savollar soni: {questions.count()}")
-        
-        if test.description:
-            doc.add_paragraph(f"Tavsif: {test.description}")
-        
-        doc.add_paragraph()  # Bo'sh qator
-        
-        # Savollar
-        for i, question in enumerate(questions, 1):
-            # Savol matni
-            doc.add_heading(f"Savol {i}", level=2)
-            doc.add_paragraph(question.question_text)
-            
-            # Javoblar
-            answers = question.answers.all().order_by('order')
-            for j, answer in enumerate(answers):
-                letter = chr(65 + j)  # A, B, C, D
-                doc.add_paragraph(f"{letter}) {answer.answer_text}")
-            
-            # Tushuntirish
-            if question.explanation:
-                doc.add_paragraph(f"Tushuntirish: {question.explanation}")
-            
-            doc.add_paragraph()  # Bo'sh qator
-        
-        # Javoblar jadvali
-        doc.add_heading("Javoblar jadvali", level=1)
-        table = doc.add_table(rows=1, cols=2)
-        table.style = 'Table Grid'
-        
-        # Jadval sarlavhalari
-        hdr_cells = table.rows[0].cells
-        hdr_cells[0].text = 'Savol'
-        hdr_cells[1].text = 'To\'g\'ri javob'
-        
-        # Javoblar
-        for i, question in enumerate(questions, 1):
-            row_cells = table.add_row().cells
-            row_cells[0].text = str(i)
-            
-            # To'g'ri javobni topish
-            correct_answer = question.answers.filter(is_correct=True).first()
-            if correct_answer:
-                answer_order = correct_answer.order
-                row_cells[1].text = chr(64 + answer_order)  # A, B, C, D
-            else:
-                row_cells[1].text = "Javob yo'q"
-        
-        # Response yaratish
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{test.title}.docx"'
-        
-        # Hujjatni saqlash
-        doc.save(response)
-        
-        return response
-        
+        return _test_document_response(request, 'docx')
     except Test.DoesNotExist:
         return Response({'error': 'Test topilmadi'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         logger.error(f"Word export xatoligi: {e}")
-        return Response({'error': 'Word export xatoligi'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': 'Word export xatoligi'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def export_test_to_pdf(request):
+    """Testni chop etish uchun PDF formatida export qilish"""
+    try:
+        return _test_document_response(request, 'pdf')
+    except Test.DoesNotExist:
+        return Response({'error': 'Test topilmadi'}, status=status.HTTP_404_NOT_FOUND)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"PDF export xatoligi: {e}")
+        return Response({'error': 'PDF export xatoligi'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+AI provayderlari uchun umumiy klientlar reestri.
+
+Klientlar har bir worker jarayonida bir marta yaratiladi va barcha so'rovlar
+orasida qayta ishlatiladi: OpenAI/OpenRouter klientlari keep-alive ulanishlar
+pooliga ega bitta httpx klientini bo'lishadi, timeout va retry/backoff
+sozlamalari shu yerda markazlashgan. `warm_up()` worker ishga tushganda
+chaqiriladi, shunda birinchi so'rov TLS handshake va klient yaratishni kutmaydi.
+"""
+import logging
+import os
+import threading
+
+import httpx
+from django.conf import settings
+from openai import OpenAI
+
+try:
+    from google import genai
+    from google.genai import types as genai_types
+except ImportError:  # pragma: no cover - optional dependency
+    genai = None
+    genai_types = None
+
+try:
+    import google.generativeai as generativeai
+    from google.api_core import retry as api_core_retry
+except ImportError:  # pragma: no cover - optional dependency
+    generativeai = None
+    api_core_retry = None
+
+try:
+    from google.cloud import vision
+except ImportError:  # pragma: no cover - optional dependency
+    vision = None
+
+logger = logging.getLogger(__name__)
+
+_clients = {}
+_lock = threading.RLock()
+
+
+def _get_or_create(key, factory):
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = factory()
+                _clients[key] = client
+    return client
+
+
+def _timeout() -> float:
+    return float(getattr(settings, 'AI_HTTP_TIMEOUT', 60))
+
+
+def _max_retries() -> int:
+    return int(getattr(settings, 'AI_HTTP_MAX_RETRIES', 2))
+
+
+def get_http_client() -> httpx.Client:
+    """Keep-alive ulanishlar pooliga ega umumiy httpx klienti"""
+    def factory():
+        return httpx.Client(
+            timeout=httpx.Timeout(_timeout(), connect=getattr(settings, 'AI_HTTP_CONNECT_TIMEOUT', 10)),
+            limits=httpx.Limits(
+                max_connections=getattr(settings, 'AI_HTTP_MAX_CONNECTIONS', 20),
+                max_keepalive_connections=getattr(settings, 'AI_HTTP_MAX_KEEPALIVE', 10),
+                keepalive_expiry=getattr(settings, 'AI_HTTP_KEEPALIVE_EXPIRY', 60),
+            ),
+        )
+    return _get_or_create('http', factory)
+
+
+def get_openai_client() -> OpenAI:
+    api_key = getattr(settings, 'OPENAI_API_KEY', '')
+    if not api_key:
+        raise ValueError("OpenAI API kaliti topilmadi. Iltimos, .env faylida OPENAI_API_KEY ni belgilang.")
+    return _get_or_create('openai', lambda: OpenAI(
+        api_key=api_key,
+        http_client=get_http_client(),
+        timeout=_timeout(),
+        max_retries=_max_retries(),
+    ))
+
+
+def get_openrouter_client() -> OpenAI:
+    api_key = getattr(settings, 'OPENROUTER_API_KEY', '')
+    if not api_key:
+        raise ValueError("OpenRouter API kaliti topilmadi. Iltimos, .env faylida OPENROUTER_API_KEY ni belgilang.")
+
+    def factory():
+        default_headers = {}
+        site_url = getattr(settings, 'OPENROUTER_SITE_URL', '')
+        site_name = getattr(settings, 'OPENROUTER_SITE_NAME', '')
+        if site_url:
+            default_headers['HTTP-Referer'] = site_url
+        if site_name:
+            default_headers['X-Title'] = site_name
+        return OpenAI(
+            api_key=api_key,
+            base_url=getattr(settings, 'OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1'),
+            default_headers=default_headers or None,
+            http_client=get_http_client(),
+            timeout=_timeout(),
+            max_retries=_max_retries(),
+        )
+    return _get_or_create('openrouter', factory)
+
+
+def get_gemini_client():
+    """google-genai klienti (materiallar bo'limidagi matn generatsiyasi uchun)"""
+    if genai is None:
+        raise ValueError("google-genai kutubxonasi o'rnatilmagan. `pip install google-genai` buyruqini bajaring.")
+    api_key = getattr(settings, 'GOOGLE_GEMINI_API_KEY', '')
+    if not api_key:
+        raise ValueError("Google Gemini API kaliti topilmadi. Iltimos, .env faylida GOOGLE_GEMINI_API_KEY ni belgilang.")
+
+    def factory():
+        http_options = {'timeout': int(_timeout() * 1000)}
+        if hasattr(genai_types, 'HttpRetryOptions'):
+            http_options['retry_options'] = genai_types.HttpRetryOptions(attempts=_max_retries() + 1)
+        return genai.Client(api_key=api_key, http_options=http_options)
+    return _get_or_create('gemini', factory)
+
+
+def get_generative_model(model_name: str):
+    """google.generativeai modeli; `genai.configure` jarayon uchun bir marta chaqiriladi"""
+    if generativeai is None:
+        raise ValueError("google-generativeai kutubxonasi o'rnatilmagan.")
+
+    def configure():
+        generativeai.configure(api_key=settings.GOOGLE_GEMINI_API_KEY)
+        return True
+
+    _get_or_create('generativeai_configured', configure)
+    return _get_or_create(f'generativeai:{model_name}', lambda: generativeai.GenerativeModel(model_name))
+
+
+def generative_request_options() -> dict:
+    """google.generativeai so'rovlari uchun timeout va eksponensial backoff"""
+    options = {'timeout': _timeout()}
+    if api_core_retry is not None:
+        options['retry'] = api_core_retry.Retry(
+            initial=1.0,
+            maximum=10.0,
+            multiplier=2.0,
+            timeout=_timeout(),
+        )
+    return options
+
+
+def get_vision_client():
+    """Google Cloud Vision klienti (gRPC kanali qayta ishlatiladi)"""
+    if vision is None:
+        raise ValueError("google-cloud-vision kutubxonasi o'rnatilmagan.")
+
+    def factory():
+        # API key orqali autentifikatsiya
+        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = getattr(settings, 'GOOGLE_API_KEY', '')
+        return vision.ImageAnnotatorClient()
+    return _get_or_create('vision', factory)
+
+
+def warm_up() -> None:
+    """Sozlangan barcha klientlarni oldindan yaratadi (worker ishga tushganda)"""
+    factories = [get_http_client]
+    if getattr(settings, 'OPENAI_API_KEY', ''):
+        factories.append(get_openai_client)
+    if getattr(settings, 'OPENROUTER_API_KEY', ''):
+        factories.append(get_openrouter_client)
+    if getattr(settings, 'GOOGLE_GEMINI_API_KEY', ''):
+        factories.append(get_gemini_client)
+        factories.append(lambda: get_generative_model(getattr(settings, 'GOOGLE_GEMINI_TEST_MODEL', 'gemini-pro')))
+    if getattr(settings, 'GOOGLE_API_KEY', ''):
+        factories.append(get_vision_client)
+
+    for factory in factories:
+        try:
+            factory()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("AI klientini oldindan yaratib bo'lmadi: %s", exc)
+
+
+def warm_up_on_boot() -> None:
+    """WSGI kirish nuqtalari uchun: AI_CLIENTS_WARM_ON_BOOT yoqilgan bo'lsa warm_up()"""
+    if getattr(settings, 'AI_CLIENTS_WARM_ON_BOOT', True):
+        warm_up()
+
+
+def reset() -> None:
+    """Barcha klientlarni yopadi va reestrni tozalaydi"""
+    with _lock:
+        http_client = _clients.get('http')
+        _clients.clear()
+    if http_client is not None:
+        http_client.close()
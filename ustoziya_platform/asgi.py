@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ustoziya_platform.settings')
 
 application = get_asgi_application()
+
+# AI klientlarini worker ishga tushganda oldindan yaratish (AI_CLIENTS_WARM_ON_BOOT)
+from ustoziya_platform.ai_clients import warm_up_on_boot  # noqa: E402
+
+warm_up_on_boot()
@@ -0,0 +1,49 @@
+"""
+Fon vazifalari uchun umumiy thread pool.
+
+Og'ir ishlar (eksportlar va h.k.) so'rov-javob siklidan chiqariladi va shu
+jarayondagi thread pool'da bajariladi. Vazifa tranzaksiya commit bo'lgandan
+keyin navbatga qo'yiladi, shuning uchun u yaratilgan yozuvlarni albatta ko'radi.
+`BACKGROUND_TASKS_EAGER = True` bo'lsa vazifa darhol shu thread'da bajariladi
+(testlar va boshqaruv buyruqlari uchun qulay).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_TASKS_MAX_WORKERS', 2),
+                thread_name_prefix='background',
+            )
+        return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:  # noqa: BLE001
+        logger.exception("Fon vazifasi %s xatolik bilan tugadi", getattr(func, '__name__', func))
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args, **kwargs) -> None:
+    """Vazifani joriy tranzaksiya commit bo'lgandan keyin fon thread'ida bajaradi"""
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        func(*args, **kwargs)
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
@@ -0,0 +1,159 @@
+"""
+Ikki bosqichli kesh: L1 (jarayon xotirasi) + L2 (umumiy kesh).
+
+Qiymat avval L1 dan ('local', qisqa TTL), keyin L2 dan ('default' - Redis,
+fayl yoki DB) qidiriladi; L2 dan topilgani L1 ga ham yoziladi. Kalitlarga
+teglar biriktiriladi: har bir tegning L2 da versiyasi bor va u kalitning
+bir qismi, shuning uchun `invalidate('materials')` tegning versiyasini
+oshiradi va unga bog'liq barcha yozuvlar birdaniga eskiradi. Boshqa
+jarayonlardagi L1 nusxalari ko'pi bilan L1 TTL davomida eskirgan qoladi.
+L2 ishlamay qolsa (masalan Redis uzilsa) kesh "miss" deb hisoblanadi.
+"""
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_NONE = '__cached_none__'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(event, count=1):
+    with _stats_lock:
+        _stats[event] += count
+
+
+def stats():
+    """Jarayon ichidagi hisoblagichlar: l1_hits, l2_hits, misses, sets, invalidations"""
+    with _stats_lock:
+        result = dict(_stats)
+    lookups = result.get('l1_hits', 0) + result.get('l2_hits', 0) + result.get('misses', 0)
+    result['hit_ratio'] = round((lookups - result.get('misses', 0)) / lookups, 3) if lookups else None
+    return result
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _l1():
+    return caches['local']
+
+
+def _l2():
+    return caches['default']
+
+
+def _l1_timeout(timeout):
+    l1_timeout = settings.CACHES['local'].get('TIMEOUT', 5)
+    return l1_timeout if timeout is None else min(timeout, l1_timeout)
+
+
+def _l2_call(method, *args, default=None, **kwargs):
+    try:
+        return getattr(_l2(), method)(*args, **kwargs)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("L2 kesh xatoligi (%s): %s", method, exc)
+        _record('l2_errors')
+        return default
+
+
+def _tag_key(tag):
+    return f'cache_tag:{tag}'
+
+
+def _tag_versions(tags):
+    """Teglar versiyalari (L1 da qisqa muddat saqlanadi)"""
+    if not tags:
+        return ''
+    keys = [_tag_key(tag) for tag in sorted(tags)]
+    versions = _l1().get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        from_l2 = _l2_call('get_many', missing, default={})
+        for key in missing:
+            version = from_l2.get(key)
+            if version is None:
+                version = 1
+                _l2_call('add', key, version, timeout=None)
+            versions[key] = version
+        _l1().set_many({key: versions[key] for key in missing}, timeout=_l1_timeout(None))
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def _full_key(key, tags):
+    versions = _tag_versions(tags)
+    return f'{key}:v{versions}' if versions else key
+
+
+def get(key, default=None, tags=()):
+    """Qiymatni L1, keyin L2 dan oladi"""
+    full_key = _full_key(key, tags)
+    value = _l1().get(full_key, _MISSING)
+    if value is not _MISSING:
+        _record('l1_hits')
+        return None if value == _NONE else value
+
+    value = _l2_call('get', full_key, _MISSING, default=_MISSING)
+    if value is not _MISSING:
+        _record('l2_hits')
+        _l1().set(full_key, value, timeout=_l1_timeout(None))
+        return None if value == _NONE else value
+
+    _record('misses')
+    return default
+
+
+def set(key, value, timeout=None, tags=()):
+    """Qiymatni ikkala bosqichga yozadi (timeout=None - L2 standart TTL)"""
+    full_key = _full_key(key, tags)
+    stored = _NONE if value is None else value
+    _l2_call('set', full_key, stored, timeout=timeout if timeout is not None else _l2().default_timeout)
+    _l1().set(full_key, stored, timeout=_l1_timeout(timeout))
+    _record('sets')
+
+
+def delete(key, tags=()):
+    full_key = _full_key(key, tags)
+    _l1().delete(full_key)
+    _l2_call('delete', full_key)
+
+
+def get_or_set(key, producer, timeout=None, tags=()):
+    """Keshdagi qiymat yoki `producer()` natijasi (natija keshga yoziladi)"""
+    value = get(key, _MISSING, tags=tags)
+    if value is _MISSING:
+        value = producer()
+        set(key, value, timeout=timeout, tags=tags)
+    return value
+
+
+def cached_queryset(key, queryset, timeout=None, tags=(), transform=list):
+    """Queryset natijasini (standart - ro'yxat) keshlaydi"""
+    return get_or_set(key, lambda: transform(queryset), timeout=timeout, tags=tags)
+
+
+def invalidate(*tags):
+    """Teglarga bog'liq barcha yozuvlarni eskirtiradi"""
+    for tag in tags:
+        key = _tag_key(tag)
+        version = _l2_call('get', key)
+        if version is None:
+            new_version = 2
+            _l2_call('set', key, new_version, timeout=None)
+        else:
+            try:
+                new_version = _l2().incr(key)
+            except Exception:  # noqa: BLE001
+                new_version = version + 1
+                _l2_call('set', key, new_version, timeout=None)
+        _l1().set(key, new_version, timeout=_l1_timeout(None))
+        _record('invalidations')
@@ -0,0 +1,213 @@
+"""
+Kategoriyalar ro'yxati va har bir kategoriyadagi ommaviy yozuvlar soni.
+
+Son kategoriya qatorining o'zida saqlanadi (`public_materials_count`,
+`public_tests_count`) va signallar orqali bitta F() UPDATE bilan
+o'zgartiriladi: yozuv ommaviy bo'lib yaratilsa yoki o'chirilsa, nashr
+qilinsa / yashirilsa yoki boshqa kategoriyaga o'tkazilsa. Butun ro'yxat
+(serializer natijasi) bitta kesh yozuvi sifatida saqlanadi va kategoriya
+yoki son o'zgarganda tranzaksiya tugagach tegi orqali eskirtiriladi.
+Ommaviy `update()`/`bulk_create()` dan keyin `rebuild_category_counts`
+buyrug'i sonlarni qayta hisoblaydi.
+"""
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils.module_loading import import_string
+from rest_framework.response import Response
+
+from . import caching
+from .conditional import ConditionalGetMixin
+from .serializers import requested_fields
+
+# Kategoriya modeli -> yozuvlar modeli, son maydoni, "ommaviy" shartlari, serializer
+CATEGORY_LISTS = {
+    'materials.MaterialCategory': {
+        'item_model': 'materials.Material',
+        'count_field': 'public_materials_count',
+        'public_when': {'is_public': True},
+        'serializer': 'materials.serializers.MaterialCategorySerializer',
+    },
+    'tests.TestCategory': {
+        'item_model': 'tests.Test',
+        'count_field': 'public_tests_count',
+        'public_when': {'is_public': True, 'is_active': True},
+        'serializer': 'tests.serializers.TestCategorySerializer',
+    },
+}
+
+# Yozuvning signallar uchun eslab qolingan holati: (kategoriya ID, ommaviymi)
+_STATE_ATTR = '_category_list_state'
+
+
+def _cache_tag(label):
+    return f'category_list:{label}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'CATEGORY_LIST_CACHE_SECONDS', 86400)
+
+
+def invalidate(label):
+    """Kategoriyalar ro'yxati keshini tranzaksiya tugagach eskirtiradi"""
+    transaction.on_commit(lambda: caching.invalidate(_cache_tag(label)))
+
+
+def _build_payload(label):
+    config = CATEGORY_LISTS[label]
+    serializer_class = import_string(config['serializer'])
+    queryset = apps.get_model(label).objects.all()
+    rows = [dict(row) for row in serializer_class(queryset, many=True).data]
+    digest = hashlib.sha1(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()
+    return {'rows': rows, 'digest': digest}
+
+
+def get_payload(label):
+    """{'rows': serializer natijasi, 'digest': ETag uchun xesh} - keshdan"""
+    return caching.get_or_set(
+        f'category_list:{label}', lambda: _build_payload(label),
+        timeout=_cache_timeout(), tags=[_cache_tag(label)],
+    )
+
+
+def category_rows(label):
+    """Kategoriyalar ro'yxati (lug'atlar) - forma va shablonlar uchun"""
+    return get_payload(label)['rows']
+
+
+# Hisoblagichlar
+
+def _item_state(instance, config):
+    """(kategoriya ID, ommaviymi); kerakli maydonlar yuklanmagan bo'lsa None"""
+    names = ['category_id', *config['public_when']]
+    if any(name not in instance.__dict__ for name in names):
+        return None
+    is_public = all(getattr(instance, name) == value for name, value in config['public_when'].items())
+    return instance.category_id, is_public
+
+
+def increment(label, category_id, delta):
+    """Kategoriyadagi sonni bitta UPDATE bilan o'zgartiradi"""
+    if category_id is None:
+        return
+    field = CATEGORY_LISTS[label]['count_field']
+    apps.get_model(label).objects.filter(pk=category_id).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def _public_count_subquery(config):
+    item_model = apps.get_model(config['item_model'])
+    return Coalesce(
+        Subquery(
+            item_model.objects.filter(category=OuterRef('pk'), **config['public_when'])
+            .order_by().values('category').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def rebuild_counts(label, category_ids=None):
+    """Sonlarni bazadan qayta hisoblaydi; yangilangan kategoriyalar soni qaytadi"""
+    config = CATEGORY_LISTS[label]
+    queryset = apps.get_model(label).objects.all()
+    if category_ids is not None:
+        queryset = queryset.filter(pk__in=category_ids)
+    updated = queryset.update(**{config['count_field']: _public_count_subquery(config)})
+    invalidate(label)
+    return updated
+
+
+def _item_receivers(label, config):
+    def on_init(sender, instance, **kwargs):
+        instance.__dict__[_STATE_ATTR] = _item_state(instance, config) if instance.pk is not None else None
+
+    def on_save(sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        previous = None if created else instance.__dict__.get(_STATE_ATTR)
+        current = _item_state(instance, config)
+        instance.__dict__[_STATE_ATTR] = current
+        if current is None or (previous is None and not created):
+            # Oldingi holat noma'lum (maydonlar yuklanmagan) - to'liq hisoblash
+            category_ids = {instance.category_id} if current is None else {current[0]}
+            rebuild_counts(label, category_ids=category_ids)
+            return
+        if previous == current or (previous is None and not current[1]):
+            return
+        if previous is not None and previous[1]:
+            increment(label, previous[0], -1)
+        if current[1]:
+            increment(label, current[0], 1)
+        invalidate(label)
+
+    def on_delete(sender, instance, **kwargs):
+        state = instance.__dict__.get(_STATE_ATTR) or _item_state(instance, config)
+        if state is not None and state[1]:
+            increment(label, state[0], -1)
+            invalidate(label)
+
+    return on_init, on_save, on_delete
+
+
+def _category_changed(label):
+    def receiver(sender, raw=False, **kwargs):
+        if not raw:
+            invalidate(label)
+
+    return receiver
+
+
+def connect_signals(label):
+    """Kategoriya va uning yozuvlari signallarini son va keshga ulaydi"""
+    config = CATEGORY_LISTS[label]
+    item_model = apps.get_model(config['item_model'])
+    on_init, on_save, on_delete = _item_receivers(label, config)
+    post_init.connect(on_init, sender=item_model, weak=False, dispatch_uid=f'category_list:{label}:init')
+    post_save.connect(on_save, sender=item_model, weak=False, dispatch_uid=f'category_list:{label}:save')
+    post_delete.connect(on_delete, sender=item_model, weak=False, dispatch_uid=f'category_list:{label}:delete')
+
+    category_model = apps.get_model(label)
+    changed = _category_changed(label)
+    post_save.connect(changed, sender=category_model, weak=False, dispatch_uid=f'category_list:{label}:category_save')
+    post_delete.connect(changed, sender=category_model, weak=False,
+                        dispatch_uid=f'category_list:{label}:category_delete')
+
+
+class CachedCategoryListMixin(ConditionalGetMixin):
+    """Kategoriyalar ro'yxati keshdan; ETag keshdagi ro'yxat xeshidan (bazaga so'rovsiz)"""
+
+    category_label = None
+
+    def conditional_validators(self, request):
+        digest = get_payload(self.category_label)['digest']
+        return self.make_etag(request, {'digest': digest}), None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.cached_list, *args, **kwargs)
+
+    def cached_list(self, request, *args, **kwargs):
+        rows = get_payload(self.category_label)['rows']
+        all_names = self.get_serializer_class().Meta.fields
+        names = requested_fields(request, all_names, strict=True)
+        if len(names) != len(all_names):
+            rows = [{name: row[name] for name in names} for row in rows]
+        return Response(rows)
+
+
+class CategoryNamesConditionalMixin:
+    """Yozuvlar ro'yxati ETag iga kategoriyalar ro'yxati xeshini qo'shadi
+
+    Kategoriya nomi o'zgarsa yozuvlarning `updated_at` i o'zgarmaydi, lekin
+    javobdagi `category_name` o'zgaradi. Xesh keshdan olinadi (so'rovsiz).
+    """
+
+    category_label = None
+
+    def get_conditional_values(self):
+        return {**super().get_conditional_values(), 'categories': get_payload(self.category_label)['digest']}
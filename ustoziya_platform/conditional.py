@@ -0,0 +1,82 @@
+"""
+Shartli GET (ETag / Last-Modified / 304) generic view'lar uchun.
+
+ETag serializatsiyadan oldin bitta arzon agregat so'rovdan hisoblanadi:
+filtrlangan querysetdagi yozuvlar soni va eng so'nggi `updated_at`. Javobga
+kiradigan, lekin `updated_at` ni o'zgartirmaydigan qiymatlar (hisoblagichlar,
+bog'langan muallif/kategoriya nomlari) view'ning `conditional_aggregates`
+yoki `get_conditional_values()` orqali qo'shiladi, aks holda mijoz eskirgan
+javob uchun 304 oladi.
+Unga so'rov yo'li, query string, host va javob formati ham kiradi, shuning
+uchun `?fields=`, filtrlar yoki boshqa format alohida ETag oladi. Mijozning
+If-None-Match / If-Modified-Since sarlavhalari mos kelsa 304 qaytadi va
+queryset umuman yuklanmaydi, serializer ishlamaydi.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """ListAPIView / RetrieveAPIView uchun ETag va Last-Modified
+
+    `conditional_aggregates` - ETag ga kiradigan agregatlar; `last_modified`
+    kaliti Last-Modified sarlavhasi uchun ishlatiladi. `get_conditional_values()`
+    - ETag ga kiradigan, bazadan olinmaydigan qo'shimcha qiymatlar.
+    """
+
+    conditional_aggregates = None
+
+    def get_conditional_aggregates(self):
+        if self.conditional_aggregates is not None:
+            return self.conditional_aggregates
+        return {'count': Count('pk'), 'last_modified': Max('updated_at')}
+
+    def get_conditional_values(self):
+        return {}
+
+    def get_conditional_queryset(self):
+        queryset = self.get_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def conditional_validators(self, request):
+        """(etag, last_modified) - bitta agregat so'rov bilan"""
+        values = self.get_conditional_queryset().order_by().aggregate(**self.get_conditional_aggregates())
+        values.update(self.get_conditional_values())
+        last_modified = values.get('last_modified')
+        return self.make_etag(request, values), int(last_modified.timestamp()) if last_modified else None
+
+    def make_etag(self, request, values):
+        """Kuchsiz ETag: so'rov yo'li, host, format va `values` dan"""
+        fingerprint = '|'.join([
+            request.get_host(),
+            request.get_full_path(),
+            getattr(request, 'accepted_media_type', '') or '',
+            *(f'{key}={value.isoformat() if hasattr(value, "isoformat") else value}'
+              for key, value in sorted(values.items())),
+        ])
+        return 'W/"%s"' % hashlib.sha1(fingerprint.encode()).hexdigest()
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.conditional_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Mijoz har safar tekshirib olishi kerak (evristik keshlashsiz)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
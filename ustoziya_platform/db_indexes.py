@@ -0,0 +1,78 @@
+"""
+Shartli (partial) indekslar uchun zaxira indekslar.
+
+MySQL shartli indekslarni qo'llab-quvvatlamaydi va Django ularni jimgina
+o'tkazib yuboradi - ommaviy ro'yxatlar (`is_public=True ... ORDER BY
+created_at`) indekssiz qoladi. `partial_index_fallbacks()` migratsiya
+operatsiyasi faqat shunday bazalarda har bir shartli indeks uchun shart
+maydonlarini boshiga qo'ygan oddiy kompozit indeks yaratadi
+(`material_pub_cat_idx` -> `material_pub_cat_fb`:
+`(is_public, category, created_at DESC)`). Zaxira indekslar model holatiga
+kirmaydi (makemigrations ularni ko'rmaydi); PostgreSQL/SQLite'da operatsiya
+hech narsa qilmaydi.
+
+Keyinroq yangi shartli indeks qo'shilsa, uni yaratgan migratsiyadan keyin
+faqat yangi indeks nomlari bilan operatsiya qo'shiladi:
+`partial_index_fallbacks('materials', ['material_pub_new_idx'])`. Nomlarsiz
+chaqiruv ilovaning barcha shartli indekslarini oladi va mavjud `_fb`
+indekslarni qayta yaratishga urinib MySQL'da xatolik beradi.
+"""
+from django.db import migrations, models
+
+FALLBACK_SUFFIX = '_fb'
+
+
+def fallback_name(index_name):
+    """Shartli indeks nomidan zaxira indeks nomi"""
+    base = index_name[:-len('_idx')] if index_name.endswith('_idx') else index_name
+    return f'{base}{FALLBACK_SUFFIX}'
+
+
+def fallback_index(index):
+    """Shart maydonlari (faqat tenglik) boshida turgan oddiy indeks"""
+    condition_fields = [name for name, _ in sorted(index.condition.children)]
+    return models.Index(fields=condition_fields + list(index.fields), name=fallback_name(index.name))
+
+
+def _partial_indexes(apps, app_label, index_names=None):
+    for model in apps.get_app_config(app_label).get_models():
+        for index in model._meta.indexes:
+            if index_names is not None and index.name not in index_names:
+                continue
+            condition = index.condition
+            # Faqat `maydon=qiymat` shartlari (AND) zaxira indeksga aylantiriladi
+            if condition is not None and not condition.negated and condition.connector == 'AND' \
+                    and all(isinstance(child, tuple) for child in condition.children):
+                yield model, index
+
+
+def partial_index_fallbacks(app_label, index_names=None):
+    """Shartli indekslar uchun zaxira indekslarni yaratuvchi RunPython
+
+    `index_names` - faqat shu indekslar (None - ilovaning barcha shartli
+    indekslari; faqat birinchi zaxira migratsiyasi uchun). Noma'lum yoki
+    shartsiz nom berilsa migratsiya xatolik bilan to'xtaydi.
+    """
+    index_names = None if index_names is None else set(index_names)
+
+    def selected(apps):
+        found = list(_partial_indexes(apps, app_label, index_names))
+        if index_names is not None:
+            unknown = index_names - {index.name for _, index in found}
+            if unknown:
+                raise ValueError(f"Shartli indeks topilmadi: {', '.join(sorted(unknown))}")
+        return found
+
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.features.supports_partial_indexes:
+            return
+        for model, index in selected(apps):
+            schema_editor.add_index(model, fallback_index(index))
+
+    def backwards(apps, schema_editor):
+        if schema_editor.connection.features.supports_partial_indexes:
+            return
+        for model, index in selected(apps):
+            schema_editor.remove_index(model, fallback_index(index))
+
+    return migrations.RunPython(forwards, backwards, elidable=False)
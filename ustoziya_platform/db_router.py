@@ -0,0 +1,120 @@
+"""
+O'qish so'rovlarini replika bazalarga yo'naltirish.
+
+Faqat aniq belgilangan xavfsiz (GET/HEAD/OPTIONS) ro'yxat va qidiruv view'lari
+replikadan o'qiydi: class view'lar `ReplicaReadMixin` ni, funksiya view'lar
+`@replica_reads` dekoratorini ishlatadi. Qolgan barcha so'rovlar va yozishlar
+asosiy ('default') bazaga boradi.
+
+Read-your-writes: foydalanuvchi yozuvchi so'rov (POST/PUT/PATCH/DELETE)
+yuborgandan keyin DB_REPLICA_STICKY_SECONDS davomida uning barcha o'qishlari
+asosiy bazadan bo'ladi (belgi umumiy keshda saqlanadi). So'rov ichida biror
+yozish bo'lsa, shu so'rovning qolgan o'qishlari ham asosiy bazaga o'tadi.
+Holat `ReplicaRoutingMiddleware` tomonidan har bir so'rov uchun yaratiladi;
+middleware'dan tashqarida (buyruqlar, fon vazifalari) hammasi asosiy bazada.
+"""
+import functools
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = 'default'
+PIN_KEY = 'db_router:pinned:{}'
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """Bitta so'rovning yo'naltirish holati"""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def begin_request():
+    """Yangi so'rov holatini o'rnatadi; qaytarilgan token `end_request` ga beriladi"""
+    return _state.set(RoutingState())
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def is_pinned(user):
+    """Foydalanuvchi yaqinda yozgan bo'lsa uning o'qishlari asosiy bazada"""
+    if user is None or not user.is_authenticated:
+        return False
+    return bool(cache.get(PIN_KEY.format(user.pk)))
+
+
+def pin_to_primary(user):
+    """Yozishdan keyin foydalanuvchini asosiy bazaga vaqtincha bog'laydi"""
+    if user is None or not user.is_authenticated:
+        return
+    cache.set(PIN_KEY.format(user.pk), 1, getattr(settings, 'DB_REPLICA_STICKY_SECONDS', 15))
+
+
+def use_replica(request):
+    """Xavfsiz so'rov bo'lsa shu so'rovning o'qishlarini replikaga yo'naltiradi"""
+    state = _state.get()
+    aliases = replicas()
+    if state is None or not aliases or request.method not in SAFE_METHODS:
+        return
+    if state.wrote or is_pinned(getattr(request, 'user', None)):
+        return
+    # Bitta so'rov ichida barcha o'qishlar bir xil replikadan bo'ladi
+    state.replica = random.choice(aliases)
+
+
+def replica_reads(view_func):
+    """Funksiya view uchun: @api_view va @permission_classes dan keyin (pastda) qo'yiladi,
+    shunda foydalanuvchi allaqachon autentifikatsiyadan o'tgan bo'ladi"""
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        use_replica(request)
+        return view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Class view uchun: autentifikatsiyadan keyin o'qishlarni replikaga yo'naltiradi"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        use_replica(request)
+
+
+class ReplicaRouter:
+    """Yozishlar - asosiy bazaga, belgilangan view'lardagi o'qishlar - replikaga"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.wrote:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replikalar asosiy bazaning nusxasi - obyektlar bir xil ma'lumotlar to'plamidan
+        aliases = {PRIMARY, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,67 @@
+"""
+Yuklangan rasmlarni saqlashdan oldin normallashtirish.
+
+Telefonlar 12 MP va EXIF burilishli JPEG yuboradi. Har bir rasm profil
+(IMAGE_UPLOAD_PROFILES: `ocr`, `avatar`) bo'yicha qayta ishlanadi: EXIF
+burilishi qo'llanadi, eng uzun tomoni `max_side` gacha kichraytiriladi
+(JPEG'lar DCT darajasida - to'liq o'lcham umuman dekodlanmaydi), EXIF/GPS
+va boshqa metama'lumotlar olib tashlanadi va profil formatida qayta
+kodlanadi. Asl fayl faqat profilda `keep_original` yoqilgan bo'lsa saqlanadi.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp', 'PNG': '.png'}
+
+
+class InvalidImage(ValueError):
+    """Fayl rasm emas yoki o'qib bo'lmaydi"""
+
+
+def get_profile(name):
+    return settings.IMAGE_UPLOAD_PROFILES[name]
+
+
+def keeps_original(profile_name):
+    return bool(get_profile(profile_name).get('keep_original'))
+
+
+def _flatten(image):
+    """Shaffof fonni oq rangga aylantiradi (JPEG uchun)"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalize_image(uploaded_file, profile_name):
+    """Rasmni profil bo'yicha qayta kodlaydi va yangi ContentFile qaytaradi"""
+    profile = get_profile(profile_name)
+    image_format = profile.get('format', 'JPEG')
+    max_side = profile['max_side']
+    try:
+        uploaded_file.seek(0)
+        with Image.open(uploaded_file) as source:
+            # thumbnail() JPEG'ni draft rejimida (1/2, 1/4, 1/8) o'qiydi
+            source.thumbnail((max_side, max_side), Image.LANCZOS)
+            image = ImageOps.exif_transpose(source)
+            if image_format == 'JPEG':
+                image = _flatten(image)
+            elif image.mode not in ('RGB', 'RGBA', 'L'):
+                image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.getbands() else 'RGB')
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as exc:
+        raise InvalidImage(str(exc)) from exc
+    finally:
+        uploaded_file.seek(0)
+
+    stream = io.BytesIO()
+    # exif/icc_profile berilmaydi - metama'lumotlar saqlanmaydi
+    image.save(stream, format=image_format, quality=profile.get('quality', 85), optimize=image_format != 'WEBP')
+    stem = os.path.splitext(os.path.basename(uploaded_file.name or 'image'))[0] or 'image'
+    return ContentFile(stream.getvalue(), name=stem + FORMAT_EXTENSIONS.get(image_format, '.img'))
@@ -0,0 +1,127 @@
+"""
+So'rov davomidagi ma'lumotlar bazasi vaqtini o'lchash.
+
+DB so'rovi bajargan javoblarga `Server-Timing` sarlavhasi qo'shiladi: `db` -
+so'rovlar soni va umumiy vaqti, `db-connect` - shu so'rovda yangi ulanish
+ochilgan bo'lsa uning vaqti (CONN_MAX_AGE tufayli ulanish qayta ishlatilsa bu
+metrika bo'lmaydi). Middleware o'zi ulanish ochmaydi: ulanish vaqti birinchi
+DB so'rovi ulanishni ochganda o'lchanadi, bazaga murojaat qilmagan so'rovlar
+(statik sahifalar, kesh) hech narsa to'lamaydi. Sekin so'rovlar
+(DB_SLOW_REQUEST_MS dan oshsa) logga yoziladi.
+
+`ReplicaRoutingMiddleware` - o'qishlarni replikaga yo'naltirish holati
+(qarang: `ustoziya_platform.db_router`).
+"""
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from . import db_router
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimer:
+    """connection.execute_wrapper uchun so'rovlar soni va vaqtini yig'uvchi"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.connect_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class DatabaseTimingMiddleware:
+    """DB ulanish va so'rovlar vaqtini Server-Timing sarlavhasida ko'rsatadi"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'DB_TIMING_ENABLED', True)
+        self.slow_request_ms = getattr(settings, 'DB_SLOW_REQUEST_MS', 500)
+
+    @contextmanager
+    def _time_connect(self, connection, timer):
+        """Ulanish birinchi so'rovda ochilsa sarflangan vaqtni timer'ga yozadi"""
+        if connection.connection is not None:
+            yield
+            return
+        ensure_connection = connection.ensure_connection
+
+        def timed_ensure_connection():
+            if connection.connection is not None:
+                return ensure_connection()
+            started = time.perf_counter()
+            try:
+                return ensure_connection()
+            finally:
+                timer.connect_duration += time.perf_counter() - started
+
+        # Ulanish obyekti thread'ga tegishli - almashtirish boshqa so'rovlarga ta'sir qilmaydi
+        connection.ensure_connection = timed_ensure_connection
+        try:
+            yield
+        finally:
+            del connection.ensure_connection
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(self._time_connect(connection, timer))
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+
+        if not timer.count:
+            return response
+
+        db_ms = timer.duration * 1000
+        connect_ms = timer.connect_duration * 1000
+        metrics = [f'db;dur={db_ms:.1f};desc="{timer.count} queries"']
+        if connect_ms:
+            metrics.append(f'db-connect;dur={connect_ms:.1f}')
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = ', '.join(([existing] if existing else []) + metrics)
+
+        if db_ms + connect_ms > self.slow_request_ms:
+            logger.warning(
+                "Sekin so'rov %s %s: %d ta DB so'rovi %.1f ms, ulanish %.1f ms",
+                request.method, request.path, timer.count, db_ms, connect_ms,
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Har bir so'rov uchun replika yo'naltirish holatini yaratadi (db_router)
+
+    Yozuvchi so'rovdan keyin foydalanuvchi DB_REPLICA_STICKY_SECONDS davomida
+    asosiy bazaga bog'lanadi (replikalar orqada qolishi mumkin).
+    AuthenticationMiddleware dan keyin turishi kerak.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = db_router.begin_request()
+        try:
+            response = self.get_response(request)
+            if request.method not in SAFE_METHODS:
+                # DRF token bilan autentifikatsiya qilingan foydalanuvchini ham request.user ga yozadi
+                db_router.pin_to_primary(getattr(request, 'user', None))
+        finally:
+            db_router.end_request(token)
+        return response
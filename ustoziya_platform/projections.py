@@ -0,0 +1,118 @@
+"""
+Katta ro'yxatlar uchun serializer'siz tezkor yo'l.
+
+`Projection` serializer bilan bir xil maydonlarni (tartibi va qiymatlari
+bilan) `values()` qatorlaridan yig'adi: model obyektlari yaratilmaydi,
+maydonlar bo'yicha introspeksiya yo'q, choices nomlari oldindan tayyorlangan
+lug'atlardan olinadi. `?fields=`/`?omit=` ham hisobga olinadi. Natija
+serializer natijasi bilan bir xil bo'lishi `benchmark_serializers` buyrug'i
+bilan tekshiriladi. FAST_READ_PATH_ENABLED=False bo'lsa serializer ishlatiladi.
+"""
+from operator import itemgetter
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .serializers import requested_fields, shape_queryset
+
+_datetime_field = serializers.DateTimeField()
+
+
+def fast_path_enabled():
+    return getattr(settings, 'FAST_READ_PATH_ENABLED', True)
+
+
+class Projection:
+    """values() asosidagi proyeksiya; `get_columns` maydon -> (ustunlar, funksiya) qaytaradi"""
+
+    serializer_class = None
+
+    def __init__(self, request=None):
+        self.request = request
+
+    def get_columns(self):
+        raise NotImplementedError
+
+    # Ustun yordamchilari
+
+    def value(self, lookup):
+        return (lookup,), itemgetter(lookup)
+
+    def display(self, lookup, choices):
+        """get_FOO_display() bilan bir xil: noma'lum qiymat o'zi qaytadi"""
+        labels = dict(choices)
+        return (lookup,), lambda row: labels.get(row[lookup], row[lookup])
+
+    def datetime(self, lookup):
+        to_representation = _datetime_field.to_representation
+        return (lookup,), lambda row: to_representation(row[lookup]) if row[lookup] else None
+
+    def file(self, model, lookup, absolute=True):
+        """FileField/ImageField URL'i; serializer maydoni so'rov bo'lsa to'liq URL beradi"""
+        storage = model._meta.get_field(lookup).storage
+        build = self.request.build_absolute_uri if absolute and self.request is not None else None
+
+        def url(row):
+            name = row[lookup]
+            if not name:
+                return None
+            return build(storage.url(name)) if build else storage.url(name)
+
+        return (lookup,), url
+
+    def full_name(self, prefix):
+        """User.get_full_name() bilan bir xil"""
+        first, last, username = f'{prefix}__first_name', f'{prefix}__last_name', f'{prefix}__username'
+
+        def name(row):
+            if row[first] and row[last]:
+                return f"{row[first]} {row[last]}"
+            return row[username]
+
+        return (first, last, username), name
+
+    def computed(self, lookups, func):
+        return tuple(lookups), func
+
+    def rows(self, queryset):
+        """Serializer `.data` bilan bir xil ro'yxat"""
+        names = requested_fields(self.request, self.serializer_class.Meta.fields, strict=True)
+        all_columns = self.get_columns()
+        columns = [(name, all_columns[name][1]) for name in names]
+        lookups = dict.fromkeys(lookup for name in names for lookup in all_columns[name][0])
+
+        hints = getattr(self.serializer_class, 'query_hints', {})
+        annotations = {
+            alias: expression
+            for name in names
+            for alias, expression in hints.get(name, {}).get('annotate', {}).items()
+            if alias not in queryset.query.annotations
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return [
+            {name: func(row) for name, func in columns}
+            for row in queryset.prefetch_related(None).values(*lookups)
+        ]
+
+
+def list_data(projection_class, queryset, request):
+    """Ro'yxat ma'lumotlari: tezkor yo'l yoqilgan bo'lsa proyeksiya, aks holda serializer"""
+    if fast_path_enabled():
+        return projection_class(request).rows(queryset)
+    serializer_class = projection_class.serializer_class
+    queryset = shape_queryset(queryset, serializer_class, request)
+    return serializer_class(queryset, many=True, context={'request': request}).data
+
+
+class FastListMixin:
+    """ListAPIView uchun: GET ro'yxati `projection_class` orqali (sahifalashsiz holatda)"""
+
+    projection_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.projection_class is None or not fast_path_enabled() or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.projection_class(request).rows(queryset))
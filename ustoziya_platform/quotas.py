@@ -0,0 +1,248 @@
+"""
+AI generatsiyalari uchun kvotalar.
+
+Alohida 'quotas' kesh aliasi orqali ishlaydi (Redis yoki DB keshi): qulflar va
+slotlar `cache.add` ning barcha gunicorn worker'lari uchun atomar bo'lishiga
+tayanadi, shuning uchun cheklovlar ular uchun birgalikda amal qiladi. Fayl va
+locmem keshlarida `add` atomar emas - `check_quota_cache` tizim tekshiruvi
+bunday sozlamani rad etadi (DEBUG da ogohlantiradi):
+
+* foydalanuvchi uchun token bucket - har bir o'qituvchi ma'lum tezlikdan
+  oshmaydi (`ai_generation_slot`, bitta foydalanuvchi so'roviga bitta token);
+* global semafor - bir vaqtda provayderga ketayotgan chaqiruvlar soni
+  cheklanadi (`provider_call_slot`). Slot har bir provayder chaqiruviga
+  alohida olinadi: hedged nusxalar va parallel bo'laklar ham o'z slotini oladi;
+* navbat - bo'sh slot bo'lmasa chaqiruv darhol rad etilmaydi, navbatda kutadi
+  va kutish vaqti tugasa navbatdagi o'rni bilan qaytariladi. Navbat tartibi
+  kutayotgan chiptalar ro'yxatida saqlanadi, shuning uchun o'rin aniq; vaqti
+  tugagan yoki jarayoni o'lgan chiptalar ro'yxatdan o'chadi. Navbat tufayli
+  bajarilmagan so'rov uchun foydalanuvchi tokeni qaytariladi.
+"""
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ai_quota'
+QUEUE_TAIL_KEY = f'{KEY_PREFIX}:queue:tail'
+QUEUE_KEY = f'{KEY_PREFIX}:queue:waiting'
+CACHE_ALIAS = 'quotas'
+
+# cache.add bir nechta jarayon uchun atomar bo'lmagan backendlar
+NON_ATOMIC_BACKENDS = (
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class QuotaExceeded(ValueError):
+    """AI so'rovi kvota yoki navbat tufayli bajarilmadi"""
+
+    def __init__(self, message, position=None, retry_after=None):
+        super().__init__(message)
+        self.position = position
+        self.retry_after = retry_after
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def check_quota_cache(app_configs=None, **kwargs):
+    """'quotas' kesh aliasi jarayonlararo atomar backendda ekanini tekshiradi"""
+    backend = settings.CACHES.get(CACHE_ALIAS, {}).get('BACKEND')
+    if backend in NON_ATOMIC_BACKENDS or backend is None:
+        message = (
+            f"AI kvotalari keshi ('{CACHE_ALIAS}') atomar emas: {backend or 'sozlanmagan'}. "
+            "Qulflar va slotlar worker'lar orasida ishlamaydi."
+        )
+        hint = "REDIS_URL yoki DB keshini sozlang (python manage.py createcachetable)."
+        if settings.DEBUG:
+            return [checks.Warning(message, hint=hint, id='quotas.W001')]
+        return [checks.Error(message, hint=hint, id='quotas.E001')]
+    return []
+
+
+def _incr(key, delta=1):
+    # DB keshida incr (get + set) atomar emas - qulf ostida oshiriladi
+    with _locked(key):
+        value = _cache().get(key, 0) + delta
+        _cache().set(key, value, timeout=None)
+    return value
+
+
+@contextmanager
+def _locked(key, timeout=5):
+    """Kesh asosidagi qisqa muddatli qulf; olinmasa QuotaExceeded"""
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    while not _cache().add(lock_key, token, timeout=timeout):
+        if time.monotonic() >= deadline:
+            raise QuotaExceeded(
+                "AI xizmati hozir band. Iltimos, birozdan so'ng qayta urinib ko'ring.", retry_after=1,
+            )
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        # Qulf muddati tugab boshqasi olgan bo'lsa, uniki o'chirilmaydi
+        if _cache().get(lock_key) == token:
+            _cache().delete(lock_key)
+
+
+def _bucket_key(user_id):
+    return f'{KEY_PREFIX}:bucket:{user_id}'
+
+
+def consume_user_token(user_id, cost=1):
+    """Foydalanuvchining token bucket'idan token oladi, yetmasa QuotaExceeded"""
+    capacity = _setting('AI_USER_BUCKET_CAPACITY', 5)
+    refill_per_second = _setting('AI_USER_BUCKET_REFILL_PER_MINUTE', 2) / 60.0
+    key = _bucket_key(user_id)
+
+    with _locked(key):
+        now = time.time()
+        tokens, updated_at = _cache().get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+        if tokens < cost:
+            retry_after = int((cost - tokens) / refill_per_second) + 1 if refill_per_second else None
+            raise QuotaExceeded(
+                "AI so'rovlari limiti tugadi. Iltimos, birozdan so'ng qayta urinib ko'ring.",
+                retry_after=retry_after,
+            )
+        _cache().set(key, (tokens - cost, now), timeout=86400)
+
+
+def refund_user_token(user_id, cost=1):
+    """Bajarilmagan so'rov uchun olingan tokenni qaytaradi"""
+    capacity = _setting('AI_USER_BUCKET_CAPACITY', 5)
+    key = _bucket_key(user_id)
+    with _locked(key):
+        now = time.time()
+        tokens, updated_at = _cache().get(key, (capacity, now))
+        _cache().set(key, (min(capacity, tokens + cost), updated_at), timeout=86400)
+
+
+def _slot_keys():
+    return [f'{KEY_PREFIX}:slot:{index}' for index in range(_setting('AI_MAX_CONCURRENT_CALLS', 4))]
+
+
+def _try_acquire_slot(token):
+    ttl = _setting('AI_SLOT_TTL_SECONDS', 180)
+    for key in _slot_keys():
+        if _cache().add(key, token, timeout=ttl):
+            return key
+    return None
+
+
+def _release_slot(key, token):
+    if _cache().get(key) == token:
+        _cache().delete(key)
+
+
+def _update_queue(change):
+    """Kutayotgan chiptalar ro'yxatini qulf ostida o'zgartiradi: [(chipta, amal_qilish_muddati)]"""
+    with _locked(QUEUE_KEY):
+        now = time.time()
+        entries = [entry for entry in _cache().get(QUEUE_KEY, []) if entry[1] > now]
+        entries = change(entries)
+        _cache().set(QUEUE_KEY, entries, timeout=None)
+
+
+def _join_queue():
+    ticket = _incr(QUEUE_TAIL_KEY)
+    # Jarayon o'lsa chipta shu muddatdan keyin navbatdan o'chadi
+    expires_at = time.time() + _setting('AI_QUEUE_MAX_WAIT_SECONDS', 15) + 5
+    _update_queue(lambda entries: entries + [(ticket, expires_at)])
+    return ticket
+
+
+def _leave_queue(ticket):
+    try:
+        _update_queue(lambda entries: [entry for entry in entries if entry[0] != ticket])
+    except QuotaExceeded:
+        pass  # chipta muddati tugagach o'zi o'chadi
+
+
+def queue_position(ticket):
+    """Navbatdagi o'rin (1 - navbat boshida)"""
+    now = time.time()
+    ahead = sum(1 for other, expires_at in _cache().get(QUEUE_KEY, []) if other < ticket and expires_at > now)
+    return ahead + 1
+
+
+def acquire_slot(token, cancelled=None):
+    """Global semafordan slot oladi; bo'sh slot bo'lmasa navbatda kutadi
+
+    `cancelled` (threading.Event) o'rnatilsa kutish to'xtatiladi.
+    """
+    slot = _try_acquire_slot(token)
+    if slot:
+        return slot
+
+    ticket = _join_queue()
+    slots_count = _setting('AI_MAX_CONCURRENT_CALLS', 4)
+    deadline = time.monotonic() + _setting('AI_QUEUE_MAX_WAIT_SECONDS', 15)
+    poll_interval = _setting('AI_QUEUE_POLL_INTERVAL_SECONDS', 0.25)
+    try:
+        while True:
+            position = queue_position(ticket)
+            # Faqat navbat boshidagilar slot uchun kurashadi - adolatli tartib
+            if position <= slots_count:
+                slot = _try_acquire_slot(token)
+                if slot:
+                    return slot
+            if cancelled is not None and cancelled.is_set():
+                raise QuotaExceeded("AI so'rovi bekor qilindi.", position=position)
+            if time.monotonic() >= deadline:
+                raise QuotaExceeded(
+                    f"AI xizmati hozir band. Navbatdagi o'rningiz: {position}. "
+                    "Iltimos, birozdan so'ng qayta urinib ko'ring.",
+                    position=position,
+                    retry_after=max(1, int(position * poll_interval * 4)),
+                )
+            time.sleep(poll_interval)
+    finally:
+        _leave_queue(ticket)
+
+
+@contextmanager
+def provider_call_slot(cancelled=None):
+    """Bitta provayder chaqiruvi uchun global slot (hedged va parallel chaqiruvlar ham alohida)"""
+    token = uuid.uuid4().hex
+    slot = acquire_slot(token, cancelled=cancelled)
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        _release_slot(slot, token)
+        logger.debug("AI slot %s bo'shatildi (%.2f s)", slot, time.monotonic() - started)
+
+
+@contextmanager
+def ai_generation_slot(user, cost=1):
+    """Foydalanuvchi AI so'rovi uchun token bucket'dan token oladi
+
+    Provayder chaqiruvlari ichkarida `provider_call_slot` bilan cheklanadi;
+    so'rov navbat tufayli bajarilmasa token qaytariladi.
+    """
+    user_id = getattr(user, 'pk', None) or 'anonymous'
+    consume_user_token(user_id, cost=cost)
+    try:
+        yield
+    except QuotaExceeded as exc:
+        if exc.position is not None:
+            refund_user_token(user_id, cost=cost)
+        raise
@@ -0,0 +1,43 @@
+"""
+Tezkor JSON renderer: orjson o'rnatilgan bo'lsa u bilan, aks holda DRF ning
+standart JSONRenderer i bilan ishlaydi.
+
+Natija standart renderer natijasi bilan baytma-bayt bir xil: datetime,
+Decimal va boshqa maxsus turlar DRF encoder'i orqali o'tadi, U+2028/U+2029
+ekranlanadi. Eksponentli float'lar (orjson `1e-05` ni `0.00001` deb yozadi),
+chiroyli formatlash (indent) yoki orjson qo'llamaydigan qiymatlar bo'lsa
+standart renderer ishlatiladi.
+"""
+import re
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# orjson eksponentli float'larni faqat shu ko'rinishda yozadi (masalan 2.5e-7)
+_EXPONENT_FLOAT = re.compile(rb'\de-?\d')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """orjson bilan JSON (standart JSONRenderer bilan bir xil baytlar)"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        if _EXPONENT_FLOAT.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
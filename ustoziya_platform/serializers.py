@@ -0,0 +1,107 @@
+"""
+Javob maydonlarini tanlash (sparse fieldsets): `?fields=` va `?omit=`.
+
+`?fields=id,title,thumbnail_url` - faqat shu maydonlar, `?omit=description`
+- shu maydonlarsiz. Javobdan chiqarilgan SerializerMethodField'lar umuman
+hisoblanmaydi. Serializer `query_hints` da maydonlar uchun kerakli
+select_related / prefetch_related / annotate'larni e'lon qiladi va view
+(`SparseFieldsetViewMixin` yoki `shape_queryset`) querysetga faqat tanlangan
+maydonlarga keraklilarini qo'shadi. Maydonlar faqat o'qish so'rovlarida
+(GET/HEAD) va faqat eng yuqori darajadagi serializerda qisqartiriladi.
+Noma'lum maydon nomi so'ralsa 400 qaytadi (bo'sh obyektlar ro'yxati emas).
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _parse(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+
+def requested_fields(request, field_names, strict=False):
+    """So'rovda tanlangan maydonlar (parametrlar bo'lmasa - barchasi)
+
+    `strict=True` - `field_names` to'liq ro'yxat bo'lganda: unda yo'q nomlar
+    uchun ValidationError (400).
+    """
+    names = list(field_names)
+    if request is None or request.method not in SAFE_METHODS:
+        return names
+    params = getattr(request, 'query_params', request.GET)
+    only = _parse(params.get('fields'))
+    omit = _parse(params.get('omit'))
+    if strict:
+        errors = {
+            param: [f"Noma'lum maydon: {name}" for name in sorted(requested - set(names))]
+            for param, requested in (('fields', only), ('omit', omit))
+            if requested - set(names)
+        }
+        if errors:
+            raise ValidationError(errors)
+    return [name for name in names if (not only or name in only) and name not in omit]
+
+
+def related_count(queryset, field):
+    """Bog'liq yozuvlar soni korrelyatsiyalangan subquery sifatida
+
+    Bir nechta Count() JOIN'lari qatorlarni ko'paytirib yubormasligi uchun.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by().values(field).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def shape_queryset(queryset, serializer_class, request):
+    """Querysetga faqat tanlangan maydonlar uchun kerakli JOIN/prefetch/annotatsiyalarni qo'shadi"""
+    hints = getattr(serializer_class, 'query_hints', {})
+    select_related, prefetch_related, annotations = [], [], {}
+    for name in requested_fields(request, hints):
+        select_related.extend(hints[name].get('select_related', ()))
+        prefetch_related.extend(hints[name].get('prefetch_related', ()))
+        annotations.update(hints[name].get('annotate', {}))
+    if select_related:
+        queryset = queryset.select_related(*dict.fromkeys(select_related))
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """Serializer uchun: `?fields=` / `?omit=` bo'yicha maydonlarni qisqartiradi
+
+    `query_hints` - maydon nomi -> {'select_related': [...],
+    'prefetch_related': [...], 'annotate': {...}}.
+    """
+
+    query_hints = {}
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+        keep = set(requested_fields(self.context.get('request'), fields, strict=True))
+        return {name: field for name, field in fields.items() if name in keep}
+
+
+class SparseFieldsetViewMixin:
+    """Generic view uchun: querysetni serializer `query_hints` bo'yicha shakllantiradi"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return shape_queryset(queryset, self.get_serializer_class(), self.request)
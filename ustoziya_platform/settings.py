@@ -52,10 +52,12 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'ustoziya_platform.middleware.DatabaseTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ustoziya_platform.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,6 +90,12 @@ WSGI_APPLICATION = 'ustoziya_platform.wsgi.application'
 # Render: PostgreSQL via DATABASE_URL
 DATABASE_URL = config('DATABASE_URL', default='')
 
+# Ulanishlarni qayta ishlatish (barcha backend'lar uchun bir xil)
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+# PgBouncer (transaction pooling) orqali ulanganda server-side kursorlar o'chiriladi
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+
 # PythonAnywhere MySQL uchun (ixtiyoriy)
 if config('USE_MYSQL', default=False, cast=bool):
     DATABASES = {
@@ -105,7 +113,11 @@ if config('USE_MYSQL', default=False, cast=bool):
 elif DATABASE_URL:
     # Render yoki boshqa platformalar uchun PostgreSQL
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600)
+        'default': dj_database_url.parse(
+            DATABASE_URL,
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        )
     }
 else:
     # SQLite (development va PythonAnywhere free account)
@@ -116,6 +128,102 @@ else:
         }
     }
 
+DATABASES['default'].update({
+    'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+    'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+})
+if DB_PGBOUNCER:
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# O'qish replikalari (vergul bilan ajratilgan DATABASE_URL uslubidagi manzillar).
+# Ro'yxat va qidiruv view'laridagi o'qishlar replikaga, yozishlar 'default' ga boradi.
+DATABASE_REPLICA_URLS = config(
+    'DATABASE_REPLICA_URLS', default='', cast=lambda v: [s.strip() for s in v.split(',') if s.strip()]
+)
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(DATABASE_REPLICA_URLS, 1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(
+        replica_url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    )
+    # Testlarda replika alohida baza emas, asosiy bazaning nusxasi
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    if DB_PGBOUNCER:
+        DATABASES[alias]['DISABLE_SERVER_SIDE_CURSORS'] = True
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['ustoziya_platform.db_router.ReplicaRouter']
+# Testlar LocMem keshlarida ishlaydi (ustoziya_platform.testing)
+TEST_RUNNER = 'ustoziya_platform.testing.TestRunner'
+# Yozishdan keyin foydalanuvchi o'qishlari asosiy bazada qoladigan vaqt (replika kechikishi)
+DB_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=15, cast=int)
+
+# So'rov davomidagi DB ulanish va so'rovlar vaqti (Server-Timing sarlavhasi)
+DB_TIMING_ENABLED = config('DB_TIMING_ENABLED', default=True, cast=bool)
+DB_SLOW_REQUEST_MS = config('DB_SLOW_REQUEST_MS', default=500, cast=int)
+
+
+# Cache
+# L1 - har bir jarayon ichidagi qisqa muddatli xotira keshi ('local').
+# L2 - barcha worker'lar uchun umumiy kesh ('default'): REDIS_URL berilsa Redis,
+# aks holda CACHE_BACKEND bo'yicha fayl (standart) yoki ma'lumotlar bazasi keshi.
+# DB keshi (va Redis'siz AI kvotalari) uchun avval `python manage.py createcachetable` bajariladi.
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_BACKEND = config('CACHE_BACKEND', default='file')
+CACHE_KEY_PREFIX = config('CACHE_KEY_PREFIX', default='ustoziya')
+
+if REDIS_URL:
+    L2_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+elif CACHE_BACKEND == 'db':
+    L2_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+elif CACHE_BACKEND == 'locmem':
+    L2_CACHE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'l2',
+    }
+else:
+    L2_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_DIR', default=str(BASE_DIR / 'cache_data')),
+    }
+
+# AI kvotalari ('quotas') qulflari cache.add ning worker'lar orasida atomar bo'lishiga
+# tayanadi: L2 Redis yoki DB bo'lsa o'sha, aks holda DB keshi (fayl/locmem atomar emas).
+if L2_CACHE['BACKEND'] in ('django.core.cache.backends.redis.RedisCache',
+                           'django.core.cache.backends.db.DatabaseCache'):
+    QUOTA_CACHE = L2_CACHE
+else:
+    QUOTA_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+
+CACHES = {
+    'default': {
+        **L2_CACHE,
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+        'TIMEOUT': config('CACHE_DEFAULT_TIMEOUT', default=300, cast=int),
+    },
+    'quotas': {
+        **QUOTA_CACHE,
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+        'TIMEOUT': None,
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'l1',
+        'TIMEOUT': config('CACHE_L1_TIMEOUT', default=5, cast=int),
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_L1_MAX_ENTRIES', default=1000, cast=int)},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -176,6 +284,11 @@ if not DEBUG:
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    # orjson bo'lsa tezroq, natija standart JSONRenderer bilan bir xil
+    'DEFAULT_RENDERER_CLASSES': [
+        'ustoziya_platform.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
@@ -185,9 +298,22 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Katta ro'yxatlar (materiallar, testlar, qidiruv) serializer o'rniga values() proyeksiyasi orqali
+FAST_READ_PATH_ENABLED = config('FAST_READ_PATH_ENABLED', default=True, cast=bool)
+
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
+# Bundan katta multipart fayllar xotirada emas, diskdagi vaqtinchalik faylda saqlanadi
+FILE_UPLOAD_MAX_MEMORY_SIZE = config('FILE_UPLOAD_MAX_MEMORY_SIZE', default=2621440, cast=int)  # 2.5MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = config('DATA_UPLOAD_MAX_MEMORY_SIZE', default=10 * 1024 * 1024, cast=int)  # 10MB
+
+# Bo'laklab davom ettiriladigan yuklash (materials.uploads, tus 1.0)
+UPLOAD_TEMP_DIR = config('UPLOAD_TEMP_DIR', default=os.path.join(BASE_DIR, 'upload_tmp'))
+UPLOAD_MAX_SIZE = config('UPLOAD_MAX_SIZE', default=2 * 1024 * 1024 * 1024, cast=int)  # 2GB
+UPLOAD_CHUNK_MAX_BYTES = config('UPLOAD_CHUNK_MAX_BYTES', default=32 * 1024 * 1024, cast=int)
+UPLOAD_EXPIRY_HOURS = config('UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
+# Kontent-manzilli media ombori (materials.storage): havolasiz blob shuncha soat o'tgach o'chiriladi
+MEDIA_BLOB_GRACE_HOURS = config('MEDIA_BLOB_GRACE_HOURS', default=24, cast=int)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -206,6 +332,26 @@ LOGOUT_REDIRECT_URL = '/'
 # For Linux (Render, PythonAnywhere): use system tesseract
 # For Windows: use full path
 TESSERACT_PATH = config('TESSERACT_PATH', default='/usr/bin/tesseract')
+# Tesseract uchun ish o'lchami (uzun tomon, px): A4 varaq ~200 DPI - aniqlik/CPU
+# nisbati eng yaxshi oraliq; kichik rasmlar OCR_IMAGE_MIN_SIDE gacha kattalashtiriladi
+OCR_IMAGE_MAX_SIDE = config('OCR_IMAGE_MAX_SIDE', default=2400, cast=int)
+OCR_IMAGE_MIN_SIDE = config('OCR_IMAGE_MIN_SIDE', default=1600, cast=int)
+
+# Yuklangan rasmlarni normallashtirish (ustoziya_platform.images)
+IMAGE_UPLOAD_PROFILES = {
+    'ocr': {
+        'max_side': OCR_IMAGE_MAX_SIDE,
+        'format': 'JPEG',
+        'quality': 90,
+        'keep_original': config('OCR_KEEP_ORIGINAL_IMAGES', default=False, cast=bool),
+    },
+    'avatar': {
+        'max_side': config('AVATAR_MAX_SIDE', default=512, cast=int),
+        'format': 'WEBP',
+        'quality': 85,
+        'keep_original': False,
+    },
+}
 
 # Google Cloud Vision API settings
 GOOGLE_API_KEY = config('GOOGLE_API_KEY', default='')
@@ -215,6 +361,7 @@ GOOGLE_PROJECT_NUMBER = config('GOOGLE_PROJECT_NUMBER', default='980339613237')
 # Google Gemini AI API settings
 GOOGLE_GEMINI_API_KEY = config('GOOGLE_GEMINI_API_KEY', default='')
 GOOGLE_GEMINI_MODEL = config('GOOGLE_GEMINI_MODEL', default='models/gemini-1.5-flash-latest')
+GOOGLE_GEMINI_TEST_MODEL = config('GOOGLE_GEMINI_TEST_MODEL', default='gemini-pro')
 
 # OpenAI API settings
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
@@ -227,3 +374,78 @@ OPENROUTER_BASE_URL = config('OPENROUTER_BASE_URL', default='https://openrouter.
 OPENROUTER_SITE_URL = config('OPENROUTER_SITE_URL', default='http://127.0.0.1:8000')
 OPENROUTER_SITE_NAME = config('OPENROUTER_SITE_NAME', default='Ustoziya Platformasi')  # Windows uchun
 OPENROUTER_MODEL = config('OPENROUTER_MODEL', default='openai/gpt-4o')
+
+# AI provayder router sozlamalari
+# AI_PROVIDER_BACKEND=fake oflayn ishlash uchun soxta provayderlarni yoqadi.
+# AI_FAKE_PROVIDERS formati: nom[:kechikish_soniya[:fail]], masalan "tez:0.1,sekin:5,buzuq:0:fail"
+AI_PROVIDER_BACKEND = config('AI_PROVIDER_BACKEND', default='live')
+AI_FAKE_PROVIDERS = config('AI_FAKE_PROVIDERS', default='fake')
+AI_CIRCUIT_FAILURE_THRESHOLD = config('AI_CIRCUIT_FAILURE_THRESHOLD', default=3, cast=int)
+AI_CIRCUIT_COOLDOWN_SECONDS = config('AI_CIRCUIT_COOLDOWN_SECONDS', default=30, cast=int)
+# Hedge vaqti provayder p95 kechikishi; AI_HEDGE_MIN_SAMPLES ta javob yig'ilguncha (isitish davri)
+# AI_HEDGE_DEFAULT_DELAY_SECONDS ishlatiladi, 0 bo'lsa bu davrda hedged so'rov yuborilmaydi.
+AI_HEDGE_MIN_SAMPLES = config('AI_HEDGE_MIN_SAMPLES', default=5, cast=int)
+AI_HEDGE_DEFAULT_DELAY_SECONDS = config('AI_HEDGE_DEFAULT_DELAY_SECONDS', default=0.0, cast=float)
+AI_ROUTER_MAX_WORKERS = config('AI_ROUTER_MAX_WORKERS', default=8, cast=int)
+
+# AI klientlari uchun umumiy HTTP sozlamalari (ulanishlar pooli, timeout, retry)
+AI_HTTP_TIMEOUT = config('AI_HTTP_TIMEOUT', default=60, cast=float)
+AI_HTTP_CONNECT_TIMEOUT = config('AI_HTTP_CONNECT_TIMEOUT', default=10, cast=float)
+AI_HTTP_MAX_RETRIES = config('AI_HTTP_MAX_RETRIES', default=2, cast=int)
+AI_HTTP_MAX_CONNECTIONS = config('AI_HTTP_MAX_CONNECTIONS', default=20, cast=int)
+AI_HTTP_MAX_KEEPALIVE = config('AI_HTTP_MAX_KEEPALIVE', default=10, cast=int)
+AI_HTTP_KEEPALIVE_EXPIRY = config('AI_HTTP_KEEPALIVE_EXPIRY', default=60, cast=float)
+AI_CLIENTS_WARM_ON_BOOT = config('AI_CLIENTS_WARM_ON_BOOT', default=True, cast=bool)
+
+# AI generatsiyalari uchun kvotalar (Django kesh orqali barcha worker'lar uchun umumiy)
+AI_MAX_CONCURRENT_CALLS = config('AI_MAX_CONCURRENT_CALLS', default=4, cast=int)
+AI_USER_BUCKET_CAPACITY = config('AI_USER_BUCKET_CAPACITY', default=5, cast=int)
+AI_USER_BUCKET_REFILL_PER_MINUTE = config('AI_USER_BUCKET_REFILL_PER_MINUTE', default=2, cast=float)
+AI_QUEUE_MAX_WAIT_SECONDS = config('AI_QUEUE_MAX_WAIT_SECONDS', default=15, cast=float)
+AI_SLOT_TTL_SECONDS = config('AI_SLOT_TTL_SECONDS', default=180, cast=int)
+
+# AI test generatsiyasi: savollar parallel bo'laklarda so'raladi
+AI_TEST_CHUNK_SIZE = config('AI_TEST_CHUNK_SIZE', default=10, cast=int)
+AI_TEST_MAX_PARALLEL_CHUNKS = config('AI_TEST_MAX_PARALLEL_CHUNKS', default=4, cast=int)
+AI_TEST_CHUNK_RETRIES = config('AI_TEST_CHUNK_RETRIES', default=2, cast=int)
+
+# Fon vazifalari (eksportlar va h.k.)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+BACKGROUND_TASKS_MAX_WORKERS = config('BACKGROUND_TASKS_MAX_WORKERS', default=2, cast=int)
+
+# Excel eksport fayllarini saqlash muddati
+EXCEL_EXPORT_RETENTION_DAYS = config('EXCEL_EXPORT_RETENTION_DAYS', default=7, cast=int)
+# Shundan uzoq kutilmoqda/qayta ishlanmoqda holatidagi eksport osilib qolgan hisoblanadi va qayta navbatga qo'yiladi
+EXCEL_EXPORT_STALE_MINUTES = config('EXCEL_EXPORT_STALE_MINUTES', default=30, cast=int)
+
+# Test hujjatlari (Word/PDF) keshi va PDF shrifti
+TEST_DOCUMENT_CACHE_SECONDS = config('TEST_DOCUMENT_CACHE_SECONDS', default=86400, cast=int)
+TEST_DOCUMENT_CACHE_MAX_BYTES = config('TEST_DOCUMENT_CACHE_MAX_BYTES', default=5 * 1024 * 1024, cast=int)
+PDF_FONT_PATH = config('PDF_FONT_PATH', default='')
+
+# Bosh sahifa hisoblagichlari (stale-while-revalidate)
+SITE_STATS_FRESH_SECONDS = config('SITE_STATS_FRESH_SECONDS', default=300, cast=int)
+SITE_STATS_EXACT_COUNT_LIMIT = config('SITE_STATS_EXACT_COUNT_LIMIT', default=1000000, cast=int)
+SITE_STATS_REFRESH_LOCK_SECONDS = 60
+
+# Kategoriyalar ro'yxati keshi (o'zgarganda darhol eskirtiriladi)
+CATEGORY_LIST_CACHE_SECONDS = config('CATEGORY_LIST_CACHE_SECONDS', default=86400, cast=int)
+
+# Yuklangan fayllar uchun kichik rasmlar (fon vazifasida, WebP)
+MEDIA_THUMBNAILS_ENABLED = config('MEDIA_THUMBNAILS_ENABLED', default=True, cast=bool)
+MEDIA_THUMBNAIL_WIDTHS = config(
+    'MEDIA_THUMBNAIL_WIDTHS', default='320,640,1280', cast=lambda v: [int(s) for s in v.split(',') if s.strip()]
+)
+MEDIA_THUMBNAIL_DEFAULT_WIDTH = config('MEDIA_THUMBNAIL_DEFAULT_WIDTH', default=640, cast=int)
+MEDIA_THUMBNAIL_QUALITY = config('MEDIA_THUMBNAIL_QUALITY', default=80, cast=int)
+MEDIA_POSTER_OFFSET_SECONDS = config('MEDIA_POSTER_OFFSET_SECONDS', default=1, cast=int)
+MEDIA_RENDER_TIMEOUT = config('MEDIA_RENDER_TIMEOUT', default=60, cast=int)
+MEDIA_SOFFICE_BINARY = config('MEDIA_SOFFICE_BINARY', default='soffice')
+MEDIA_FFMPEG_BINARY = config('MEDIA_FFMPEG_BINARY', default='ffmpeg')
+MEDIA_PDFTOPPM_BINARY = config('MEDIA_PDFTOPPM_BINARY', default='pdftoppm')
+
+# 3D modellar: o'lcham, tahlil va siqilgan GLB variantlar (fon vazifasida, gltfpack)
+MODEL3D_PROCESSING_ENABLED = config('MODEL3D_PROCESSING_ENABLED', default=True, cast=bool)
+MODEL3D_VARIANTS_ENABLED = config('MODEL3D_VARIANTS_ENABLED', default=True, cast=bool)
+MODEL3D_PREVIEW_RATIO = config('MODEL3D_PREVIEW_RATIO', default=0.1, cast=float)
+MODEL3D_GLTFPACK_BINARY = config('MODEL3D_GLTFPACK_BINARY', default='gltfpack')
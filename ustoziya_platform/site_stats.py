@@ -0,0 +1,102 @@
+"""
+Bosh sahifa hisoblagichlari (materiallar, testlar, foydalanuvchilar).
+
+Hisoblagichlar fon vazifasida hisoblanadi va keshdan stale-while-revalidate
+tartibida beriladi: yangi qiymat bo'lsa darhol qaytariladi, eskirgan bo'lsa
+ham qaytariladi va fonda yangilash boshlanadi. Hisoblagichlar filtrlangan
+(`is_public`, `is_active`), shuning uchun ular har doim aniq COUNT(*) bilan
+hisoblanadi va natija keshlanadi - butun jadval bo'yicha katalog
+statistikasi (`pg_class.reltuples`) ommaviy yozuvlar sonini oshirib
+ko'rsatardi. Taxminiy son faqat filtrsiz juda katta querysetlar uchun
+ishlatiladi. Kesh bo'sh bo'lsa (kamdan-kam: yozuv bir hafta saqlanadi)
+aniq sonlar shu so'rovda hisoblanadi.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from . import background, caching
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'site_stats:counters'
+REFRESH_LOCK_KEY = 'site_stats:refreshing'
+# Eskirgan qiymat ham foydali, shuning uchun uzoq saqlanadi
+CACHE_TIMEOUT = 7 * 24 * 3600
+
+
+def _counters():
+    from accounts.models import User
+    from materials.models import Material
+    from tests.models import Test
+
+    return {
+        'total_materials': Material.objects.filter(is_public=True),
+        'total_tests': Test.objects.filter(is_public=True, is_active=True),
+        'total_users': User.objects.filter(is_active=True),
+    }
+
+
+def approximate_count(model):
+    """Jadvaldagi qatorlar soni katalog statistikasidan (None - mavjud emas)"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples = -1: jadval hali ANALYZE qilinmagan
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def _count(queryset):
+    """Filtrsiz katta jadvallar uchun taxminiy, qolganlari uchun aniq son"""
+    if queryset.query.where:
+        # Katalog statistikasi butun jadvalniki - filtrlangan son uchun yaramaydi
+        return queryset.count()
+    approximate = approximate_count(queryset.model)
+    if approximate is not None and approximate > getattr(settings, 'SITE_STATS_EXACT_COUNT_LIMIT', 1_000_000):
+        return approximate
+    return queryset.count()
+
+
+def compute_site_stats():
+    """Hisoblagichlarni hisoblaydi va keshga yozadi"""
+    values = {name: _count(queryset) for name, queryset in _counters().items()}
+    caching.set(CACHE_KEY, {'values': values, 'computed_at': time.time()}, timeout=CACHE_TIMEOUT)
+    return values
+
+
+def _refresh():
+    try:
+        compute_site_stats()
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+
+
+def schedule_refresh():
+    """Fonda yangilashni boshlaydi (bir vaqtda faqat bittasi)"""
+    if cache.add(REFRESH_LOCK_KEY, 1, timeout=getattr(settings, 'SITE_STATS_REFRESH_LOCK_SECONDS', 60)):
+        background.submit(_refresh)
+
+
+def get_site_stats():
+    """Bosh sahifa hisoblagichlari (keshdan; eskirgan bo'lsa fonda yangilanadi)"""
+    cached = caching.get(CACHE_KEY)
+    if cached is not None:
+        if time.time() - cached['computed_at'] > getattr(settings, 'SITE_STATS_FRESH_SECONDS', 300):
+            schedule_refresh()
+        return cached['values']
+    return compute_site_stats()
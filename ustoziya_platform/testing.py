@@ -0,0 +1,51 @@
+"""
+Testlar uchun umumiy sozlamalar va yordamchilar.
+
+`TestRunner` (settings.TEST_RUNNER) butun test to'plamini LocMem keshlarida
+ishga tushiradi - testlar loyihadagi `cache_data/` ga yozmaydi va
+cache.add/incr bir jarayon ichida atomar bo'ladi (kvota keshi tekshiruvi
+shu sababli o'chirilgan). `TemporaryMediaMixin`
+har bir test uchun MEDIA_ROOT va yuklashlar katalogini vaqtinchalik
+katalogga ko'chiradi.
+"""
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-local'},
+    'quotas': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-quotas'},
+}
+
+
+class TestRunner(DiscoverRunner):
+    """Keshlar LocMem'ga almashtirilgan DiscoverRunner"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Testlar bitta jarayonda - LocMem kvota keshi haqidagi tekshiruv o'chiriladi
+        self._caches_override = override_settings(
+            CACHES=LOCMEM_CACHES, SILENCED_SYSTEM_CHECKS=['quotas.W001', 'quotas.E001'],
+        )
+        self._caches_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches_override.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+class TemporaryMediaMixin:
+    """MEDIA_ROOT va UPLOAD_TEMP_DIR har bir test uchun vaqtinchalik katalogda"""
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.media_root = os.path.join(root, 'media')
+        override = override_settings(MEDIA_ROOT=self.media_root, UPLOAD_TEMP_DIR=os.path.join(root, 'upload_tmp'))
+        override.enable()
+        self.addCleanup(override.disable)
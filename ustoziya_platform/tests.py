@@ -0,0 +1,582 @@
+import threading
+import time
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.contrib.messages import get_messages
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, models, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient, force_authenticate
+from rest_framework.views import APIView
+
+from accounts.models import User
+from materials.models import Material, MaterialCategory
+from tests.models import Question, Test, TestCategory
+
+from . import caching, category_lists, db_router, quotas, site_stats
+from .db_indexes import fallback_index, partial_index_fallbacks
+from .middleware import DatabaseTimingMiddleware, QueryTimer, ReplicaRoutingMiddleware
+from .testing import TemporaryMediaMixin
+
+
+@override_settings(
+    AI_MAX_CONCURRENT_CALLS=1,
+    AI_USER_BUCKET_CAPACITY=2,
+    AI_USER_BUCKET_REFILL_PER_MINUTE=0.001,
+    AI_QUEUE_MAX_WAIT_SECONDS=0.2,
+    AI_QUEUE_POLL_INTERVAL_SECONDS=0.02,
+)
+class QuotaTests(SimpleTestCase):
+    """AI kvotalari: token bucket, global slotlar va navbat"""
+
+    def setUp(self):
+        self.cache = caches[quotas.CACHE_ALIAS]
+        self.cache.clear()
+
+    def test_user_bucket_is_exhausted(self):
+        quotas.consume_user_token(1)
+        quotas.consume_user_token(1)
+        with self.assertRaises(quotas.QuotaExceeded) as raised:
+            quotas.consume_user_token(1)
+        self.assertIsNone(raised.exception.position)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+    def test_queue_timeout_refunds_user_token(self):
+        class User:
+            pk = 7
+
+        with quotas.provider_call_slot():
+            for _ in range(2):
+                with self.assertRaises(quotas.QuotaExceeded) as raised:
+                    with quotas.ai_generation_slot(User()):
+                        with quotas.provider_call_slot():
+                            pass  # pragma: no cover
+                self.assertEqual(raised.exception.position, 1)
+        # Ikkala token ham qaytarilgan
+        quotas.consume_user_token(7)
+        quotas.consume_user_token(7)
+
+    def test_failed_generation_without_queue_keeps_token(self):
+        class User:
+            pk = 8
+
+        with self.assertRaises(RuntimeError):
+            with quotas.ai_generation_slot(User()):
+                raise RuntimeError('provayder xatoligi')
+        quotas.consume_user_token(8)
+        with self.assertRaises(quotas.QuotaExceeded):
+            quotas.consume_user_token(8)
+
+    def test_each_provider_call_takes_its_own_slot(self):
+        with quotas.provider_call_slot():
+            self.assertIsNone(quotas._try_acquire_slot('other'))
+        slot = quotas._try_acquire_slot('other')
+        self.assertIsNotNone(slot)
+        quotas._release_slot(slot, 'other')
+
+    def test_cancelled_wait_stops_early(self):
+        cancelled = threading.Event()
+        cancelled.set()
+        with quotas.provider_call_slot():
+            started = time.monotonic()
+            with self.assertRaisesMessage(quotas.QuotaExceeded, 'bekor qilindi'):
+                with quotas.provider_call_slot(cancelled=cancelled):
+                    pass  # pragma: no cover
+            self.assertLess(time.monotonic() - started, 0.15)
+
+    def test_queue_position_ignores_tickets_that_left(self):
+        first, second, third = quotas._join_queue(), quotas._join_queue(), quotas._join_queue()
+        self.assertEqual(quotas.queue_position(second), 2)
+        # Orqadagi chipta ketishi o'rinni o'zgartirmaydi, oldindagisi ketsa o'rin kamayadi
+        quotas._leave_queue(third)
+        self.assertEqual(quotas.queue_position(second), 2)
+        quotas._leave_queue(first)
+        self.assertEqual(quotas.queue_position(second), 1)
+        quotas._leave_queue(second)
+        self.assertEqual(self.cache.get(quotas.QUEUE_KEY), [])
+
+    def test_timed_out_waiters_leave_the_queue(self):
+        with quotas.provider_call_slot():
+            with self.assertRaises(quotas.QuotaExceeded):
+                quotas.acquire_slot('waiter')
+        self.assertEqual(self.cache.get(quotas.QUEUE_KEY), [])
+
+    def test_lock_timeout_raises_and_keeps_foreign_lock(self):
+        self.cache.add('resource:lock', 'other', timeout=60)
+        with self.assertRaises(quotas.QuotaExceeded):
+            with quotas._locked('resource', timeout=0.05):
+                pass  # pragma: no cover
+        self.assertEqual(self.cache.get('resource:lock'), 'other')
+
+    def test_lock_is_released_by_its_owner(self):
+        with quotas._locked('resource'):
+            self.assertIsNotNone(self.cache.get('resource:lock'))
+        self.assertIsNone(self.cache.get('resource:lock'))
+
+    def test_shared_atomic_cache_passes_check(self):
+        for backend in ('django.core.cache.backends.redis.RedisCache', 'django.core.cache.backends.db.DatabaseCache'):
+            with self.subTest(backend=backend), override_settings(CACHES={'quotas': {'BACKEND': backend}}):
+                self.assertEqual(quotas.check_quota_cache(), [])
+
+    def test_non_atomic_cache_is_rejected(self):
+        caches_setting = {'quotas': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache'}}
+        with override_settings(CACHES=caches_setting, DEBUG=False):
+            self.assertEqual([error.id for error in quotas.check_quota_cache()], ['quotas.E001'])
+        with override_settings(CACHES=caches_setting, DEBUG=True):
+            self.assertEqual([error.id for error in quotas.check_quota_cache()], ['quotas.W001'])
+
+
+class DatabaseTimingMiddlewareTests(TestCase):
+    """Server-Timing faqat DB so'rovi bajarilgan javoblarga qo'shiladi"""
+
+    def run_middleware(self, view):
+        return DatabaseTimingMiddleware(view)(RequestFactory().get('/'))
+
+    def test_request_without_queries_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            response = self.run_middleware(lambda request: HttpResponse('ok'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('ensure_connection', connection.__dict__)
+
+    def test_queries_are_timed(self):
+        def view(request):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return HttpResponse('ok')
+
+        response = self.run_middleware(view)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries"$')
+
+    def test_connect_is_timed_only_when_a_query_opens_it(self):
+        class FakeConnection:
+            connection = None
+
+            def ensure_connection(self):
+                if self.connection is None:
+                    time.sleep(0.01)
+                    self.connection = object()
+
+        fake, timer = FakeConnection(), QueryTimer()
+        with DatabaseTimingMiddleware(None)._time_connect(fake, timer):
+            self.assertEqual(timer.connect_duration, 0)
+            fake.ensure_connection()
+            fake.ensure_connection()
+        self.assertGreaterEqual(timer.connect_duration, 0.01)
+        self.assertNotIn('ensure_connection', fake.__dict__)
+
+
+class PartialIndexFallbackTests(SimpleTestCase):
+    """MySQL uchun shartli indekslarning zaxira kompozit indekslari"""
+
+    def test_condition_fields_lead_the_fallback(self):
+        index = models.Index(
+            fields=['category', '-created_at'], name='test_pub_cat_idx',
+            condition=models.Q(is_public=True, is_active=True),
+        )
+        fallback = fallback_index(index)
+        self.assertEqual(fallback.name, 'test_pub_cat_fb')
+        self.assertEqual(fallback.fields, ['is_active', 'is_public', 'category', '-created_at'])
+        self.assertIsNone(fallback.condition)
+
+    def run_fallbacks(self, *args):
+        added = []
+        schema_editor = mock.Mock(**{'connection.features.supports_partial_indexes': False})
+        schema_editor.add_index.side_effect = lambda model, index: added.append(index.name)
+        partial_index_fallbacks(*args).code(django_apps, schema_editor)
+        return added
+
+    def test_explicit_names_limit_the_fallbacks(self):
+        self.assertEqual(self.run_fallbacks('materials', ['material_pub_cat_idx']), ['material_pub_cat_fb'])
+        self.assertIn('video_pub_recent_fb', self.run_fallbacks('materials'))
+
+    def test_unknown_or_plain_index_names_are_rejected(self):
+        with self.assertRaisesMessage(ValueError, 'material_author_recent_idx'):
+            self.run_fallbacks('materials', ['material_author_recent_idx'])
+
+
+class FakeUser:
+    is_authenticated = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+class ReplicaListView(db_router.ReplicaReadMixin, APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response({'db': Material.objects.all().db})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@db_router.replica_reads
+def replica_function_view(request):
+    return Response({'db': Material.objects.all().db})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def primary_function_view(request):
+    return Response({'db': Material.objects.all().db})
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], DB_REPLICA_STICKY_SECONDS=15)
+class ReplicaRouterTests(SimpleTestCase):
+    """Replika yo'naltirish: QuerySet.db so'rov bajarmasdan tanlangan bazani ko'rsatadi"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = FakeUser(5)
+
+    def call(self, view, method='get', user=None):
+        request = getattr(self.factory, method)('/')
+        request.user = user or self.user
+        force_authenticate(request, user=request.user)
+        response = ReplicaRoutingMiddleware(view)(request)
+        return response.data['db'] if hasattr(response, 'data') else response
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(Material.objects.all().db, 'default')
+
+    def test_marked_views_read_from_replica(self):
+        self.assertEqual(self.call(ReplicaListView.as_view()), 'replica_1')
+        self.assertEqual(self.call(replica_function_view), 'replica_1')
+
+    def test_unmarked_views_read_from_primary(self):
+        self.assertEqual(self.call(primary_function_view), 'default')
+
+    def test_writes_always_go_to_primary(self):
+        self.addCleanup(db_router.end_request, db_router.begin_request())
+        self.assertEqual(router.db_for_write(Material), 'default')
+
+    def test_reads_after_write_in_same_request_use_primary(self):
+        class WritingView(db_router.ReplicaReadMixin, APIView):
+            permission_classes = [AllowAny]
+
+            def get(self, request):
+                before = Material.objects.all().db
+                router.db_for_write(Material)
+                return Response({'db': [before, Material.objects.all().db]})
+
+        self.assertEqual(self.call(WritingView.as_view()), ['replica_1', 'default'])
+
+    def test_user_is_pinned_to_primary_after_post(self):
+        self.call(lambda request: HttpResponse(status=201), method='post')
+        self.assertTrue(db_router.is_pinned(self.user))
+        self.assertEqual(self.call(ReplicaListView.as_view()), 'default')
+        # Boshqa foydalanuvchilar replikadan o'qishda davom etadi
+        self.assertEqual(self.call(ReplicaListView.as_view(), user=FakeUser(6)), 'replica_1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        self.assertEqual(self.call(ReplicaListView.as_view()), 'default')
+
+
+class ProfileViewTests(TestCase):
+    """Profil: buzilgan avatar yuborilsa hech narsa saqlanmaydi"""
+
+    def test_invalid_avatar_is_not_saved(self):
+        user = User.objects.create_user(username='teacher', password='parol12345', first_name='Ali')
+        self.client.force_login(user)
+        response = self.client.post('/profile/', {
+            'first_name': 'Vali',
+            'avatar': SimpleUploadedFile('avatar.png', b'rasm emas', content_type='image/png'),
+        })
+        self.assertRedirects(response, '/profile/', fetch_redirect_response=False)
+        user.refresh_from_db()
+        self.assertEqual(user.first_name, 'Ali')
+        self.assertEqual(
+            [message.level_tag for message in get_messages(response.wsgi_request)], ['error'],
+        )
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=False, MODEL3D_PROCESSING_ENABLED=False)
+class FastReadPathTests(TemporaryMediaMixin, TestCase):
+    """Tezkor yo'l (proyeksiya + FastJSONRenderer) serializer bilan baytma-bayt bir xil"""
+
+    list_urls = [
+        '/api/materials/',
+        '/api/materials/search/',
+        '/api/materials/?fields=id,category_name,author_name,thumbnail,updated_at',
+        '/api/tests/',
+        '/api/tests/search/',
+        '/api/tests/?omit=description',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        named = User.objects.create_user(
+            username='dilnoza', password='parol12345', first_name='Dilnoza', last_name="O'ktamova",
+            subject='mathematics',
+        )
+        # Ism-familiyasiz muallif (username) va ro'yxatda yo'q fan
+        unnamed = User.objects.create_user(username='teacher2', password='parol12345', subject='astronomy')
+        category = MaterialCategory.objects.create(name='Kasrlar "oson"')
+        Material.objects.create(
+            title='Kasrlar darsi', description='Qo\'shtirnoq " va </script>', material_type='presentation',
+            category=category, author=named, file=ContentFile(b'slayd', name='kasrlar.pdf'),
+            tags='kasr, sonlar', rating=4.25,
+        )
+        Material.objects.create(
+            title='Rasmli', description='', material_type='worksheet', category=category, author=unnamed,
+            file=ContentFile(b'varaq', name='varaq.pdf'), thumbnail='thumbnails/varaq.webp',
+            thumbnail_variants={'webp': {'320': 'thumbnails/varaq-320.webp'}},
+        )
+        test_category = TestCategory.objects.create(name='Algebra')
+        for author, difficulty in ((named, 'hard'), (unnamed, 'unknown')):
+            test = Test.objects.create(
+                title=f'{author.username} testi', description='Tavsif', category=test_category, author=author,
+                subject=author.subject, grade_level='7', difficulty=difficulty,
+            )
+            Question.objects.create(test=test, question_text='2 + 2?')
+        self.client = APIClient()
+        self.client.force_authenticate(named)
+
+    def get(self, url, fast_path):
+        with override_settings(FAST_READ_PATH_ENABLED=fast_path):
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_endpoints_render_identical_bytes(self):
+        for url in self.list_urls:
+            with self.subTest(url=url):
+                fast, slow = self.get(url, True), self.get(url, False)
+                self.assertEqual(fast.content, slow.content)
+                self.assertEqual(fast.content, JSONRenderer().render(slow.data))
+                self.assertEqual(len(fast.json()), 2)
+
+    def test_nested_names_null_files_and_datetimes(self):
+        rows = {row['title']: row for row in self.get('/api/materials/', True).json()}
+        self.assertEqual(rows['Kasrlar darsi']['author_name'], "Dilnoza O'ktamova")
+        self.assertEqual(rows['Kasrlar darsi']['category_name'], 'Kasrlar "oson"')
+        self.assertIsNone(rows['Kasrlar darsi']['thumbnail'])
+        self.assertEqual(rows['Rasmli']['author_name'], 'teacher2')
+        self.assertEqual(rows['Rasmli']['author_subject'], 'astronomy')
+        self.assertTrue(rows['Rasmli']['thumbnail'].startswith('http://testserver/'))
+        self.assertIsNotNone(parse_datetime(rows['Rasmli']['created_at']))
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=False, MODEL3D_PROCESSING_ENABLED=False)
+class CategoryCountTests(TemporaryMediaMixin, TestCase):
+    """Kategoriyadagi ommaviy yozuvlar soni signallar orqali va ro'yxat keshi"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        caches['local'].clear()
+        self.author = User.objects.create_user(username='author', password='parol12345')
+        self.algebra = MaterialCategory.objects.create(name='Algebra')
+        self.geometry = MaterialCategory.objects.create(name='Geometriya')
+
+    def create_material(self, **kwargs):
+        kwargs.setdefault('category', self.algebra)
+        return Material.objects.create(
+            title='Kasrlar', description='', material_type='presentation', author=self.author,
+            file=ContentFile(b'slayd', name='kasrlar.pdf'), **kwargs,
+        )
+
+    def assert_counts(self, algebra, geometry):
+        self.algebra.refresh_from_db()
+        self.geometry.refresh_from_db()
+        self.assertEqual((self.algebra.public_materials_count, self.geometry.public_materials_count),
+                         (algebra, geometry))
+
+    def test_create_public_and_private(self):
+        self.create_material()
+        self.create_material(is_public=False)
+        self.assert_counts(1, 0)
+
+    def test_publish_and_unpublish(self):
+        material = self.create_material(is_public=False)
+        material.is_public = True
+        material.save()
+        self.assert_counts(1, 0)
+        material.is_public = False
+        material.save()
+        self.assert_counts(0, 0)
+
+    def test_category_move(self):
+        material = self.create_material()
+        material.category = self.geometry
+        material.save()
+        self.assert_counts(0, 1)
+
+    def test_delete(self):
+        self.create_material()
+        self.create_material().delete()
+        self.assert_counts(1, 0)
+
+    def test_unrelated_save_keeps_count(self):
+        material = self.create_material()
+        material.title = 'Yangi sarlavha'
+        material.save()
+        self.assert_counts(1, 0)
+
+    def test_deferred_fields_fall_back_to_rebuild(self):
+        material = self.create_material()
+        MaterialCategory.objects.filter(pk=self.algebra.pk).update(public_materials_count=99)
+        deferred = Material.objects.only('title').get(pk=material.pk)
+        deferred.title = 'Yangi sarlavha'
+        deferred.save()
+        self.assert_counts(1, 0)
+
+    def test_tests_count_follows_is_active(self):
+        category = TestCategory.objects.create(name='Algebra')
+        test = Test.objects.create(
+            title='Kasrlar', description='', category=category, author=self.author, subject='mathematics',
+            grade_level='5', is_active=False,
+        )
+        category.refresh_from_db()
+        self.assertEqual(category.public_tests_count, 0)
+        test.is_active = True
+        test.save()
+        category.refresh_from_db()
+        self.assertEqual(category.public_tests_count, 1)
+
+    def test_rebuild_counts_repairs_bulk_updates(self):
+        self.create_material()
+        Material.objects.update(category=self.geometry)
+        self.assert_counts(1, 0)
+        self.assertEqual(category_lists.rebuild_counts('materials.MaterialCategory'), 2)
+        self.assert_counts(0, 1)
+
+    def test_cached_list_is_invalidated_on_commit(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        first = client.get('/api/materials/categories/')
+        etag = first['ETag']
+        self.assertEqual(client.get('/api/materials/categories/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_material()
+        response = client.get('/api/materials/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        counts = {row['name']: row['materials_count'] for row in response.json()}
+        self.assertEqual(counts, {'Algebra': 1, 'Geometriya': 0})
+
+
+class TieredCacheTests(SimpleTestCase):
+    """Ikki bosqichli kesh: L1/L2 to'ldirilishi, teg versiyalari va L2 xatoliklari"""
+
+    def setUp(self):
+        self.l1, self.l2 = caches['local'], caches['default']
+        self.l1.clear()
+        self.l2.clear()
+        caching.reset_stats()
+
+    def test_l2_hit_fills_l1(self):
+        caching.set('key', 'qiymat', tags=['materials'])
+        self.l1.clear()
+        self.assertEqual(caching.get('key', tags=['materials']), 'qiymat')
+        self.assertEqual(caching.get('key', tags=['materials']), 'qiymat')
+        stats = caching.stats()
+        self.assertEqual((stats['l2_hits'], stats['l1_hits']), (1, 1))
+
+    def test_invalidate_misses_both_tiers(self):
+        caching.set('key', 'qiymat', tags=['materials'])
+        caching.set('other', 'boshqa', tags=['tests'])
+        caching.invalidate('materials')
+        self.assertIsNone(caching.get('key', tags=['materials']))
+        self.l1.clear()
+        self.assertIsNone(caching.get('key', tags=['materials']))
+        self.assertEqual(caching.get('other', tags=['tests']), 'boshqa')
+        self.assertEqual(caching.stats()['misses'], 2)
+
+    def test_invalidation_from_another_process_after_l1_ttl(self):
+        caching.set('key', 'qiymat', tags=['materials'])
+        # Boshqa jarayon tegni oshirdi: bu jarayonning L1 nusxasi TTL tugaguncha eskirgan qoladi
+        self.l2.incr('cache_tag:materials')
+        self.assertEqual(caching.get('key', tags=['materials']), 'qiymat')
+        self.l1.clear()
+        self.assertIsNone(caching.get('key', tags=['materials']))
+
+    def test_none_is_cached(self):
+        producer = mock.Mock(return_value=None)
+        self.assertIsNone(caching.get_or_set('key', producer))
+        self.assertIsNone(caching.get_or_set('key', producer))
+        self.assertEqual(producer.call_count, 1)
+        self.assertEqual(caching.get('missing', 'standart'), 'standart')
+
+    def test_l1_timeout_is_capped(self):
+        with mock.patch.object(self.l1, 'set', wraps=self.l1.set) as l1_set:
+            caching.set('key', 'qiymat', timeout=3600)
+        self.assertEqual(l1_set.call_args.kwargs['timeout'], caching._l1_timeout(None))
+
+    def test_l2_errors_are_misses(self):
+        with mock.patch.object(self.l2, 'get', side_effect=ConnectionError('redis uzildi')), \
+                mock.patch.object(self.l2, 'get_many', side_effect=ConnectionError('redis uzildi')):
+            self.assertEqual(caching.get_or_set('key', lambda: 'yangi'), 'yangi')
+            self.l1.clear()
+            self.assertIsNone(caching.get('key'))
+        self.assertGreater(caching.stats()['l2_errors'], 0)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, MEDIA_THUMBNAILS_ENABLED=False, SITE_STATS_FRESH_SECONDS=300)
+class SiteStatsTests(TemporaryMediaMixin, TestCase):
+    """Bosh sahifa hisoblagichlari: aniq filtrlangan sonlar, kesh va fonda yangilash"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        caches['local'].clear()
+        self.author = User.objects.create_user(username='author', password='parol12345')
+        User.objects.create_user(username='blocked', password='parol12345', is_active=False)
+        category = MaterialCategory.objects.create(name='Matematika')
+        for is_public in (True, False):
+            Material.objects.create(
+                title='Kasrlar', description='', material_type='presentation', category=category,
+                author=self.author, file=ContentFile(b'slayd', name='kasrlar.pdf'), is_public=is_public,
+            )
+        test_category = TestCategory.objects.create(name='Algebra')
+        for is_active in (True, False):
+            Test.objects.create(
+                title='Kasrlar', description='', category=test_category, author=self.author,
+                subject='mathematics', grade_level='5', is_active=is_active,
+            )
+
+    expected = {'total_materials': 1, 'total_tests': 1, 'total_users': 1}
+
+    def test_filtered_counters_ignore_table_estimates(self):
+        with mock.patch.object(site_stats, 'approximate_count', return_value=10 ** 9) as approximate:
+            self.assertEqual(site_stats.get_site_stats(), self.expected)
+        approximate.assert_not_called()
+
+    def test_unfiltered_large_table_uses_estimate(self):
+        with mock.patch.object(site_stats, 'approximate_count', return_value=10 ** 9), \
+                override_settings(SITE_STATS_EXACT_COUNT_LIMIT=1000):
+            self.assertEqual(site_stats._count(User.objects.all()), 10 ** 9)
+            self.assertEqual(site_stats._count(User.objects.filter(is_active=True)), 1)
+
+    def test_fresh_cache_is_served_without_queries(self):
+        site_stats.get_site_stats()
+        with mock.patch.object(site_stats.background, 'submit') as submit, self.assertNumQueries(0):
+            self.assertEqual(site_stats.get_site_stats(), self.expected)
+        submit.assert_not_called()
+
+    def test_stale_cache_is_served_and_refreshed_in_background(self):
+        site_stats.get_site_stats()
+        cached = caching.get(site_stats.CACHE_KEY)
+        caching.set(site_stats.CACHE_KEY, {**cached, 'computed_at': cached['computed_at'] - 301})
+        Material.objects.filter(is_public=False).update(is_public=True)
+
+        with mock.patch.object(site_stats.background, 'submit') as submit:
+            self.assertEqual(site_stats.get_site_stats(), self.expected)
+            # Yangilash allaqachon boshlangan - ikkinchi vazifa qo'yilmaydi
+            self.assertEqual(site_stats.get_site_stats(), self.expected)
+        submit.assert_called_once_with(site_stats._refresh)
+
+        site_stats._refresh()
+        self.assertIsNone(cache.get(site_stats.REFRESH_LOCK_KEY))
+        self.assertEqual(site_stats.get_site_stats()['total_materials'], 2)
@@ -19,6 +19,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from . import views
+from materials import views as materials_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -45,5 +46,9 @@ urlpatterns = [
 
 # Media fayllar uchun
 if settings.DEBUG:
+    # Kontent-manzilli bloblar muddatsiz kesh sarlavhalari bilan (static() dan oldin)
+    urlpatterns += [
+        path(f"{settings.MEDIA_URL.lstrip('/')}cas/<path:name>", materials_views.media_blob_file),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
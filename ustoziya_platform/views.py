@@ -7,9 +7,13 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 
 from accounts.models import User
-from materials.models import Material, Assignment, VideoLesson, Model3D
+from accounts.stats import get_user_stats
+from materials import uploads
+from materials.models import Material
 from tests.models import Test, Question, Answer, TestCategory
-from ocr_processing.models import OCRProcessing
+from . import images
+from .category_lists import category_rows
+from .site_stats import get_site_stats
 
 
 def home(request):
@@ -17,16 +21,8 @@ def home(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
     
-    # Statistikalar
-    total_materials = Material.objects.filter(is_public=True).count()
-    total_tests = Test.objects.filter(is_public=True, is_active=True).count()
-    total_users = User.objects.filter(is_active=True).count()
-    
-    context = {
-        'total_materials': total_materials,
-        'total_tests': total_tests,
-        'total_users': total_users,
-    }
+    # Statistikalar - keshdan, eskirgan bo'lsa fonda yangilanadi
+    context = get_site_stats()
     return render(request, 'home.html', context)
 
 
@@ -35,13 +31,8 @@ def dashboard(request):
     """Dashboard sahifasi"""
     user = request.user
     
-    # Statistikalar
-    materials_count = Material.objects.filter(author=user).count()
-    tests_count = Test.objects.filter(author=user).count()
-    assignments_count = Assignment.objects.filter(teacher=user).count()
-    videos_count = VideoLesson.objects.filter(author=user).count()
-    models_3d_count = Model3D.objects.filter(author=user).count()
-    ocr_count = OCRProcessing.objects.filter(user=user).count()
+    # Statistikalar - UserStats jadvalidan bitta qator
+    stats = get_user_stats(user)
     
     # So'nggi materiallar
     recent_materials = Material.objects.filter(author=user).order_by('-created_at')[:5]
@@ -50,14 +41,7 @@ def dashboard(request):
     recent_tests = Test.objects.filter(is_public=True, is_active=True).order_by('-created_at')[:5]
     
     context = {
-        'stats': {
-            'materials_count': materials_count,
-            'tests_count': tests_count,
-            'assignments_count': assignments_count,
-            'videos_count': videos_count,
-            'models_3d_count': models_3d_count,
-            'ocr_count': ocr_count,
-        },
+        'stats': stats,
         'recent_materials': recent_materials,
         'recent_tests': recent_tests,
     }
@@ -148,7 +132,12 @@ def profile(request):
         user.bio = request.POST.get('bio', user.bio)
         
         if 'avatar' in request.FILES:
-            user.avatar = request.FILES['avatar']
+            try:
+                user.avatar = images.normalize_image(request.FILES['avatar'], 'avatar')
+            except images.InvalidImage:
+                # Profil o'zgarishlari ham saqlanmaydi - foydalanuvchi formani qayta yuboradi
+                messages.error(request, 'Avatar fayli rasm emas yoki buzilgan')
+                return redirect('profile')
         
         user.save()
         messages.success(request, 'Profil muvaffaqiyatli yangilandi!')
@@ -203,6 +192,11 @@ def material_create(request):
                     defaults={'description': 'Umumiy materiallar'}
                 )
             
+            # Fayl: oddiy multipart yoki bo'laklab yuklangan (upload_id)
+            uploaded = request.FILES.get('file')
+            if uploaded is None and request.POST.get('upload_id'):
+                uploaded = uploads.completed_file(request.POST['upload_id'], request.user)
+            
             # Material yaratish
             material = Material.objects.create(
                 title=request.POST.get('title'),
@@ -213,8 +207,10 @@ def material_create(request):
                 tags=request.POST.get('tags', ''),
                 is_public=request.POST.get('is_public') == 'on',
                 author=request.user,
-                file=request.FILES.get('file')
+                file=uploaded
             )
+            if isinstance(uploaded, uploads.UploadedChunks):
+                uploads.finish(uploaded)
             
             # Kichik rasm qo'shish
             if 'thumbnail' in request.FILES:
@@ -228,9 +224,8 @@ def material_create(request):
             messages.error(request, f'Xatolik yuz berdi: {str(e)}')
             return render(request, 'materials/create.html')
     
-    # Kategoriyalarni olish
-    from materials.models import MaterialCategory
-    categories = MaterialCategory.objects.all()
+    # Kategoriyalar (keshdan)
+    categories = category_rows('materials.MaterialCategory')
     
     context = {
         'categories': categories,
@@ -335,8 +330,8 @@ def test_create(request):
                 'error': f'Xatolik yuz berdi: {str(e)}'
             })
     
-    # Kategoriyalarni olish
-    categories = TestCategory.objects.all()
+    # Kategoriyalar (keshdan)
+    categories = category_rows('tests.TestCategory')
     
     context = {
         'categories': categories,
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ustoziya_platform.settings')
 
 application = get_wsgi_application()
+
+# AI klientlarini worker ishga tushganda oldindan yaratish (gunicorn --preload'siz
+# har bir worker bu modulni fork'dan keyin import qiladi)
+from ustoziya_platform.ai_clients import warm_up_on_boot  # noqa: E402
+
+warm_up_on_boot()
@@ -31,3 +31,6 @@ os.environ['DJANGO_SETTINGS_MODULE'] = 'ustoziya_platform.settings'
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()
 
+# AI klientlarini worker ishga tushganda oldindan yaratish (AI_CLIENTS_WARM_ON_BOOT)
+from ustoziya_platform.ai_clients import warm_up_on_boot
+warm_up_on_boot()